@@ -0,0 +1,210 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import multiprocessing
+from contextlib import redirect_stdout
+
+from synthetic_data import generate_dataset
+from metrics import peak_rss_mb
+
+
+# Mért szakaszok sorrendben; mindegyik az előző kimenetére épül
+BENCHMARK_STAGES = ['decode_csv_file', 'clean_file', 'normalize_adagok', 'normalize_homerseklet',
+                    'load_nf_tables_to_db']
+
+# Ennyivel lassabb futás már regressziónak számít (0.2 = 20%)
+DEFAULT_TOLERANCE = 0.2
+
+# Az ennél kisebb abszolút lassulás mérési zajnak számít (másodperc)
+MIN_REGRESSION_SECONDS = 0.05
+
+
+def run_stage(stage: str, paths: dict) -> dict:
+    """
+    Egy szakasz futtatása és mérése (külön folyamatban hívva, hogy a csúcs memória csak e szakaszé legyen)
+
+    Returns:
+        dict: {'seconds': ..., 'rows': ..., 'peak_rss_mb': ..., 'rss_before_mb': ...}
+    """
+    from decoding import decode_csv_file
+    from cleaning import clean_file
+    from normalizer_adagok import normalize_adagok
+    from normalizer_homerseklet import normalize_homerseklet
+    from db_loader import load_nf_tables_to_db
+    from storage import write_table
+    from dtype_policy import read_typed_table
+
+    import_dir, temp_dir, export_dir, db_path = paths['import'], paths['temp'], paths['export'], paths['db']
+    rss_before = peak_rss_mb()
+
+    with open(os.devnull, 'w') as devnull, redirect_stdout(devnull):
+        if stage == 'decode_csv_file':
+            encodings = {'Adagok.csv': paths['adagok_encoding'], 'Hutopanelek.csv': paths['panel_encoding']}
+            rows = sum(count_lines(os.path.join(import_dir, f)) - 1 for f in encodings)
+            start = time.perf_counter()
+            for filename, encoding in encodings.items():
+                decode_csv_file(os.path.join(import_dir, filename), temp_dir, encoding)
+
+        elif stage == 'clean_file':
+            files = ['Adagok_decoded.csv', 'Hutopanelek_decoded.csv']
+            rows = sum(count_lines(os.path.join(temp_dir, f)) - 1 for f in files)
+            start = time.perf_counter()
+            for filename in files:
+                clean_file(os.path.join(temp_dir, filename), export_dir)
+
+        elif stage in ('normalize_adagok', 'normalize_homerseklet'):
+            source = 'Adagok_decoded_clean.csv' if stage == 'normalize_adagok' else 'Hutopanelek_decoded_clean.csv'
+            df = read_typed_table(os.path.join(export_dir, source))
+            rows = len(df)
+            start = time.perf_counter()
+            if stage == 'normalize_adagok':
+                tables, _ = normalize_adagok(df)
+            else:
+                tables = normalize_homerseklet(df)
+            seconds = time.perf_counter() - start
+            # A kimenetek mentése a betöltési szakasznak (nem számít bele a mérésbe)
+            for table_name, table_data in tables.items():
+                write_table(table_data, os.path.join(export_dir, f"{table_name}.csv"))
+
+        elif stage == 'load_nf_tables_to_db':
+            if os.path.exists(db_path):
+                os.remove(db_path)
+            nf_files = [f for f in os.listdir(export_dir) if f.endswith('_NFdone.csv')]
+            rows = sum(count_lines(os.path.join(export_dir, f)) - 1 for f in nf_files)
+            start = time.perf_counter()
+            load_nf_tables_to_db(export_dir, db_path)
+
+        else:
+            raise ValueError(f"Ismeretlen szakasz: {stage}")
+
+    if stage not in ('normalize_adagok', 'normalize_homerseklet'):
+        seconds = time.perf_counter() - start
+
+    return {'seconds': seconds, 'rows': rows, 'peak_rss_mb': peak_rss_mb(), 'rss_before_mb': rss_before}
+
+
+def count_lines(path: str) -> int:
+    """Fájl sorainak száma (a fejléccel együtt)"""
+    with open(path, 'rb') as file:
+        return sum(chunk.count(b'\n') for chunk in iter(lambda: file.read(1024 * 1024), b''))
+
+
+def run_benchmark(work_dir: str, adagok_rows: int, panel_rows: int, panel_count: int,
+                  adagok_encoding: str = 'latin2', panel_encoding: str = 'cp1250') -> dict:
+    """
+    Szintetikus adatokon a szakaszok egymás utáni mérése, szakaszonként friss folyamatban
+
+    Returns:
+        dict: {'config': ..., 'stages': {szakasz: mérés}}
+    """
+    paths = {
+        'import': os.path.join(work_dir, 'import'),
+        'temp': os.path.join(work_dir, 'temp'),
+        'export': os.path.join(work_dir, 'export'),
+        'db': os.path.join(work_dir, 'db', 'data.db'),
+        'adagok_encoding': adagok_encoding,
+        'panel_encoding': panel_encoding,
+    }
+
+    # Tiszta munkakönyvtár
+    if os.path.exists(work_dir):
+        shutil.rmtree(work_dir)
+    for folder in ('temp', 'export'):
+        os.makedirs(paths[folder])
+    os.makedirs(os.path.dirname(paths['db']))
+
+    print(f"🧪 Szintetikus adatok: {adagok_rows} adag, {panel_rows} × {panel_count} panel mérés")
+    generate_dataset(paths['import'], adagok_rows, panel_rows, panel_count, adagok_encoding, panel_encoding)
+
+    # Friss 'spawn' folyamat szakaszonként: a csúcs memória nem öröklődik
+    context = multiprocessing.get_context('spawn')
+    results = {}
+    with context.Pool(1, maxtasksperchild=1) as pool:
+        for stage in BENCHMARK_STAGES:
+            result = pool.apply(run_stage, (stage, paths))
+            result['rows_per_second'] = result['rows'] / result['seconds'] if result['seconds'] > 0 else 0
+            results[stage] = result
+            print(f"  ⏱️  {stage:<24} {result['seconds']:8.3f} s  {result['rows_per_second']:>12,.0f} sor/s  "
+                  f"csúcs RSS {result['peak_rss_mb']:8.1f} MB")
+
+    return {
+        'config': {'adagok_rows': adagok_rows, 'panel_rows': panel_rows, 'panel_count': panel_count,
+                   'adagok_encoding': adagok_encoding, 'panel_encoding': panel_encoding},
+        'stages': results,
+    }
+
+
+def compare_to_baseline(results: dict, baseline: dict, tolerance: float = DEFAULT_TOLERANCE) -> list:
+    """
+    Összevetés a tárolt alapértékkel
+
+    Returns:
+        list: a regressziót mutató szakaszok neve
+    """
+    if baseline.get('config') != results['config']:
+        print("⚠️  Az alapérték más beállításokkal készült, az összevetés csak tájékoztató jellegű")
+
+    regressions = []
+    print(f"\n{'Szakasz':<24} {'alap (s)':>10} {'most (s)':>10} {'arány':>8}")
+    for stage, result in results['stages'].items():
+        base = baseline.get('stages', {}).get(stage)
+        if not base or base['seconds'] <= 0:
+            print(f"{stage:<24} {'-':>10} {result['seconds']:>10.3f} {'-':>8}")
+            continue
+
+        ratio = result['seconds'] / base['seconds']
+        flag = ""
+        if ratio > 1 + tolerance and result['seconds'] - base['seconds'] > MIN_REGRESSION_SECONDS:
+            regressions.append(stage)
+            flag = "  ❌ REGRESSZIÓ"
+        print(f"{stage:<24} {base['seconds']:>10.3f} {result['seconds']:>10.3f} {ratio:>7.2f}×{flag}")
+
+    return regressions
+
+
+def main():
+    """Szakaszonkénti teljesítménymérés parancssorból"""
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    root_dir = os.path.dirname(current_dir)
+    bench_dir = os.path.join(root_dir, 'bench')
+
+    parser = argparse.ArgumentParser(description="Adatfeldolgozási szakaszok teljesítménymérése szintetikus adatokon")
+    parser.add_argument('--adagok-rows', type=int, default=10000, help="Adagok sorainak száma")
+    parser.add_argument('--panel-rows', type=int, default=100000, help="Hutopanelek sorainak (időpontjainak) száma")
+    parser.add_argument('--panels', type=int, default=14, help="Panelek száma")
+    parser.add_argument('--work-dir', default=os.path.join(bench_dir, 'work'), help="Munkakönyvtár (törlődik!)")
+    parser.add_argument('--baseline', default=os.path.join(bench_dir, 'baseline.json'), help="Alapérték fájl")
+    parser.add_argument('--save-baseline', action='store_true', help="Az eredmény mentése új alapértékként")
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help="Megengedett lassulás aránya regresszió jelzés előtt (alapértelmezett: 0.2)")
+    args = parser.parse_args()
+
+    sys.path.insert(0, current_dir)
+    results = run_benchmark(args.work_dir, args.adagok_rows, args.panel_rows, args.panels)
+
+    results_path = os.path.join(args.work_dir, 'benchmark_results.json')
+    with open(results_path, 'w', encoding='utf-8') as file:
+        json.dump(results, file, indent=2)
+    print(f"\n💾 Eredmény: {results_path}")
+
+    regressions = []
+    if os.path.exists(args.baseline) and not args.save_baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as file:
+            regressions = compare_to_baseline(results, json.load(file), args.tolerance)
+
+    if args.save_baseline:
+        os.makedirs(os.path.dirname(os.path.abspath(args.baseline)), exist_ok=True)
+        with open(args.baseline, 'w', encoding='utf-8') as file:
+            json.dump(results, file, indent=2)
+        print(f"💾 Új alapérték: {args.baseline}")
+
+    if regressions:
+        print(f"\n❌ Regresszió: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
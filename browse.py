@@ -1,16 +1,20 @@
 import os
+from storage import STORAGE_FORMATS
 
 
-def scan_csv_files(folder_path: str) -> list:
+def scan_csv_files(folder_path: str, extensions=None) -> list:
     """
-    Mappa szkennelése CSV fájlokra
+    Mappa szkennelése CSV (illetve parquet / feather) fájlokra
 
     Args:
         folder_path: A szkennelendő mappa útvonala
+        extensions: Elfogadott kiterjesztések (alapértelmezett: minden támogatott tárolási formátum)
 
     Returns:
         list: CSV fájlok listája (üres lista, ha nincs vagy hiba)
     """
+    if extensions is None:
+        extensions = tuple(STORAGE_FORMATS.values())
 
     if not os.path.exists(folder_path):
         print(f"❌ A mappa nem található: {folder_path}")
@@ -18,7 +22,7 @@ def scan_csv_files(folder_path: str) -> list:
 
     csv_files = []
     for file in os.listdir(folder_path):
-        if file.lower().endswith('.csv') and os.path.isfile(os.path.join(folder_path, file)):
+        if file.lower().endswith(tuple(extensions)) and os.path.isfile(os.path.join(folder_path, file)):
             csv_files.append(file)
 
     return csv_files
@@ -1,14 +1,139 @@
-import pandas as pd
+import io
 import os
+import numpy as np
+import pandas as pd
+from storage import table_extension, table_format, write_table
+from dtype_policy import read_typed_table, typed_read_csv, log_frame_memory
+
+
+# Darabolt (out-of-core) tisztítás alapértelmezett darabmérete (sor)
+CLEAN_CHUNK_ROWS = 200000
+
+# clean_file_with_fallback jelöltjei, próbálási sorrendben
+FALLBACK_ENCODINGS = ['utf-8-sig', 'utf-8', 'latin2', 'cp1250', 'cp852']
+
+# Ennyi rendezett hash blokk után összefésülés (a keresés blokkonként bináris)
+SEEN_BLOCK_LIMIT = 8
+
+
+def clean_dataframe(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    DataFrame tisztítása fájlműveletek nélkül (memóriabeli feldolgozáshoz is)
+    """
+    # EGYSZERŰ TISZTÍTÁS
+    return clean_chunk(df.drop_duplicates())  # Duplikált sorok eltávolítása (új DataFrame, külön másolat nem kell)
+
+
+def clean_chunk(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Tisztítás duplikáció szűrés nélkül - egész fájlra és darabonként is ugyanaz
+
+    A hiányzó értékek NA-k maradnak ('' kitöltés nélkül), így a szám oszlopok típusa
+    (pl. Int32, float32) megmarad; csv-be üres mezőként íródnak.
+    """
+    df_clean = (df
+                .dropna(how='all')  # Teljesen üres sorok
+                .rename(columns=lambda x: x.strip())  # Oszlopnevek tisztítása
+                )
+
+    # Szöveges oszlopok automatikus tisztítása (kategóriánál csak a kategóriák)
+    for col in df_clean.select_dtypes(include=['object', 'string', 'category']).columns:
+        df_clean[col] = strip_text(df_clean[col])
+
+    return df_clean
+
+
+def strip_text(series: pd.Series) -> pd.Series:
+    """Szöveges oszlop széleinek tisztítása a típus megtartásával"""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        categories = series.cat.categories
+        if categories.dtype != object:
+            return series
+        stripped = categories.str.strip()
+        if stripped.is_unique:
+            return series.cat.rename_categories(stripped)
+        return series.astype(object).str.strip().astype('category')
+    if series.dtype == object and pd.api.types.infer_dtype(series, skipna=True) != 'string':
+        # Vegyes (pl. szám + szöveg) oszlop: csak a szöveg értékek tisztulnak
+        return series.map(lambda x: x.strip() if isinstance(x, str) else x)
+    return series.str.strip()
+
+
+def seen_row_mask(hashes: np.ndarray, seen_blocks: list) -> np.ndarray:
+    """Melyik sor hash-e szerepelt már korábbi darabban (rendezett uint64 blokkokban keresve)"""
+    seen = np.zeros(len(hashes), dtype=bool)
+    for block in seen_blocks:
+        if not len(block):
+            continue
+        positions = np.searchsorted(block, hashes)
+        positions[positions == len(block)] = 0
+        seen |= block[positions] == hashes
+    return seen
+
+
+def add_row_hashes(seen_blocks: list, hashes: np.ndarray) -> list:
+    """Új sor hash-ek felvétele rendezett blokként; túl sok blokk esetén összefésülés"""
+    if not len(hashes):
+        # Csupa ismétlődő sorból álló darab: nincs új hash (üres blokk nem kerül a listába)
+        return seen_blocks
+    seen_blocks.append(np.sort(hashes))
+    if len(seen_blocks) > SEEN_BLOCK_LIMIT:
+        seen_blocks = [np.sort(np.concatenate(seen_blocks))]
+    return seen_blocks
+
+
+def clean_csv_chunked(input_file_path: str, output_file_path: str, chunksize: int = CLEAN_CHUNK_ROWS) -> tuple:
+    """
+    CSV tisztítása darabonként, a teljes fájl memóriába töltése nélkül (RAM-nál nagyobb fájlokhoz)
+
+    Minden darab szövegként olvasódik (a darabonként eltérő típusfelismerés nem zavarja a duplikáció
+    szűrést és a kiírást). A globális duplikáció szűrés soronként egy 64 bites hash-t tart meg,
+    így a memória a különböző sorok számával nő, nem a nyers szöveg méretével.
+
+    Returns:
+        tuple: (beolvasott sorok, kiírt sorok, oszlopok száma)
+    """
+    seen_blocks = []
+    rows_in = rows_out = column_count = 0
+    header_written = False
+
+    reader = pd.read_csv(input_file_path, delimiter=';', encoding='utf-8-sig', dtype=str, chunksize=chunksize)
+    with open(output_file_path, 'w', encoding='utf-8-sig', newline='') as output:
+        for chunk in reader:
+            rows_in += len(chunk)
+
+            # Duplikátumok: darabon belül és a korábbi darabokhoz képest (a nyers sorok alapján)
+            hashes = pd.util.hash_pandas_object(chunk, index=False).to_numpy()
+            keep = ~pd.Index(hashes).duplicated(keep='first') & ~seen_row_mask(hashes, seen_blocks)
+            seen_blocks = add_row_hashes(seen_blocks, hashes[keep])
+
+            chunk_clean = clean_chunk(chunk[keep])
+            chunk_clean.to_csv(output, index=False, sep=';', header=not header_written)
+            header_written = True
+            rows_out += len(chunk_clean)
+            column_count = len(chunk_clean.columns)
+
+    hash_mb = sum(block.nbytes for block in seen_blocks) / (1024 * 1024)
+    print(f"🧩 Darabolt tisztítás: {chunksize} soros darabok, {rows_out} egyedi sor hash-e ({hash_mb:.1f} MB)")
+
+    if not header_written:
+        # Üres fájl: csak a (tisztított) fejléc
+        header = clean_chunk(pd.read_csv(input_file_path, delimiter=';', encoding='utf-8-sig', nrows=0))
+        header.to_csv(output_file_path, index=False, sep=';', encoding='utf-8-sig')
+        column_count = len(header.columns)
+
+    return rows_in, rows_out, column_count
 
 
-def clean_file(input_file_path: str, output_dir: str) -> str:
+def clean_file(input_file_path: str, output_dir: str, fmt: str = 'csv', chunksize: int = None) -> str:
     """
     Fájltisztító - a main.py számára optimalizálva
 
     Args:
-        input_file_path: A bemeneti fájl teljes útvonala
+        input_file_path: A bemeneti fájl teljes útvonala (csv, parquet vagy feather)
         output_dir: A kimeneti mappa útvonala
+        fmt: A kimeneti fájl formátuma ('csv', 'parquet', 'feather')
+        chunksize: megadása esetén CSV → CSV tisztítás darabonként (ennyi soros darabokban)
 
     Returns:
         str: A kimeneti fájl útvonala, vagy üres string hiba esetén
@@ -18,7 +143,7 @@ def clean_file(input_file_path: str, output_dir: str) -> str:
         # Kimeneti fájl neve (_clean hozzáadásával)
         original_filename = os.path.basename(input_file_path)
         name, ext = os.path.splitext(original_filename)
-        output_filename = f"{name}_clean{ext}"
+        output_filename = f"{name}_clean{table_extension(fmt)}"
         output_file_path = os.path.join(output_dir, output_filename)
 
         # Kimeneti mappa létrehozása ha nem létezik
@@ -26,27 +151,29 @@ def clean_file(input_file_path: str, output_dir: str) -> str:
             os.makedirs(output_dir)
             print(f"✅ Kimeneti mappa létrehozva: {output_dir}")
 
-        # Fájl beolvasása
-        df = pd.read_csv(input_file_path, delimiter=';', encoding='utf-8-sig')
+        if chunksize:
+            if fmt == 'csv' and table_format(input_file_path) == 'csv':
+                print(f"📥 Fájl darabolt feldolgozása: {original_filename}")
+                rows_in, rows_out, column_count = clean_csv_chunked(input_file_path, output_file_path, chunksize)
+                print(f"📊 Eredeti adatok: {rows_in} sor, {column_count} oszlop")
+                print(f"✅ Tisztított fájl: {output_file_path}")
+                print(f"✅ Tisztított adatok: {rows_out} sor, {column_count} oszlop")
+                return output_file_path
+            print(f"ℹ️  Darabolt tisztítás csak CSV → CSV esetén, teljes beolvasás: {original_filename}")
+
+        # Fájl beolvasása (típusos: a DTYPE_RULES szerint)
+        df = read_typed_table(input_file_path)
 
         print(f"📥 Fájl beolvasva: {original_filename}")
         print(f"📊 Eredeti adatok: {len(df)} sor, {len(df.columns)} oszlop")
+        log_frame_memory(df, "beolvasva")
 
-        # EGYSZERŰ TISZTÍTÁS
-        df_clean = (df
-                    .copy()
-                    .drop_duplicates()  # Duplikált sorok eltávolítása
-                    .dropna(how='all')  # Teljesen üres sorok
-                    .fillna('')  # Hiányzó értékek helyettesítése
-                    .rename(columns=lambda x: x.strip())  # Oszlopnevek tisztítása
-                    )
-
-        # Szöveges oszlopok automatikus tisztítása
-        text_cols = df_clean.select_dtypes(include=['object']).columns
-        df_clean[text_cols] = df_clean[text_cols].apply(lambda x: x.str.strip())
+        df_clean = clean_dataframe(df)
+        del df
+        log_frame_memory(df_clean, "tisztítva")
 
-        # Mentés Excel kompatibilis formátumban
-        df_clean.to_csv(output_file_path, index=False, sep=';', encoding='utf-8-sig')
+        # Mentés (csv esetén Excel kompatibilis formátumban)
+        write_table(df_clean, output_file_path)
 
         print(f"✅ Tisztított fájl: {output_file_path}")
         print(f"✅ Tisztított adatok: {len(df_clean)} sor, {len(df_clean.columns)} oszlop")
@@ -58,47 +185,65 @@ def clean_file(input_file_path: str, output_dir: str) -> str:
         return ""
 
 
-def clean_file_with_fallback(input_file_path: str, output_dir: str) -> str:
+def clean_file_with_fallback(input_file_path: str, output_dir: str, fmt: str = 'csv', stats: dict = None) -> str:
     """
     Fájltisztító alternatív kódolások kipróbálásával
+
+    A fájl egyszer kerül a memóriába; a jelölt kódolások a nyers bájtokon, szigorú dekódolással
+    dőlnek el, a CSV feldolgozás és a tisztítás csak egyszer, a nyertes kódolással fut.
+
+    Args:
+        stats: megadása esetén ide kerül a nyertes kódolás ('encoding') és az elvetett jelöltek száma ('rejected')
     """
-    encodings = ['utf-8-sig', 'utf-8', 'latin2', 'cp1250', 'cp852']
+    encodings = FALLBACK_ENCODINGS
 
+    try:
+        with open(input_file_path, 'rb') as file:
+            raw_data = file.read()
+    except OSError as e:
+        print(f"❌ A fájl nem olvasható: {e}")
+        return ""
+
+    text = None
+    rejected = 0
     for encoding in encodings:
         try:
             print(f"🔍 Kísérlet {encoding} kódolással...")
-            df = pd.read_csv(input_file_path, delimiter=';', encoding=encoding)
+            text = raw_data.decode(encoding)
+            break
+        except UnicodeDecodeError as e:
+            print(f"❌ {encoding} nem működik: {str(e)[:50]}...")
+            rejected += 1
+    del raw_data
 
-            # Ha sikerült beolvasni, folytatjuk a tisztítással
-            original_filename = os.path.basename(input_file_path)
-            name, ext = os.path.splitext(original_filename)
-            output_filename = f"{name}_clean{ext}"
-            output_file_path = os.path.join(output_dir, output_filename)
+    if stats is not None:
+        stats.update({'encoding': encoding if text is not None else None, 'rejected': rejected})
 
-            if not os.path.exists(output_dir):
-                os.makedirs(output_dir)
+    if text is None:
+        print("❌ Egyik kódolás sem működött!")
+        return ""
 
-            df_clean = (df
-                        .copy()
-                        .drop_duplicates()
-                        .dropna(how='all')
-                        .fillna('')
-                        .rename(columns=lambda x: x.strip())
-                        )
+    try:
+        original_filename = os.path.basename(input_file_path)
+        name, ext = os.path.splitext(original_filename)
+        output_filename = f"{name}_clean{table_extension(fmt)}"
+        output_file_path = os.path.join(output_dir, output_filename)
 
-            text_cols = df_clean.select_dtypes(include=['object']).columns
-            df_clean[text_cols] = df_clean[text_cols].apply(lambda x: x.str.strip())
+        if not os.path.exists(output_dir):
+            os.makedirs(output_dir)
 
-            df_clean.to_csv(output_file_path, index=False, sep=';', encoding='utf-8-sig')
-            print(f"✅ Sikeres tisztítás {encoding} kódolással")
-            return output_file_path
+        # Egyetlen feldolgozás a már dekódolt szövegből (a BOM-ot a utf-8-sig már levágta)
+        df = typed_read_csv(io.StringIO(text), delimiter=';')
+        del text
+        df_clean = clean_dataframe(df)
 
-        except Exception as e:
-            print(f"❌ {encoding} nem működik: {str(e)[:50]}...")
-            continue
+        write_table(df_clean, output_file_path)
+        print(f"✅ Sikeres tisztítás {encoding} kódolással ({rejected} elvetett jelölt)")
+        return output_file_path
 
-    print("❌ Egyik kódolás sem működött!")
-    return ""
+    except Exception as e:
+        print(f"❌ Hiba a tisztítás során ({encoding}): {e}")
+        return ""
 
 
 if __name__ == "__main__":
@@ -0,0 +1,205 @@
+import sqlite3
+from itertools import chain
+import numpy as np
+import pandas as pd
+from storage import DATETIME_FORMAT
+
+
+# A DATETIME_FORMAT két fele (külön dátum / idő oszlopok felismeréséhez)
+DATE_FORMAT = '%Y.%m.%d'
+TIME_FORMAT = '%H:%M:%S'
+
+# Azonos előtagú dátum + idő oszlopból összevont időpont oszlop neve (Kezdet_DÁTUM + Kezdet_IDŐ -> Kezdet_IDŐPONT)
+DATETIME_SUFFIX = '_IDŐPONT'
+
+# Séma felismeréshez vizsgált sorok legnagyobb száma
+SCHEMA_SAMPLE_ROWS = 10000
+
+# Oszlopfajták tárolási típusa:
+#   datetime - epoch másodperc (időzóna nélkül: a falióra szerinti időpont UTC-ként kódolva,
+#              SQL-ben datetime(oszlop, 'unixepoch') adja vissza szövegként)
+#   date     - a nap kezdetének epoch másodperce
+#   time     - éjfél óta eltelt másodpercek
+#   boolean  - 0 / 1
+#   empty    - csak hiányzó érték a mintában (bármilyen meglévő oszloptípussal összefér)
+SQL_TYPES = {
+    'integer': 'INTEGER',
+    'boolean': 'INTEGER',
+    'datetime': 'INTEGER',
+    'date': 'INTEGER',
+    'time': 'INTEGER',
+    'real': 'REAL',
+    'text': 'TEXT',
+    'empty': 'TEXT',
+}
+
+# STRICT táblák (SQLite 3.37+): a típushoz nem illeszkedő érték hibát ad, nem tárolódik csendben szövegként
+STRICT_TABLES = sqlite3.sqlite_version_info >= (3, 37, 0)
+
+
+def table_options() -> str:
+    """CREATE TABLE utáni tábla opciók (STRICT, ha az SQLite verzió támogatja)"""
+    return " STRICT" if STRICT_TABLES else ""
+
+
+def epoch_seconds(value) -> int:
+    """Egy időpont ('ÉÉÉÉ.HH.NN óó:pp:mm' szöveg, datetime vagy pd.Timestamp) epoch másodpercként"""
+    timestamp = pd.to_datetime(value, format=DATETIME_FORMAT) if isinstance(value, str) else pd.Timestamp(value)
+    return int((timestamp - pd.Timestamp(0)) // pd.Timedelta(seconds=1))
+
+
+def format_epoch(seconds, fmt: str = DATETIME_FORMAT) -> str:
+    """Epoch másodperc szöveges időpontként (naplózáshoz)"""
+    return pd.Timestamp(int(seconds), unit='s').strftime(fmt)
+
+
+def to_epoch_seconds(times: pd.Series) -> pd.Series:
+    """datetime64 oszlop epoch másodpercként (Int64, hiányzó időpontnál <NA>)"""
+    seconds = times.to_numpy(dtype='datetime64[s]').astype('int64')
+    return pd.Series(pd.arrays.IntegerArray(seconds, times.isna().to_numpy()), index=times.index)
+
+
+def parse_times(text: pd.Series, fmt: str) -> pd.Series:
+    """Szöveges időpontok értelmezése; csak a különböző értékek (egy időponthoz sok mérés tartozhat)"""
+    codes, uniques = pd.factorize(text)
+    parsed = pd.to_datetime(pd.Series(uniques, dtype=object).astype(str), format=fmt, errors='coerce').to_numpy()
+    values = np.where(codes >= 0, parsed[np.maximum(codes, 0)], np.datetime64('NaT'))
+    return pd.Series(values, index=text.index, dtype='datetime64[ns]')
+
+
+def infer_column_kind(sample: pd.DataFrame, column: str, integer_key: bool = False) -> str:
+    """
+    Oszlop fajtájának felismerése a mintából
+
+    Returns:
+        str: integer, real, boolean, datetime, date, time, text vagy empty
+    """
+    series = sample[column]
+    values = series.dropna()
+    if pd.api.types.is_bool_dtype(series):
+        return 'boolean'
+    if pd.api.types.is_integer_dtype(series):
+        return 'integer'
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return 'datetime'
+    if pd.api.types.is_numeric_dtype(series):
+        # Hiányzó érték miatt lebegőpontossá vált kulcs (pl. panel_szam) egészként tárolódik
+        if integer_key and (values % 1 == 0).all():
+            return 'integer'
+        return 'real'
+    if values.empty:
+        return 'empty'
+
+    text = values.astype(str)
+    for kind, fmt in (('datetime', DATETIME_FORMAT), ('date', DATE_FORMAT), ('time', TIME_FORMAT)):
+        if pd.to_datetime(text, format=fmt, errors='coerce').notna().all():
+            return kind
+    return 'text'
+
+
+def sample_frame(df: pd.DataFrame, sample_rows: int = SCHEMA_SAMPLE_ROWS) -> pd.DataFrame:
+    """Egyenletes mintavétel (az adat eleje, közepe és vége is a mintába kerül)"""
+    if len(df) <= sample_rows:
+        return df
+    return df.iloc[::len(df) // sample_rows]
+
+
+def infer_table_schema(chunks, integer_keys=(), sample_rows: int = SCHEMA_SAMPLE_ROWS):
+    """
+    Tábla sémájának felismerése mintából, a teljes adat nélkül
+
+    Darabolt (streamelt) betöltésnél csak az első darabok kerülnek a mintába, legfeljebb
+    sample_rows sorig; a felhasznált darabok a visszaadott iterátor elején újra megjelennek.
+    Az azonos előtagú dátum és idő oszlopok (pl. Kezdet_DÁTUM, Kezdet_IDŐ) egyetlen
+    időpont oszloppá (Kezdet_IDŐPONT) vonódnak össze.
+
+    Args:
+        chunks: DataFrame darabok (egyetlen DataFrame esetén [df])
+        integer_keys: kulcs oszlopok - egész értékű lebegőpontos mintánál INTEGER típust kapnak
+
+    Returns:
+        tuple: (séma: oszlop -> {'kind', 'type', 'sources'}, a darabok iterátora)
+    """
+    chunks = iter(chunks)
+    seen, rows = [], 0
+    for chunk in chunks:
+        seen.append(chunk)
+        rows += len(chunk)
+        if rows >= sample_rows:
+            break
+    if not seen:
+        raise ValueError("Nincs adat a séma felismeréséhez")
+    sample = sample_frame(pd.concat(seen, ignore_index=True) if len(seen) > 1 else seen[0], sample_rows)
+
+    kinds = {column: infer_column_kind(sample, column, column in integer_keys) for column in sample.columns}
+
+    # Dátum -> azonos előtagú idő oszlop párok
+    times = {column.rsplit('_', 1)[0]: column for column, kind in kinds.items() if kind == 'time' and '_' in column}
+    pairs = {column: times[column.rsplit('_', 1)[0]] for column, kind in kinds.items()
+             if kind == 'date' and '_' in column and column.rsplit('_', 1)[0] in times}
+    paired_times = set(pairs.values())
+
+    schema = {}
+    for column, kind in kinds.items():
+        if column in paired_times:
+            continue
+        if column in pairs:
+            schema[column.rsplit('_', 1)[0] + DATETIME_SUFFIX] = {'kind': 'datetime', 'type': SQL_TYPES['datetime'],
+                                                                  'sources': [column, pairs[column]]}
+        else:
+            schema[column] = {'kind': kind, 'type': SQL_TYPES[kind], 'sources': [column]}
+    return schema, chain(seen, chunks)
+
+
+def convert_to_schema(df: pd.DataFrame, schema: dict, table_name: str = '') -> pd.DataFrame:
+    """
+    DataFrame (darab) átalakítása a séma szerinti tárolási értékekre
+
+    A mintán kívül előforduló, időpontként nem értelmezhető értékek NULL-ra cserélődnek (figyelmeztetéssel).
+    """
+    converted = {}
+    for column, spec in schema.items():
+        sources = [df[source] for source in spec['sources']]
+        kind = spec['kind']
+        failed = 0
+
+        if kind in ('datetime', 'date'):
+            if len(sources) == 2:
+                parsed = parse_times(sources[0].astype(str) + ' ' + sources[1].astype(str), DATETIME_FORMAT)
+            elif pd.api.types.is_datetime64_any_dtype(sources[0]):
+                parsed = sources[0]
+            else:
+                parsed = parse_times(sources[0], DATETIME_FORMAT if kind == 'datetime' else DATE_FORMAT)
+            values = to_epoch_seconds(parsed)
+            failed = int((parsed.isna() & pd.concat(sources, axis=1).notna().all(axis=1)).sum())
+        elif kind == 'time':
+            parsed = pd.to_timedelta(sources[0].astype(str), errors='coerce')
+            values = parsed.dt.total_seconds().astype('Int64')
+            failed = int((parsed.isna() & sources[0].notna()).sum())
+        elif kind == 'boolean':
+            values = sources[0].astype('boolean').astype('Int64')
+        elif kind == 'integer' and not pd.api.types.is_integer_dtype(sources[0]):
+            numbers = pd.to_numeric(sources[0], errors='coerce')
+            if not (numbers.dropna() % 1 == 0).all():
+                raise ValueError(f"{table_name}: nem egész érték a(z) {column} INTEGER oszlopban")
+            values = numbers.astype('Int64')
+        else:
+            values = sources[0]
+
+        if failed:
+            print(f"  ⚠️  {table_name}: {failed} érték nem értelmezhető időpontként ({column}) → NULL")
+        converted[column] = values
+
+    return pd.DataFrame(converted, index=df.index)
+
+
+def sql_values(series: pd.Series) -> list:
+    """Oszlop Python értékekként a kötéshez (hiányzó érték: None; a lebegőpontos NaN-t az SQLite maga NULL-lá teszi)"""
+    if series.dtype == 'float32':
+        # A float32 érték rövid decimális alakja kerül be (37.22, nem 37.220001220703125), értékenként egyszer
+        codes, uniques = pd.factorize(series.to_numpy())
+        decimals = np.append(uniques.astype(str).astype('float64'), np.nan)
+        return decimals[codes].tolist()
+    if series.dtype.kind != 'f' and series.hasnans:
+        return series.astype(object).where(series.notna(), None).tolist()
+    return series.tolist()
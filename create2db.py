@@ -29,8 +29,9 @@ def create_database(db_path=None):
         print(f"✅ Adatbázis már létezik: {db_path}")
         return True
 
-    # Adatbázis kapcsolat létrehozása (ez létrehozza a fájlt)
+    # Adatbázis kapcsolat létrehozása (ez létrehozza a fájlt); WAL mód: az olvasók nem várnak az íróra
     conn = sqlite3.connect(db_path)
+    conn.execute("PRAGMA journal_mode = WAL")
     conn.close()
 
     print(f"✅ Új adatbázis létrehozva: {db_path}")
@@ -1,83 +1,787 @@
 import os
+import time
 import sqlite3
-import pandas as pd
+from itertools import islice
+from storage import STORAGE_FORMATS
+from dtype_policy import read_typed_table, log_frame_memory
+from column_types import infer_table_schema, convert_to_schema, sql_values, table_options
+from heat_map import HEAT_MAP_SOURCES, build_heat_map, table_exists
+from rollups import update_rollups
+from panel_blocks import (BLOCK_TABLE, create_block_table, create_block_view, is_block_layout, has_work_table,
+                          open_panel_blocks, store_panel_blocks, drop_block_layout)
+from partitions import (PARTITIONED_TABLE, base_table, split_by_month, list_partitions, is_partitioned,
+                        create_partition_view, drop_partitioned_layout)
+
+
+# Tömeges betöltés alapbeállításai
+BULK_BATCH_SIZE = 50000
+
+# Kulcsütköző (azonos kulcsú) sorok kezelése egy betöltésen belül: 'error' - hiba, a betöltés leáll;
+# 'last' / 'first' - kulcsonként csak az utolsó / első előfordulás marad, az eldobott sorok száma kiíródik
+DUPLICATE_KEY_MODES = ('error', 'last', 'first')
+
+# Az élő adatbázis PRAGMA-i: WAL módban az olvasók nem várnak az íróra, és mindig egy lezárt
+# tranzakció utáni állapotot látnak (a journal_mode a fájlban megmarad, az olvasókra is érvényes)
+LOAD_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',  # WAL mellett nem sérülhet az adatbázis, csak az utolsó commit veszhet el
+    'cache_size': -200000,  # negatív érték: KiB-ban (~200 MB)
+    'temp_store': 'MEMORY',
+    'busy_timeout': 30000,  # ms - egy másik író (pl. futási mérések mentése) kivárása
+    'journal_size_limit': 64 * 1024 * 1024,  # checkpoint után a -wal fájl legfeljebb ekkora marad
+}
+
+# Az átmeneti (staging) adatbázis PRAGMA-i: sebesség a tartósság rovására - hiba esetén a fájl eldobható
+STAGING_PRAGMAS = {
+    'journal_mode': 'OFF',
+    'synchronous': 'OFF',
+    'cache_size': -200000,
+    'temp_store': 'MEMORY',
+}
+
+# Teljes betöltésnél az adatbázis ebben a fájlban épül (az élő fájl mellett), majd közzétételre kerül
+STAGING_SUFFIX = '.staging'
+
+# NF3 táblák kulcs specifikációja:
+#   primary_key  - természetes kulcs (PRIMARY KEY, upsert kulcs)
+#   foreign_keys - (oszlopok, hivatkozott tábla, hivatkozott oszlopok)
+#   indexes      - másodlagos indexek, a tömeges betöltés UTÁN épülnek
+TABLE_SPECS = {
+    'kezdet_adagok_NFdone': {
+        'primary_key': ['ADAGSZÁM'],
+    },
+    'vege_adatok_NFdone': {
+        'primary_key': ['ADAGSZÁM'],
+        'foreign_keys': [(['ADAGSZÁM'], 'kezdet_adagok_NFdone', ['ADAGSZÁM'])],
+    },
+    'ido_ellenorzes_NFdone': {
+        'primary_key': ['ADAGSZÁM'],
+        'foreign_keys': [(['ADAGSZÁM'], 'kezdet_adagok_NFdone', ['ADAGSZÁM'])],
+        'indexes': [['CRC_Error']],
+    },
+    'panel_szam_NFdone': {
+        'primary_key': ['meres_idopont', 'panel_szam'],
+        'indexes': [['panel_szam', 'meres_idopont']],
+    },
+}
+
+# Természetes kulcsok az inkrementális (upsert) betöltéshez
+TABLE_KEYS = {name: spec['primary_key'] for name, spec in TABLE_SPECS.items()}
+
+
+def table_spec(table_name):
+    """A tábla kulcs specifikációja (havi partíciónál az alaptábláé)"""
+    return TABLE_SPECS.get(base_table(table_name), {})
 
 
 def discover_nf_tables(export_dir):
-    """_NFdone fájlok felfedezése"""
+    """_NFdone fájlok felfedezése (csv, parquet vagy feather)"""
     nf_files = []
     for file in os.listdir(export_dir):
-        if file.endswith('_NFdone.csv'):
+        if any(file.endswith(f"_NFdone{ext}") for ext in STORAGE_FORMATS.values()):
             nf_files.append(file)
     return nf_files
 
 
-def infer_sql_type(df, column):
-    """Oszlop típus automatikus felismerése"""
-    if pd.api.types.is_integer_dtype(df[column]):
-        return 'INTEGER'
-    elif pd.api.types.is_numeric_dtype(df[column]):
-        return 'REAL'
-    else:
-        return 'TEXT'
+def nf_table_name(nf_file):
+    """Tábla neve a fájlnévből (kiterjesztés nélkül)"""
+    return os.path.splitext(nf_file)[0]
 
 
-def create_table_from_csv(cursor, table_name, df):
-    """Tábla létrehozása CSV alapján"""
+def infer_schema(table_name, df):
+    """Tábla sémája mintavételezéssel (időpontok INTEGER epoch másodpercként, lásd column_types.py)"""
+    schema, _ = infer_table_schema([df], table_spec(table_name).get('primary_key', []))
+    return schema
 
-    # Tábla törlése ha létezik
-    cursor.execute(f"DROP TABLE IF EXISTS {table_name}")
 
+def quote_identifier(name):
+    """SQL azonosító idézőjelezése (szóköz, ékezet, kulcsszó esetére)"""
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def build_create_table_sql(table_name, schema, if_not_exists=False):
+    """CREATE TABLE utasítás összeállítása a séma (infer_schema) és a TABLE_SPECS kulcsai alapján"""
     # Oszlopok és típusok
     columns = []
-    for col in df.columns:
-        sql_type = infer_sql_type(df, col)
-        columns.append(f"{col} {sql_type}")
+    for col, spec in schema.items():
+        columns.append(f"{quote_identifier(col)} {spec['type']}")
+
+    # Elsődleges és idegen kulcsok (SQLite-ban csak létrehozáskor adhatók meg)
+    spec = table_spec(table_name)
+    if spec.get('primary_key'):
+        columns.append(f"PRIMARY KEY ({', '.join(quote_identifier(c) for c in spec['primary_key'])})")
+    for fk_cols, ref_table, ref_cols in spec.get('foreign_keys', []):
+        columns.append(f"FOREIGN KEY ({', '.join(quote_identifier(c) for c in fk_cols)}) "
+                       f"REFERENCES {quote_identifier(ref_table)} ({', '.join(quote_identifier(c) for c in ref_cols)})")
 
     # CREATE TABLE SQL
-    create_sql = f"CREATE TABLE {table_name} (\n    "
+    create_sql = f"CREATE TABLE {'IF NOT EXISTS ' if if_not_exists else ''}{table_name} (\n    "
     create_sql += ",\n    ".join(columns)
-    create_sql += "\n)"
+    create_sql += "\n)" + table_options()
+    return create_sql
+
 
-    cursor.execute(create_sql)
+def create_table_from_csv(cursor, table_name, schema):
+    """Tábla létrehozása CSV alapján (a felismert séma szerint)"""
+
+    # Tábla törlése ha létezik
+    cursor.execute(f"DROP TABLE IF EXISTS {table_name}")
+
+    cursor.execute(build_create_table_sql(table_name, schema))
     print(f"  📋 Tábla létrehozva: {table_name}")
 
 
-def load_data_to_table(cursor, table_name, df):
-    """Adatok betöltése táblába"""
+def drop_duplicate_keys(table_name, df, keys, duplicate_keys='error'):
+    """Kulcsütköző sorok kezelése a DUPLICATE_KEY_MODES szerint
+
+    Raises:
+        ValueError: 'error' módban, ha van kulcsütköző sor (darabszám és egy példa kulcs)
+    """
+    if duplicate_keys not in DUPLICATE_KEY_MODES:
+        raise ValueError(f"Ismeretlen kulcsütközés kezelés: {duplicate_keys} ({', '.join(DUPLICATE_KEY_MODES)})")
+    duplicated = df.duplicated(subset=keys, keep='first' if duplicate_keys == 'first' else 'last')
+    if not duplicated.any():
+        return df
+
+    count = int(duplicated.sum())
+    if duplicate_keys == 'error':
+        example = df.loc[duplicated, list(keys)].iloc[0].tolist()
+        raise ValueError(f"{table_name}: {count} kulcsütköző sor ({', '.join(keys)}), pl. {example} - "
+                         f"kulcsonként egy sor megtartása: --duplicate-keys last vagy first")
+    kept = 'utolsó' if duplicate_keys == 'last' else 'első'
+    print(f"  ⚠️  {count} kulcsütköző sor eldobva ({', '.join(keys)}; kulcsonként az {kept} előfordulás marad)")
+    return df[~duplicated]
+
+
+def prepare_keyed_dataframe(table_name, df, duplicate_keys='error'):
+    """Kulcsos tábla előkészítése: kulcs szerinti egyediség és rendezés
+
+    A kulcs szerint rendezett beszúrás az elsődleges kulcs indexét sorfolytonosan építi.
+    duplicate_keys: kulcsütköző sorok kezelése (DUPLICATE_KEY_MODES)
+    """
+    keys = table_spec(table_name).get('primary_key')
+    if not keys or not all(k in df.columns for k in keys):
+        return df
+
+    df = drop_duplicate_keys(table_name, df, keys, duplicate_keys)
+    return df.sort_values(keys, kind='stable')
+
+
+def create_secondary_indexes(cursor, table_name):
+    """Másodlagos indexek létrehozása a TABLE_SPECS alapján (betöltés után)"""
+    for index_cols in table_spec(table_name).get('indexes', []):
+        index_name = quote_identifier(f"idx_{table_name}_{'_'.join(index_cols)}")
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {index_name} ON {quote_identifier(table_name)} "
+                       f"({', '.join(quote_identifier(c) for c in index_cols)})")
+        print(f"  🗂️  Index: {index_name}")
+
+
+def load_order(table_name):
+    """Betöltési sorrend: a hivatkozott (szülő) táblák előbb"""
+    return 1 if table_spec(table_name).get('foreign_keys') else 0
+
+
+def get_table_columns(cursor, table_name):
+    """Meglévő tábla oszlopainak neve (sorrendben)"""
+    cursor.execute(f"PRAGMA table_info({quote_identifier(table_name)})")
+    return [row[1] for row in cursor.fetchall()]
+
+
+def get_column_types(cursor, table_name):
+    """Meglévő tábla oszlopainak deklarált típusa"""
+    cursor.execute(f"PRAGMA table_info({quote_identifier(table_name)})")
+    return {row[1]: row[2].upper() for row in cursor.fetchall()}
+
+
+def check_table_schema(cursor, table_name, schema):
+    """Meglévő tábla és a betöltendő adat sémájának összevetése (pl. szöveges időpontú régi tábla)"""
+    existing = get_column_types(cursor, table_name)
+    missing = [col for col in existing if col not in schema]
+    mismatched = [f"{col}: {existing[col]} → {spec['type']}" for col, spec in schema.items()
+                  if col in existing and spec['kind'] != 'empty' and existing[col] != spec['type']]
+    if missing or mismatched:
+        details = ', '.join(mismatched + [f"hiányzó oszlop: {col}" for col in missing])
+        raise ValueError(f"{table_name}: a meglévő tábla sémája eltér a betöltendő adatétól ({details}); "
+                         f"régebbi sémájú tábla - teljes újratöltés szükséges (--tables replace)")
+
+
+def get_primary_key(cursor, table_name):
+    """Meglévő tábla elsődleges kulcsának oszlopai (sorrendben)"""
+    cursor.execute(f"PRAGMA table_info({quote_identifier(table_name)})")
+    pk_columns = sorted((row[5], row[1]) for row in cursor.fetchall() if row[5] > 0)
+    return [name for _, name in pk_columns]
+
+
+def drop_duplicate_key_rows(cursor, table_name, keys, duplicate_keys='error'):
+    """Meglévő (kulcs nélkül létrehozott) tábla kulcsütköző sorai az egyedi index előtt
+
+    'error' módban hiba a darabszámmal és egy példa kulccsal (az egyedi index különben egy
+    érthetetlen IntegrityError-ral szakítaná meg az upsertet); 'last' / 'first' módban kulcsonként
+    a legutóbb / legelőször beszúrt sor (rowid) marad.
+    """
+    key_list = ', '.join(quote_identifier(k) for k in keys)
+    target = quote_identifier(table_name)
+    example_sql = " || ', ' || ".join(f"quote({quote_identifier(k)})" for k in keys)
+    cursor.execute(f"SELECT COALESCE(SUM(n - 1), 0), MIN(example) FROM ("
+                   f"SELECT COUNT(*) AS n, {example_sql} AS example FROM {target} "
+                   f"GROUP BY {key_list} HAVING COUNT(*) > 1)")
+    count, example = cursor.fetchone()
+    if not count:
+        return
+    if duplicate_keys == 'error':
+        raise ValueError(f"{table_name}: a meglévő táblában {count} kulcsütköző sor van ({', '.join(keys)}), "
+                         f"pl. [{example}] - az egyedi kulcs index nem hozható létre; kulcsonként egy sor "
+                         f"megtartása: --duplicate-keys last vagy first, vagy teljes újratöltés (--tables replace)")
+    keep = 'MAX' if duplicate_keys == 'last' else 'MIN'
+    cursor.execute(f"DELETE FROM {target} WHERE rowid NOT IN (SELECT {keep}(rowid) FROM {target} GROUP BY {key_list})")
+    print(f"  ⚠️  {table_name}: {count} kulcsütköző sor törölve a meglévő táblából ({', '.join(keys)})")
+
+
+def upsert_table(cursor, table_name, df, keys, schema, batch_size=BULK_BATCH_SIZE, duplicate_keys='error'):
+    """Inkrementális betöltés természetes kulcs alapján (INSERT ... ON CONFLICT)
+
+    Csak az új vagy megváltozott sorok íródnak. A tábla és a kulcs egyedi indexe
+    szükség esetén létrejön. A df már a séma szerinti (convert_to_schema) értékeket tartalmazza;
+    a benne lévő kulcsütköző sorokat a duplicate_keys (DUPLICATE_KEY_MODES) kezeli.
+
+    Returns:
+        dict: {'inserted': ..., 'updated': ..., 'unchanged': ...,
+              'changed_keys': az új / módosított sorok első kulcsának értékei}
+    """
+    # Tábla létrehozása, ha még nincs; az ON CONFLICT-hoz egyedi index kell a kulcson.
+    # Elsődleges kulcs nélküli (régebben létrehozott) táblánál külön egyedi index készül.
+    cursor.execute(build_create_table_sql(table_name, schema, if_not_exists=True))
+    check_table_schema(cursor, table_name, schema)
+    key_list = ', '.join(quote_identifier(k) for k in keys)
+    if get_primary_key(cursor, table_name) != list(keys):
+        drop_duplicate_key_rows(cursor, table_name, keys, duplicate_keys)
+        cursor.execute(f"CREATE UNIQUE INDEX IF NOT EXISTS {quote_identifier(f'ux_{table_name}_key')} "
+                       f"ON {quote_identifier(table_name)} ({key_list})")
+
+    # A betöltés a tábla oszlopsorrendjét követi
+    columns = get_table_columns(cursor, table_name)
+    missing = [col for col in columns if col not in df.columns]
+    if missing:
+        raise ValueError(f"{table_name}: hiányzó oszlopok a betöltendő adatban: {missing}")
+    df = drop_duplicate_keys(table_name, df[columns], keys, duplicate_keys)
+
+    # Átmeneti tábla ugyanazzal a sémával (típus affinitással)
+    stage = quote_identifier(f"stage_{table_name}")
+    target = quote_identifier(table_name)
+    cursor.execute(f"DROP TABLE IF EXISTS temp.{stage}")
+    cursor.execute(f"CREATE TEMP TABLE {stage} AS SELECT * FROM {target} WHERE 0")
+    load_data_to_table(cursor, f"temp.{stage}", df, batch_size)
+
+    non_keys = [col for col in columns if col not in keys]
+    join_on = ' AND '.join(f"t.{quote_identifier(k)} = s.{quote_identifier(k)}" for k in keys)
+    changed_sql = ' OR '.join(f"t.{quote_identifier(c)} IS NOT s.{quote_identifier(c)}" for c in non_keys) or '0'
+
+    # Statisztika a módosítás előtt
+    cursor.execute(f"SELECT COUNT(*), COUNT(t.rowid), COALESCE(SUM(CASE WHEN t.rowid IS NOT NULL AND ({changed_sql}) "
+                   f"THEN 1 ELSE 0 END), 0) FROM temp.{stage} s LEFT JOIN {target} t ON {join_on}")
+    total, matched, updated = cursor.fetchone()
+    stats = {'inserted': total - matched, 'updated': updated, 'unchanged': matched - updated}
+
+    # Az új / módosított sorok első kulcsoszlopának különböző értékei (az összesítők frissítéséhez)
+    first_key = quote_identifier(keys[0])
+    cursor.execute(f"SELECT DISTINCT s.{first_key} FROM temp.{stage} s "
+                   f"LEFT JOIN {target} t ON {join_on} WHERE t.rowid IS NULL OR {changed_sql} ORDER BY 1")
+    stats['changed_keys'] = [row[0] for row in cursor.fetchall()]
+
+    # Upsert - a változatlan sorokat a DO UPDATE ... WHERE kihagyja
+    column_list = ', '.join(quote_identifier(c) for c in columns)
+    if non_keys:
+        set_sql = ', '.join(f"{quote_identifier(c)} = excluded.{quote_identifier(c)}" for c in non_keys)
+        where_sql = ' OR '.join(f"{target}.{quote_identifier(c)} IS NOT excluded.{quote_identifier(c)}"
+                                for c in non_keys)
+        conflict_sql = f"DO UPDATE SET {set_sql} WHERE {where_sql}"
+    else:
+        conflict_sql = "DO NOTHING"
+    cursor.execute(f"INSERT INTO {target} ({column_list}) SELECT {column_list} FROM temp.{stage} WHERE true "
+                   f"ON CONFLICT ({key_list}) {conflict_sql}")
+    cursor.execute(f"DROP TABLE temp.{stage}")
+
+    print(f"  🔁 Upsert: {stats['inserted']} új, {stats['updated']} módosított, {stats['unchanged']} változatlan sor")
+    return stats
+
+
+def load_data_to_table(cursor, table_name, df, batch_size=BULK_BATCH_SIZE):
+    """Adatok tömeges betöltése táblába (executemany, kötegelve)"""
+    placeholders = ', '.join(['?' for _ in df.columns])
+    insert_sql = f"INSERT INTO {table_name} VALUES ({placeholders})"
+
+    start = time.perf_counter()
+
+    # Oszloptömbök Python natív értékekké alakítva, soronkénti iterrows nélkül
+    columns = [sql_values(df[col]) for col in df.columns]
+    rows = zip(*columns)
+
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            break
+        cursor.executemany(insert_sql, batch)
+
+    elapsed = time.perf_counter() - start
+    rate = len(df) / elapsed if elapsed > 0 else 0
+    print(f"  📥 Adatok betöltve: {len(df)} sor ({elapsed:.2f} s, {rate:,.0f} sor/s)")
+
+
+def load_data_to_table_rowwise(cursor, table_name, df):
+    """Adatok betöltése táblába soronként - lassú, hibakereséshez"""
     # INSERT SQL
     placeholders = ', '.join(['?' for _ in df.columns])
     insert_sql = f"INSERT INTO {table_name} VALUES ({placeholders})"
 
-    # Adatok betöltése
-    for _, row in df.iterrows():
-        cursor.execute(insert_sql, tuple(row))
+    start = time.perf_counter()
 
-    print(f"  📥 Adatok betöltve: {len(df)} sor")
+    # Adatok betöltése (hiányzó érték: None)
+    for row in zip(*(sql_values(df[col]) for col in df.columns)):
+        cursor.execute(insert_sql, row)
 
+    elapsed = time.perf_counter() - start
+    rate = len(df) / elapsed if elapsed > 0 else 0
+    print(f"  📥 Adatok betöltve (soronként): {len(df)} sor ({elapsed:.2f} s, {rate:,.0f} sor/s)")
 
-def load_nf_tables_to_db(export_dir, db_path):
-    """Összes _NFdone tábla betöltése adatbázisba"""
-    nf_files = discover_nf_tables(export_dir)
-    print(f"🔍 {len(nf_files)} NF3 tábla betöltése...")
 
+def apply_load_pragmas(conn, pragmas=None):
+    """Betöltési PRAGMA-k beállítása (tranzakción kívül kell hívni)"""
+    pragmas = LOAD_PRAGMAS if pragmas is None else pragmas
+    for name, value in pragmas.items():
+        conn.execute(f"PRAGMA {name} = {value}")
+
+
+def layout_change_error(cursor, partition_months=False, panel_blocks=False):
+    """
+    Inkrementálisan nem váltható panel tárolás: havi partíciókra a meglévő egyetlen táblából vagy
+    blokkokból, blokkokra a havi partíciókból csak teljes újratöltéssel lehet áttérni
+
+    Returns:
+        str | None: hibaüzenet, ha a kért tárolás inkrementálisan nem állítható be, különben None
+    """
+    if partition_months:
+        if is_block_layout(cursor):
+            return (f"{PARTITIONED_TABLE}: blokkos tárolás - a havi partíciókhoz "
+                    f"teljes újratöltés szükséges (--tables replace)")
+        cursor.execute("SELECT type FROM sqlite_master WHERE name = ?", (PARTITIONED_TABLE,))
+        row = cursor.fetchone()
+        if row is not None and row[0] == 'table':
+            return (f"{PARTITIONED_TABLE}: nem particionált tábla - a havi partíciókhoz "
+                    f"teljes újratöltés szükséges (--tables replace)")
+    if panel_blocks and is_partitioned(cursor):
+        return (f"{PARTITIONED_TABLE}: havi partíciók - a blokkos tároláshoz "
+                f"teljes újratöltés szükséges (--tables replace)")
+    return None
+
+
+def check_panel_layout(db_path: str, write_mode: str, panel_blocks: bool = False,
+                       partition_months: bool = False):
+    """
+    A meglévő adatbázis ellenőrzése a feldolgozás előtt (layout_change_error), hogy a hiba ne csak
+    a betöltésnél derüljön ki
+
+    Returns:
+        str | None: hibaüzenet, vagy None, ha a betöltés indulhat
+    """
+    if write_mode != 'incremental' or not (panel_blocks or partition_months) or not os.path.exists(db_path):
+        return None
     conn = sqlite3.connect(db_path)
+    try:
+        return layout_change_error(conn.cursor(), partition_months, panel_blocks)
+    finally:
+        conn.close()
+
+
+def load_panel_partitions(cursor, df, schema, write_mode='replace', load_mode='bulk', batch_size=BULK_BATCH_SIZE,
+                          duplicate_keys='error'):
+    """Panel mérések betöltése havi partíciókba (panel_szam_NFdone_ÉÉÉÉ_HH) és a nézet frissítése
+
+    Teljes betöltésnél csak az adatban szereplő hónapok partíciói épülnek újra, a többi megmarad;
+    inkrementális betöltésnél havonként upsert.
+
+    Returns:
+        dict: {'inserted', 'updated', 'unchanged', 'changed_keys'} inkrementális betöltésnél, különben None
+    """
+    error = layout_change_error(cursor, partition_months=True) if write_mode == 'incremental' else None
+    if error:
+        raise ValueError(error)
+    if is_block_layout(cursor):
+        drop_block_layout(cursor)
+    cursor.execute("SELECT type FROM sqlite_master WHERE name = ?", (PARTITIONED_TABLE,))
+    row = cursor.fetchone()
+    if row is not None and row[0] == 'table':
+        cursor.execute(f"DROP TABLE {PARTITIONED_TABLE}")
+
+    months = split_by_month(df)
+    kept = sorted(set(list_partitions(cursor)) - {name for name, _ in months})
+    totals = {'inserted': 0, 'updated': 0, 'unchanged': 0, 'changed_keys': []}
+    for name, part in months:
+        print(f"  📅 Partíció: {name} ({len(part)} sor)")
+        if write_mode == 'incremental':
+            stats = upsert_table(cursor, name, part, TABLE_KEYS[PARTITIONED_TABLE], schema, batch_size,
+                                 duplicate_keys)
+            for key in totals:
+                totals[key] += stats[key]
+        else:
+            part = prepare_keyed_dataframe(name, part, duplicate_keys)
+            create_table_from_csv(cursor, name, schema)
+            if load_mode == 'row':
+                load_data_to_table_rowwise(cursor, name, part)
+            else:
+                load_data_to_table(cursor, name, part, batch_size)
+        create_secondary_indexes(cursor, name)
+
+    partitions = create_partition_view(cursor)
+    print(f"  🧩 {PARTITIONED_TABLE} nézet: {len(partitions)} havi partíció")
+    if kept and write_mode != 'incremental':
+        print(f"  ℹ️  Megtartott partíciók (nem szerepelnek az adatban): {', '.join(kept)}")
+    return totals if write_mode == 'incremental' else None
+
+
+def load_panel_blocks(cursor, df, schema, write_mode='replace', load_mode='bulk', batch_size=BULK_BATCH_SIZE,
+                      duplicate_keys='error'):
+    """Panel mérések betöltése blokkos tárolásba (panel_blokk tábla, felette panel_szam_NFdone nézet)
+
+    A mérések a munkatáblába kerülnek (inkrementálisan a kicsomagolt blokkokra upsert), az adag
+    hozzárendelés és az összesítők abból olvasnak, a blokkok a betöltés végén íródnak (store_panel_blocks).
+    A meglévő panel tábla helyére a nézet kerül; inkrementálisan előbb a tábla sorai kerülnek a munkatáblába.
+
+    Returns:
+        dict: {'inserted', 'updated', 'unchanged', 'changed_keys'} inkrementális betöltésnél, különben
+              (és a tábla átalakításakor) None
+    """
+    error = layout_change_error(cursor, panel_blocks=True) if write_mode == 'incremental' else None
+    if error:
+        raise ValueError(error)
+    if is_partitioned(cursor):
+        drop_partitioned_layout(cursor)
+
+    converted = False
+    cursor.execute("SELECT type FROM sqlite_master WHERE name = ?", (PARTITIONED_TABLE,))
+    row = cursor.fetchone()
+    if row is not None and row[0] == 'table':
+        if write_mode == 'incremental':
+            open_panel_blocks(cursor, unpack=False)
+            cursor.execute(f"INSERT INTO temp.{PARTITIONED_TABLE} (meres_idopont, hofok, panel_szam) "
+                           f"SELECT meres_idopont, hofok, panel_szam FROM main.{PARTITIONED_TABLE} "
+                           f"ORDER BY meres_idopont, panel_szam")
+            converted = True
+        cursor.execute(f"DROP TABLE main.{PARTITIONED_TABLE}")
+        print(f"  🧱 {PARTITIONED_TABLE}: a tábla helyett blokkos tárolás")
+    # A nézet már a betöltés előtt a tábla helyén áll (a munkatábla ugyanezen a néven a temp sémában)
+    create_block_table(cursor)
+    create_block_view(cursor)
+
+    if write_mode == 'incremental':
+        if not has_work_table(cursor):
+            open_panel_blocks(cursor)
+        stats = upsert_table(cursor, PARTITIONED_TABLE, df, TABLE_KEYS[PARTITIONED_TABLE], schema, batch_size,
+                             duplicate_keys)
+        return None if converted else stats
+
+    open_panel_blocks(cursor, unpack=False)
+    df = prepare_keyed_dataframe(PARTITIONED_TABLE, df, duplicate_keys)
+    if load_mode == 'row':
+        load_data_to_table_rowwise(cursor, f"temp.{PARTITIONED_TABLE}", df)
+    else:
+        load_data_to_table(cursor, f"temp.{PARTITIONED_TABLE}", df, batch_size)
+    return None
+
+
+def report_foreign_key_violations(cursor):
+    """Idegen kulcs sértések összesítése (betöltés közben a kényszerek nincsenek kikényszerítve)"""
+    cursor.execute("PRAGMA foreign_key_check")
+    violations = {}
+    for table, _, parent, _ in cursor.fetchall():
+        violations[(table, parent)] = violations.get((table, parent), 0) + 1
+
+    for (table, parent), count in violations.items():
+        print(f"  ⚠️  {table}: {count} sor hivatkozik hiányzó {parent} kulcsra")
+    return sum(violations.values())
+
+
+def staging_path(db_path):
+    """Az átmeneti adatbázis útvonala (db/data.db -> db/data.db.staging)"""
+    return db_path + STAGING_SUFFIX
+
+
+def remove_staging(db_path):
+    """Az átmeneti adatbázis (és esetleges napló fájljai) törlése"""
+    path = staging_path(db_path)
+    for suffix in ('', '-journal', '-wal', '-shm'):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+
+
+def open_staging(db_path):
+    """Átmeneti adatbázis nyitása: az élő adatbázis pillanatképe (ha van), tömeges betöltési beállításokkal
+
+    A pillanatkép miatt a betöltésben nem szereplő táblák (és a megtartott havi partíciók) is megmaradnak.
+    Az élő adatbázis kapcsolata a közzétételig nyitva marad, a PRAGMA data_version (amely csak más
+    kapcsolat commitjára változik) a pillanatkép ELŐTT olvasódik: ha közzétételkor eltér, a pillanatkép
+    óta - vagy a mentés alatt - más is írt (pl. egy --watch betöltés). A mentés közbeni commit így legfeljebb
+    fölösleges közvetlen újratöltést okoz, elveszni nem veszhet.
+
+    Returns:
+        tuple: (átmeneti kapcsolat, élő kapcsolat, data_version a pillanatkép előtt)
+    """
+    remove_staging(db_path)
+    conn = sqlite3.connect(staging_path(db_path), isolation_level=None)
+    live = sqlite3.connect(db_path, isolation_level=None)
+    try:
+        live.execute(f"PRAGMA busy_timeout = {LOAD_PRAGMAS['busy_timeout']}")
+        version = live.execute("PRAGMA data_version").fetchone()[0]
+        live.backup(conn)
+    except Exception:
+        live.close()
+        conn.close()
+        raise
+    apply_load_pragmas(conn, STAGING_PRAGMAS)
+    return conn, live, version
+
+
+def publish_staging(conn, live, version, db_path):
+    """Az átmeneti adatbázis közzététele az élő adatbázisba, egyetlen írási tranzakcióban (backup API)
+
+    WAL módban az olvasók közben a korábbi pillanatképet látják, nem kapnak 'database is locked' hibát,
+    a commit után pedig a teljes új állapotot. Fájl átnevezés helyett: WAL mellett a -wal / -shm
+    fájlok a régi adatbázishoz tartoznának. Ha a data_version a pillanatkép előtti értékhez képest
+    változott (más kapcsolat írt az élő adatbázisba), a közzététel elmarad (az a változás elveszne),
+    az élő adatbázis változatlan. A vizsgálat és a mentés írási zárja közötti rövid rés ellen ez nem véd.
+
+    Returns:
+        bool: közzétéve-e
+    """
+    start = time.perf_counter()
+    apply_load_pragmas(live)
+    if live.execute("PRAGMA data_version").fetchone()[0] != version:
+        print(f"\n⚠️  Az élő adatbázist a betöltés közben más is írta, az átmeneti adatbázis nem tehető közzé")
+        return False
+    conn.backup(live)
+    # Az olvasókat nem várja meg: ami most nem fér bele, a következő checkpoint viszi át
+    live.execute("PRAGMA wal_checkpoint(PASSIVE)")
+    print(f"\n🔀 Közzétéve: {db_path} ({time.perf_counter() - start:.2f} s)")
+    return True
+
+
+def load_nf_tables_to_db(export_dir, db_path, load_mode='bulk', batch_size=BULK_BATCH_SIZE,
+                         write_mode='replace', nf_files=None, panel_blocks=False, partition_months=False,
+                         staging=True, duplicate_keys='error'):
+    """Összes _NFdone tábla betöltése adatbázisba
+
+    load_mode: 'bulk' (executemany, egy tranzakció) vagy 'row' (soronkénti, hibakereséshez)
+    write_mode: 'replace' (tábla újraépítése) vagy 'incremental' (upsert természetes kulcs alapján)
+    nf_files: betöltendő fájlok listája (alapértelmezett: minden _NFdone fájl az export mappában)
+    panel_blocks: a panel mérések blokkos tárolása (lásd load_tables_to_db)
+    partition_months: a panel mérések havi partíciókba (lásd load_tables_to_db)
+    staging: teljes betöltés átmeneti adatbázisban, majd közzététel (lásd load_tables_to_db)
+    duplicate_keys: kulcsütköző sorok kezelése (DUPLICATE_KEY_MODES)
+    """
+    if nf_files is None:
+        nf_files = discover_nf_tables(export_dir)
+    print(f"🔍 {len(nf_files)} NF3 tábla betöltése...")
+
+    # A fájlokat egyenként, betöltés közben olvassuk be
+    tables = ((nf_table_name(nf_file), lambda nf_file=nf_file: read_nf_file(export_dir, nf_file))
+              for nf_file in nf_files)
+
+    return load_tables_to_db(tables, db_path, load_mode, batch_size, write_mode, panel_blocks=panel_blocks,
+                             partition_months=partition_months, staging=staging, duplicate_keys=duplicate_keys)
+
+
+def read_nf_file(export_dir, nf_file):
+    """_NFdone fájl beolvasása (típusos: a DTYPE_RULES szerint)"""
+    file_path = os.path.join(export_dir, nf_file)
+    df = read_typed_table(file_path)
+    log_frame_memory(df, "beolvasva")
+    return df
+
+
+def load_tables_to_db(tables, db_path, load_mode='bulk', batch_size=BULK_BATCH_SIZE, write_mode='replace',
+                      analyze=True, panel_blocks=False, partition_months=False, staging=True, duplicate_keys='error'):
+    """Táblák betöltése adatbázisba közvetlenül DataFrame-ekből
+
+    Args:
+        tables: dict (táblanév -> DataFrame), vagy (táblanév, DataFrame | DataFrame-et adó függvény) párok
+        db_path: adatbázis útvonala
+        load_mode: 'bulk' (executemany, egy tranzakció) vagy 'row' (soronkénti, hibakereséshez)
+        write_mode: 'replace' (tábla újraépítése) vagy 'incremental' (upsert a TABLE_KEYS kulcsai alapján)
+        analyze: ANALYZE a betöltés végén (gyakori kis betöltéseknél elég a PRAGMA optimize)
+        panel_blocks: a panel mérések tömörített blokkos tárolása (panel_blokk tábla, a panel tábla helyén
+                      nézet); blokkos adatbázisba az inkrementális betöltés enélkül is blokkokba ír,
+                      a teljes újratöltés enélkül visszaállítja a táblát
+        partition_months: a panel mérések havi partíciókba (panel_szam_NFdone_ÉÉÉÉ_HH, felettük nézet);
+                          meglévő partíciókba az inkrementális betöltés enélkül is havonta ír
+        staging: teljes (replace) betöltésnél az élő adatbázis pillanatképébe tölt (data.db.staging,
+                 gyors, nem tartós beállításokkal), és a kész állapotot egyben teszi közzé; ha közben
+                 más is írta az élő adatbázist, közzététel helyett közvetlenül tölt újra;
+                 inkrementális betöltés közvetlenül, egy WAL tranzakcióban (BEGIN IMMEDIATE) írja az
+                 élő adatbázist
+        duplicate_keys: egy táblán belüli kulcsütköző sorok: 'error' (alapértelmezett: hiba, semmi nem
+                        íródik), 'last' / 'first' (kulcsonként az utolsó / első sor marad, DUPLICATE_KEY_MODES)
+
+    Returns:
+        int: betöltött táblák száma
+    """
+    if batch_size < 1:
+        raise ValueError(f"Érvénytelen kötegméret: {batch_size} (legalább 1)")
+    if isinstance(tables, dict):
+        tables = tables.items()
+
+    # Szülő táblák előbb (a betöltők lusták, a rendezés nem olvas be adatot)
+    tables = sorted(tables, key=lambda item: load_order(item[0]))
+
+    # Explicit tranzakciókezelés: a teljes betöltés egyetlen tranzakció
+    staged = staging and write_mode == 'replace'
+    live = None
+    if staged:
+        print(f"🏗️  Betöltés átmeneti adatbázisba: {staging_path(db_path)}")
+        conn, live, live_version = open_staging(db_path)
+    else:
+        conn = sqlite3.connect(db_path, isolation_level=None)
+        apply_load_pragmas(conn)
     cursor = conn.cursor()
 
-    for nf_file in nf_files:
-        print(f"\n🎯 {nf_file}")
+    table_count = 0
+    total_rows = 0
+    changed_tables = {}  # táblanév -> None (újratöltve) vagy a változott sorok első kulcsai
+    upsert_totals = {'inserted': 0, 'updated': 0, 'unchanged': 0}
+    start = time.perf_counter()
+
+    published = True
+    try:
+        # Az élő adatbázisban azonnali írási zár: a párhuzamos író (pl. --watch) megvárja, nem ír közbe
+        cursor.execute("BEGIN" if staged else "BEGIN IMMEDIATE")
+
+        # Blokkos tárolásnál az adag hozzárendelés / összesítők a kicsomagolt mérésekből olvasnak
+        # (teljes újratöltéskor a panel tábla úgyis újra töltődik); a panel tábla melletti régi blokk másolat eldobódik
+        names = {table_name for table_name, _ in tables}
+        block_layout = is_block_layout(cursor)
+        if table_exists(cursor, BLOCK_TABLE) and not block_layout:
+            drop_block_layout(cursor)
+            print(f"ℹ️  A panel tábla melletti régi {BLOCK_TABLE} másolat eldobva")
+        if (block_layout and names & set(HEAT_MAP_SOURCES)
+                and not (write_mode == 'replace' and PARTITIONED_TABLE in names)):
+            open_panel_blocks(cursor)
+
+        for table_name, df in tables:
+            print(f"\n🎯 {table_name}")
+
+            if callable(df):
+                df = df()
+
+            table_count += 1
+            total_rows += len(df)
+
+            # Tárolási típusok (időpontok epoch másodpercként, összevont dátum + idő oszlopok)
+            schema = infer_schema(table_name, df)
+            df = convert_to_schema(df, schema, table_name)
 
-        # Beolvasás
-        file_path = os.path.join(export_dir, nf_file)
-        df = pd.read_csv(file_path, delimiter=';', encoding='utf-8-sig')
+            # Havi partíciók, illetve blokkos tárolás (választható; a meglévő elrendezésbe inkrementálisan
+            # kapcsoló nélkül is)
+            layout_loader = None
+            if table_name == PARTITIONED_TABLE and (partition_months or (write_mode == 'incremental'
+                                                                         and is_partitioned(cursor))):
+                layout_loader = load_panel_partitions
+            elif table_name == PARTITIONED_TABLE and (panel_blocks or (write_mode == 'incremental' and block_layout)):
+                layout_loader = load_panel_blocks
+            if layout_loader is not None:
+                stats = layout_loader(cursor, df, schema, write_mode, load_mode, batch_size, duplicate_keys)
+                if stats is None:
+                    changed_tables[table_name] = None
+                    continue
+                for key in upsert_totals:
+                    upsert_totals[key] += stats[key]
+                if stats['inserted'] or stats['updated']:
+                    changed_tables[table_name] = stats['changed_keys']
+                continue
+            if table_name == PARTITIONED_TABLE and is_partitioned(cursor):
+                drop_partitioned_layout(cursor)
+            if table_name == PARTITIONED_TABLE and is_block_layout(cursor):
+                drop_block_layout(cursor)
+                print(f"  🗑️  Blokkos tárolás eldobva ({PARTITIONED_TABLE} újra egyetlen tábla)")
 
-        # Tábla neve (.csv nélkül)
-        table_name = nf_file.replace('.csv', '')
+            # Inkrementális betöltés, ha a táblának van természetes kulcsa
+            if write_mode == 'incremental' and table_name in TABLE_KEYS:
+                if df.empty:
+                    print("  ℹ️  Nincs betöltendő sor")
+                    continue
+                stats = upsert_table(cursor, table_name, df, TABLE_KEYS[table_name], schema, batch_size,
+                                     duplicate_keys)
+                for key in upsert_totals:
+                    upsert_totals[key] += stats[key]
+                if stats['inserted'] or stats['updated']:
+                    changed_tables[table_name] = stats['changed_keys']
+                create_secondary_indexes(cursor, table_name)
+                continue
+            if write_mode == 'incremental':
+                print(f"  ℹ️  Nincs természetes kulcs ({table_name}) → teljes újratöltés")
 
-        # Tábla létrehozás és adatbetöltés
-        create_table_from_csv(cursor, table_name, df)
-        load_data_to_table(cursor, table_name, df)
+            # Tábla létrehozás és adatbetöltés, a másodlagos indexek csak utána
+            df = prepare_keyed_dataframe(table_name, df, duplicate_keys)
+            create_table_from_csv(cursor, table_name, schema)
+            if load_mode == 'row':
+                load_data_to_table_rowwise(cursor, table_name, df)
+            else:
+                load_data_to_table(cursor, table_name, df, batch_size)
+            create_secondary_indexes(cursor, table_name)
+            changed_tables[table_name] = None
+
+        # Mérés -> adag hozzárendelés, ha az adagok vagy a mérések változtak
+        if set(changed_tables) & set(HEAT_MAP_SOURCES):
+            print("\n🎯 Adag hozzárendelés")
+            # Csak új / módosított mérések esetén elég azok időpontjait hozzárendelni
+            heats_changed = any(table in changed_tables for table in HEAT_MAP_SOURCES[:2])
+            build_heat_map(cursor, None if heats_changed else changed_tables['panel_szam_NFdone'])
+
+        # Panel hőmérséklet összesítők (perc / óra / nap / adag)
+        if changed_tables:
+            print("\n🎯 Összesítők")
+            update_rollups(cursor, changed_tables)
+
+        # Blokkos tárolásnál a munkatábla visszaírása blokkokba (csak a változott napok)
+        if has_work_table(cursor):
+            print("\n🎯 Panel blokkok")
+            store_panel_blocks(cursor, changed_tables)
+
+        cursor.execute("COMMIT")
+
+        # Idegen kulcs sértések jelentése és statisztika a lekérdezés tervezőnek
+        report_foreign_key_violations(cursor)
+        if analyze:
+            cursor.execute("ANALYZE")
+            print("\n📈 ANALYZE kész")
+        else:
+            cursor.execute("PRAGMA optimize")
+
+        if staged:
+            published = publish_staging(conn, live, live_version, db_path)
+
+    except Exception:
+        # Napló nélküli átmeneti adatbázisnál nincs visszagörgetés: a fájl eldobódik, az élő változatlan
+        if conn.in_transaction and not staged:
+            cursor.execute("ROLLBACK")
+        conn.close()
+        if staged:
+            live.close()
+            remove_staging(db_path)
+        raise
 
-    conn.commit()
     conn.close()
-    print(f"\n✅ KÉSZ! {len(nf_files)} tábla betöltve.")
+    if staged:
+        live.close()
+        remove_staging(db_path)
+    if not published:
+        # A másik író változása megmarad: a betöltés újra, közvetlenül az élő adatbázisba, írási zár alatt
+        print("🔁 Betöltés újra, közvetlenül az élő adatbázisba")
+        return load_tables_to_db(tables, db_path, load_mode, batch_size, write_mode, analyze, panel_blocks,
+                                 partition_months, staging=False, duplicate_keys=duplicate_keys)
+
+    elapsed = time.perf_counter() - start
+    rate = total_rows / elapsed if elapsed > 0 else 0
+    print(f"\n✅ KÉSZ! {table_count} tábla betöltve.")
+    print(f"⏱️  {total_rows} sor {elapsed:.2f} s alatt ({rate:,.0f} sor/s)")
+    if write_mode == 'incremental':
+        print(f"🔁 Összesen: {upsert_totals['inserted']} új, {upsert_totals['updated']} módosított, "
+              f"{upsert_totals['unchanged']} változatlan sor")
+    return table_count
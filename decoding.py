@@ -1,11 +1,40 @@
 import os
+import re
+import json
+import mmap
+import codecs
+import hashlib
+import unicodedata
+import numpy as np
 import pandas as pd
 import chardet
+from storage import table_extension, write_table
+from dtype_policy import typed_read_csv
 
 
-def decode_csv_file(input_file_path: str, output_dir: str) -> str:
+# Átkódolás blokkmérete bájtban (a memóriahasználat a fájlmérettől független)
+TRANSCODE_CHUNK_SIZE = 1024 * 1024
+
+# Kódolás felismerés jelöltjei (a kézi választás is ezek közül kínál)
+CANDIDATE_ENCODINGS = ['latin2', 'cp852', 'cp1250', 'utf-8']
+
+# Felismeréshez vett minták: a fájl elejéről, közepéről és végéről ennyi bájt
+DETECTION_SAMPLE_SIZE = 64 * 1024
+
+# Magyar ékezetes betűk; az ő/ű/Ő/Ű bájtpozíciója különbözteti meg a kódlapokat
+HUNGARIAN_LETTERS = 'áéíóöúüÁÉÍÓÖÚÜ'
+HUNGARIAN_DISTINCTIVE = 'őűŐŰ'
+
+ENCODING_CACHE_FILENAME = 'encoding_cache.json'
+
+
+def decode_csv_file(input_file_path: str, output_dir: str, encoding: str = None, fmt: str = 'csv') -> str:
     """
-    CSV fájl dekódolása és mentése UTF-8-BOM formátumban
+    CSV fájl dekódolása és mentése UTF-8-BOM formátumban (vagy parquet / feather formátumban)
+
+    Args:
+        encoding: előre eldöntött kódolás - megadása esetén nincs felismerés és kérdés
+        fmt: a kimeneti fájl formátuma ('csv', 'parquet', 'feather')
     """
 
     if not os.path.exists(input_file_path):
@@ -17,16 +46,225 @@ def decode_csv_file(input_file_path: str, output_dir: str) -> str:
 
     # Kimeneti fájlnév generálása
     original_filename = os.path.basename(input_file_path)
-    name_without_ext = os.path.splitext(original_filename)[0]
-    output_filename = f"{name_without_ext}_decoded.csv"
+    output_filename = decoded_filename(original_filename, fmt)
     output_file_path = os.path.join(output_dir, output_filename)
 
     print(f"📥 Bemeneti: {original_filename}")
     print(f"📤 Kimeneti: {output_filename}")
 
+    # CSV kimenethez nincs szükség DataFrame-re: közvetlen átkódolás
+    if fmt == 'csv':
+        selected_encoding = encoding or select_file_encoding(input_file_path)
+        if not selected_encoding:
+            return ""
+
+        print(f"\n2. Átkódolás {selected_encoding} → UTF-8-BOM...")
+        try:
+            columns, rows = transcode_csv_file(input_file_path, output_file_path, selected_encoding)
+        except (UnicodeError, ValueError) as e:
+            if os.path.exists(output_file_path):
+                os.remove(output_file_path)
+            print(f"✗ Hiba az átkódolás során: {e}")
+            return ""
+
+        print(f"\n✓ Adatok exportálva: {output_file_path}")
+        print(f"   Végeredmény: {rows} sor, {len(columns)} oszlop")
+        print(f"   Kódolás: UTF-8-BOM (Excel kompatibilis)")
+
+        print("\nAdatok előnézete:")
+        show_file_preview(output_file_path, 'utf-8-sig')
+        return output_file_path
+
+    df = decode_csv_to_dataframe(input_file_path, encoding)
+    if df is None:
+        return ""
+
+    # 3. Mentés parquet / feather formátumban
+    try:
+        write_table(df, output_file_path)
+        print(f"\n✓ Adatok exportálva: {output_file_path}")
+        print(f"   Végeredmény: {len(df)} sor, {len(df.columns)} oszlop")
+        print(f"   Formátum: {fmt}")
+        return output_file_path
+
+    except Exception as e:
+        print(f"✗ Hiba az exportálás során: {e}")
+        return ""
+
+
+def iter_file_chunks(input_file_path: str, chunk_size: int = TRANSCODE_CHUNK_SIZE):
+    """Fájl bájtjai fix méretű blokkokban (memóriába képezve, ha lehetséges)"""
+    with open(input_file_path, 'rb') as file:
+        try:
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (ValueError, OSError):
+            # Üres fájl vagy nem képezhető le (pl. pipe) → hagyományos olvasás
+            mapped = None
+
+        if mapped is None:
+            for chunk in iter(lambda: file.read(chunk_size), b''):
+                yield chunk
+            return
+
+        with mapped:
+            for offset in range(0, len(mapped), chunk_size):
+                yield mapped[offset:offset + chunk_size]
+
+
+def check_header(header_line: str) -> list:
+    """
+    Fejléc ellenőrzése átkódolás közben
+
+    Returns:
+        list: oszlopnevek
+
+    Raises:
+        ValueError: üres vagy hiányos fejléc esetén
+    """
+    columns = [column.strip() for column in header_line.rstrip('\r\n').split(';')]
+    if not any(columns):
+        raise ValueError("üres fejléc sor")
+    if not all(columns):
+        print(f"⚠️  Üres oszlopnév a fejlécben: {columns}")
+    return columns
+
+
+def transcode_csv_file(input_file_path: str, output_file_path: str, encoding: str,
+                       chunk_size: int = TRANSCODE_CHUNK_SIZE):
+    """
+    CSV fájl átkódolása UTF-8-BOM kódolásra DataFrame nélkül
+
+    A bájtokat fix méretű blokkokban, inkrementális dekóderen és enkóderen át írja ki,
+    így a memóriahasználat állandó, a mezők tartalma (pl. számformátum) változatlan marad.
+    A fejlécet az első sor beérkezésekor ellenőrzi.
+
+    Returns:
+        tuple: (oszlopnevek, adatsorok száma)
+
+    Raises:
+        UnicodeDecodeError: ha a fájl nem dekódolható a megadott kódolással
+        ValueError: ha a fejléc hibás
+    """
+    decoder = codecs.getincrementaldecoder(encoding)(errors='strict')
+    encoder = codecs.getincrementalencoder('utf-8')()
+
+    columns = None
+    header = ''
+    line_count = 0
+    last_char = '\n'
+
+    with open(output_file_path, 'wb') as output:
+        output.write(codecs.BOM_UTF8)
+
+        for chunk in iter_file_chunks(input_file_path, chunk_size):
+            text = decoder.decode(chunk)
+            if not text:
+                continue
+
+            if columns is None:
+                # Forrásbeli BOM eldobása (pl. utf-8 kódolásnak jelölt utf-8-sig fájl)
+                if not header:
+                    text = text.lstrip('\ufeff')
+                header += text
+                if '\n' not in header:
+                    continue
+                columns = check_header(header[:header.index('\n')])
+                text, header = header, ''
+
+            line_count += text.count('\n')
+            last_char = text[-1]
+            output.write(encoder.encode(text))
+
+        text = decoder.decode(b'', final=True)
+        if columns is None:
+            text = header + text
+            columns = check_header(text)
+        if text:
+            line_count += text.count('\n')
+            last_char = text[-1]
+        output.write(encoder.encode(text, final=True))
+
+    # Az utolsó sor sortörés nélkül is adatsor
+    if last_char != '\n':
+        line_count += 1
+
+    return columns, max(line_count - 1, 0)
+
+
+def decoded_filename(original_filename: str, fmt: str = 'csv') -> str:
+    """Dekódolt fájl neve (_decoded utótaggal)"""
+    name_without_ext = os.path.splitext(original_filename)[0]
+    return f"{name_without_ext}_decoded{table_extension(fmt)}"
+
+
+def decode_csv_to_dataframe(input_file_path: str, encoding: str = None):
+    """
+    CSV fájl dekódolása DataFrame-be, fájlba írás nélkül
+
+    Args:
+        encoding: előre eldöntött kódolás - megadása esetén nincs felismerés és kérdés
+
+    Returns:
+        DataFrame, vagy None hiba esetén
+    """
+    if not os.path.exists(input_file_path):
+        print(f"✗ A fájl nem található: {input_file_path}")
+        return None
+
+    selected_encoding = encoding or select_file_encoding(input_file_path)
+
+    if not selected_encoding:
+        return None
+
+    # 2. Adatok beolvasása kiválasztott kódolással
+    print(f"\n2. Adatok beolvasása {selected_encoding} kódolással...")
+    try:
+        # Típusos beolvasás (DTYPE_RULES): datetime64 időpontok, float32 hőfokok, kategória / pyarrow szövegek
+        df = typed_read_csv(input_file_path, delimiter=';', encoding=selected_encoding)
+        print(f"✓ Beolvasva: {len(df)} sor, {len(df.columns)} oszlop")
+
+        # Adatok előnézete
+        print("\nAdatok előnézete:")
+        print(f"Oszlopnevek: {list(df.columns)}")
+        if len(df) > 0:
+            print(f"Első sor: {df.iloc[0].tolist()}")
+
+        return df
+
+    except Exception as e:
+        print(f"✗ Hiba a beolvasás során: {e}")
+        return None
+
+
+def select_file_encoding(input_file_path: str, cache: dict = None, policy: dict = None) -> str:
+    """
+    Fájl kódolásának megállapítása (gyorsítótárból, automatikus, szükség esetén kézi)
+
+    Args:
+        cache: kódolás gyorsítótár (load_encoding_cache) - ismert fájlnál / feednél nincs felismerés
+        policy: batch futás szabályai (policy.load_policy) - kérdés és kilépés helyett
+                a policy['encoding_order'] sorrend dönt
+    """
+    min_confidence = policy['min_confidence'] if policy else 0.99
+
+    try:
+        samples = read_detection_sample(input_file_path)
+    except OSError as e:
+        print(f"✗ A fájl nem olvasható: {e}")
+        return ""
+
+    if cache is not None:
+        known, origin = cached_encoding(cache, input_file_path, samples)
+        if known:
+            print(f"✓ Ismert kódolás ({origin} alapján): {known}")
+            return known
+
     # 1. Kódolás automatikus felismerése
     print("\n1. Kódolás automatikus felismerése...")
-    detected_encoding, confidence = detect_encoding_with_chardet(input_file_path)
+    detected_encoding, confidence = detect_encoding_fast(input_file_path, samples)
+    if not detected_encoding:
+        # Egyik jelölt sem illik → chardet általános felismerés
+        detected_encoding, confidence = detect_encoding_with_chardet(input_file_path)
 
     if detected_encoding:
         print(f"✓ Automatikus felismerés: {detected_encoding}")
@@ -37,9 +275,12 @@ def decode_csv_file(input_file_path: str, output_dir: str) -> str:
         show_file_preview(input_file_path, detected_encoding)
 
         # DÖNTÉSI PONT: 99%+ megbízhatóság esetén automatikusan elfogadjuk
-        if confidence >= 0.99:
-            print("🎯 99%+ megbízhatóság → automatikus elfogadás")
+        if confidence >= min_confidence:
+            print(f"🎯 {min_confidence:.0%}+ megbízhatóság → automatikus elfogadás")
             selected_encoding = detected_encoding
+        elif policy:
+            print(f"⚠️  Alacsony megbízhatóság ({confidence:.1%}) → választás a beállított sorrend szerint")
+            selected_encoding = select_encoding_by_policy(samples, policy)
         else:
             print(f"⚠️  Alacsony megbízhatóság ({confidence:.1%}) → kézi választás szükséges")
             response = input("\nSzeretnéd használni az automatikusan felismert kódolást? (i/n): ").strip().lower()
@@ -49,41 +290,305 @@ def decode_csv_file(input_file_path: str, output_dir: str) -> str:
                 print("🚪 Program leáll...")
                 exit(1)
             else:
-                selected_encoding = select_encoding_manual(input_file_path)
+                selected_encoding = select_encoding_manual(input_file_path, samples)
+    elif policy:
+        print("✗ Automatikus felismerés sikertelen, választás a beállított sorrend szerint...")
+        selected_encoding = select_encoding_by_policy(samples, policy)
     else:
         print("✗ Automatikus felismerés sikertelen, kézi választás...")
-        selected_encoding = select_encoding_manual(input_file_path)
+        selected_encoding = select_encoding_manual(input_file_path, samples)
 
-    if not selected_encoding:
-        return ""
+    if cache is not None and selected_encoding:
+        remember_encoding(cache, input_file_path, selected_encoding, samples)
 
-    # 2. Adatok beolvasása kiválasztott kódolással
-    print(f"\n2. Adatok beolvasása {selected_encoding} kódolással...")
+    return selected_encoding
+
+
+def read_detection_sample(input_file_path: str, sample_size: int = DETECTION_SAMPLE_SIZE) -> list:
+    """
+    Minták a fájl elejéről, közepéről és végéről (kis fájlnál a teljes tartalom)
+
+    Ha a három minta tisztán ASCII, a fájl többi része is átnéződik: az első nem ASCII bájt körüli
+    ablak negyedik mintaként kerül a listába (így a mintákon kívüli ékezetes szöveg sem marad rejtve).
+    Ha nincs ilyen, a teljes fájl ASCII.
+
+    Returns:
+        list: bájt minták (az első mindig a fájl eleje)
+    """
+    with open(input_file_path, 'rb') as file:
+        size = os.fstat(file.fileno()).st_size
+        if size <= 3 * sample_size:
+            return [file.read()]
+
+        samples = []
+        for offset in (0, (size - sample_size) // 2, size - sample_size):
+            file.seek(offset)
+            samples.append(file.read(sample_size))
+
+    if all(sample.isascii() for sample in samples):
+        window = first_non_ascii_window(input_file_path, sample_size)
+        if window:
+            samples.append(window)
+    return samples
+
+
+def first_non_ascii_window(input_file_path: str, sample_size: int = DETECTION_SAMPLE_SIZE) -> bytes:
+    """
+    Az első nem ASCII bájttól induló sample_size méretű ablak (b'', ha a teljes fájl ASCII)
+
+    Az ablak néhány bájttal előbb kezdődik, hogy egy több bájtos UTF-8 karakter eleje is benne legyen.
+    """
+    position = 0
+    for chunk in iter_file_chunks(input_file_path):
+        if not chunk.isascii():
+            high = np.flatnonzero(np.frombuffer(chunk, dtype=np.uint8) >= 0x80)[0]
+            start = max(position + int(high) - 3, 0)
+            with open(input_file_path, 'rb') as file:
+                file.seek(start)
+                return file.read(sample_size)
+        position += len(chunk)
+    return b''
+
+
+def byte_weights(encoding: str) -> np.ndarray:
+    """
+    A 0x80-0xFF bájtok súlya egy kódolásban: magyar betű pozitív, doboz rajzoló és egyéb karakter negatív
+
+    A nem dekódolható és a vezérlő karakterre (pl. latin2 0x80-0x9F) fordított bájtok súlya NaN:
+    ha előfordulnak, a kódolás kiesik.
+    """
+    weights = np.zeros(256)
+    for value in range(0x80, 0x100):
+        try:
+            char = bytes([value]).decode(encoding)
+        except UnicodeDecodeError:
+            char = None
+
+        if char is None or unicodedata.category(char) == 'Cc':
+            weights[value] = np.nan
+        elif char in HUNGARIAN_DISTINCTIVE:
+            weights[value] = 3
+        elif char in HUNGARIAN_LETTERS:
+            weights[value] = 2
+        elif char == '°':
+            weights[value] = 1
+        elif '\u2500' <= char <= '\u259f':  # doboz rajzoló és blokk karakterek
+            weights[value] = -3
+        else:
+            weights[value] = -1
+    return weights
+
+
+# A jelöltek súlytáblái (egyszer számolva)
+BYTE_WEIGHTS = {encoding: byte_weights(encoding) for encoding in CANDIDATE_ENCODINGS if encoding != 'utf-8'}
+
+
+def is_valid_utf8(samples: list) -> bool:
+    """A minták szigorúan dekódolhatók-e UTF-8-ként (a minta határán kettévágott karakter nem hiba)"""
+    for index, sample in enumerate(samples):
+        if index > 0:
+            # Belső mintánál az elejére eső folytatóbájtok átugrása
+            start = 0
+            while start < min(len(sample), 3) and 0x80 <= sample[start] <= 0xBF:
+                start += 1
+            sample = sample[start:]
+        try:
+            codecs.getincrementaldecoder('utf-8')(errors='strict').decode(sample, final=False)
+        except UnicodeDecodeError:
+            return False
+    return True
+
+
+def sample_histogram(samples: list) -> np.ndarray:
+    """A minták bájt-hisztogramja (256 elemű darabszám tömb)"""
+    histogram = np.zeros(256, dtype=np.int64)
+    for sample in samples:
+        histogram += np.bincount(np.frombuffer(sample, dtype=np.uint8), minlength=256)
+    return histogram
+
+
+def encoding_weights(encoding: str):
+    """A kódolás súlytáblája a BYTE_WEIGHTS-ből (álnévvel megadva is, pl. iso8859-2); None, ha nincs"""
+    codec = codecs.lookup(encoding).name
+    return next((table for name, table in BYTE_WEIGHTS.items() if codecs.lookup(name).name == codec), None)
+
+
+def detect_encoding_fast(input_file_path: str, samples: list = None):
+    """
+    Kódolás felismerése a mintavételezett bájtok egyetlen bájt-hisztogramjából
+
+    A jelöltek (latin2, cp852, cp1250) pontszáma a hisztogram és a kódolás súlytáblájának szorzata;
+    a latin2-vel bájtonként azonos eredményt adó cp1250 nem versenytárs. Érvényes, nem ASCII UTF-8
+    minta esetén az UTF-8 nyer.
+
+    Returns:
+        tuple: (kódolás, megbízhatóság) vagy ("", 0) ha egyik jelölt sem valószínű
+    """
     try:
-        df = pd.read_csv(input_file_path, delimiter=';', encoding=selected_encoding)
-        print(f"✓ Beolvasva: {len(df)} sor, {len(df.columns)} oszlop")
+        samples = samples if samples is not None else read_detection_sample(input_file_path)
+    except OSError as e:
+        print(f"   Hiba: {e}")
+        return "", 0
 
-        # Adatok előnézete
-        print("\nAdatok előnézete:")
-        print(f"Oszlopnevek: {list(df.columns)}")
-        if len(df) > 0:
-            print(f"Első sor: {df.iloc[0].tolist()}")
+    if samples[0].startswith(codecs.BOM_UTF8):
+        return 'utf-8-sig', 1.0
 
-    except Exception as e:
-        print(f"✗ Hiba a beolvasás során: {e}")
-        return ""
+    histogram = sample_histogram(samples)
+    present = histogram > 0
+    high_bytes = present[0x80:].any()
+
+    if not high_bytes:
+        # Tisztán ASCII minta: a read_detection_sample a mintákon kívül is keres nem ASCII bájtot,
+        # így ez a teljes fájlra igaz - UTF-8-ként (és bármely jelölttel) azonos szöveg
+        return 'utf-8', 1.0
+
+    if is_valid_utf8(samples):
+        return 'utf-8', 1.0
+
+    scores = {}
+    for encoding, weights in BYTE_WEIGHTS.items():
+        if np.isnan(weights[present]).any():
+            continue  # előforduló, de nem dekódolható (vagy vezérlő karakterre forduló) bájt
+        scores[encoding] = float((histogram * np.nan_to_num(weights)).sum())
+
+    if not scores:
+        return "", 0
 
-    # 3. Mentés UTF-8-SIG kódolással
+    ranked = sorted(scores, key=lambda encoding: (-scores[encoding], CANDIDATE_ENCODINGS.index(encoding)))
+    best = ranked[0]
+    if scores[best] <= 0:
+        return "", 0
+
+    # A legjobbal azonos karaktereket adó kódolás nem számít versenytársnak
+    high_present = np.flatnonzero(present[0x80:]) + 0x80
+    best_chars = bytes(high_present.tolist()).decode(best)
+    rivals = [scores[encoding] for encoding in ranked[1:]
+              if bytes(high_present.tolist()).decode(encoding) != best_chars]
+
+    runner_up = max(rivals, default=0)
+    confidence = 1.0 - max(runner_up, 0) / scores[best]
+    return best, confidence
+
+
+def source_system(input_file_path: str) -> str:
+    """Forrásrendszer (feed) neve a fájlnévből, a dátum / sorszám utótag nélkül (pl. Hutopanelek_2024_05 → Hutopanelek)"""
+    name = os.path.splitext(os.path.basename(input_file_path))[0]
+    return re.sub(r'[\s_\-.]*\d[\d\s_\-.]*$', '', name) or name
+
+
+def load_encoding_cache(db_dir: str) -> dict:
+    """
+    Kódolás gyorsítótár betöltése (a db mappában)
+
+    Returns:
+        dict: {'path', 'files': {útvonal: méret, mtime, minta hash, kódolás}, 'hashes': {minta hash: kódolás},
+               'sources': {forrásrendszer: kódolás}}
+    """
+    cache = {'path': os.path.join(db_dir, ENCODING_CACHE_FILENAME), 'files': {}, 'hashes': {}, 'sources': {}}
+    if os.path.exists(cache['path']):
+        try:
+            with open(cache['path'], 'r', encoding='utf-8') as file:
+                stored = json.load(file)
+            for section in ('files', 'hashes', 'sources'):
+                cache[section] = stored.get(section, {})
+        except (OSError, ValueError) as e:
+            print(f"⚠️  A kódolás gyorsítótár nem olvasható, újraépül: {e}")
+    return cache
+
+
+def save_encoding_cache(cache: dict) -> None:
+    """Kódolás gyorsítótár mentése (atomikus cserével)"""
+    db_dir = os.path.dirname(cache['path'])
+    if not os.path.exists(db_dir):
+        os.makedirs(db_dir)
+
+    tmp_path = cache['path'] + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as file:
+        json.dump({section: cache[section] for section in ('files', 'hashes', 'sources')}, file,
+                  ensure_ascii=False, indent=2)
+    os.replace(tmp_path, cache['path'])
+
+
+def sample_hash(samples: list, size: int) -> str:
+    """A fájlméret és a minták együttes hash-e (tartalom azonosító a gyorsítótárhoz)"""
+    digest = hashlib.sha256(str(size).encode('ascii'))
+    for sample in samples:
+        digest.update(sample)
+    return digest.hexdigest()
+
+
+def decodes_strictly(samples: list, encoding: str) -> bool:
+    """A minták hibátlanul dekódolhatók-e a megadott kódolással"""
+    if encoding.replace('_', '-').lower().startswith('utf-8'):
+        return is_valid_utf8(samples)
     try:
-        df.to_csv(output_file_path, index=False, sep=';', encoding='utf-8-sig')
-        print(f"\n✓ Adatok exportálva: {output_file_path}")
-        print(f"   Végeredmény: {len(df)} sor, {len(df.columns)} oszlop")
-        print(f"   Kódolás: UTF-8-BOM (Excel kompatibilis)")
-        return output_file_path
+        for sample in samples:
+            sample.decode(encoding)
+        return True
+    except (UnicodeDecodeError, LookupError):
+        return False
 
-    except Exception as e:
-        print(f"✗ Hiba az exportálás során: {e}")
-        return ""
+
+def plausible_encoding(samples: list, encoding: str) -> bool:
+    """
+    Illik-e a minta a (gyorsítótárból vett) kódolásra
+
+    UTF-8: szigorúan érvényes. Egybájtos kódolás: hibátlanul dekódol, nem ad vezérlő karaktert,
+    és a nem ASCII minta nem érvényes UTF-8 (az UTF-8 fájl latin2-ként mojibake lenne).
+    """
+    if encoding.replace('_', '-').lower().startswith('utf-8'):
+        return is_valid_utf8(samples)
+    if not decodes_strictly(samples, encoding):
+        return False
+    if all(sample.isascii() for sample in samples):
+        return True
+    weights = encoding_weights(encoding)
+    if weights is not None:
+        if np.isnan(weights[sample_histogram(samples) > 0]).any():
+            return False
+    return not is_valid_utf8(samples)
+
+
+def cached_encoding(cache: dict, input_file_path: str, samples: list = None):
+    """
+    Ismert fájl vagy forrásrendszer kódolása a gyorsítótárból (felismerés nélkül)
+
+    Sorrend: útvonal + méret + mtime → tartalom (minta hash) → forrásrendszer. A forrásrendszer
+    szerinti találatot a minták igazolják (lásd plausible_encoding): a latin2 minden bájtot
+    dekódol, így a szigorú dekódolás önmagában nem ellenőrzés.
+
+    Returns:
+        tuple: (kódolás vagy None, találat forrása)
+    """
+    stat = os.stat(input_file_path)
+    key = os.path.abspath(input_file_path)
+    entry = cache['files'].get(key)
+    if entry and entry['size'] == stat.st_size and entry['mtime_ns'] == stat.st_mtime_ns:
+        return entry['encoding'], 'fájl'
+
+    samples = samples if samples is not None else read_detection_sample(input_file_path)
+    content = cache['hashes'].get(sample_hash(samples, stat.st_size))
+    if content:
+        return content, 'tartalom'
+
+    source = cache['sources'].get(source_system(input_file_path))
+    if source and plausible_encoding(samples, source):
+        return source, 'forrásrendszer'
+
+    return None, None
+
+
+def remember_encoding(cache: dict, input_file_path: str, encoding: str, samples: list = None) -> None:
+    """Választott kódolás rögzítése a gyorsítótárban (fájl, tartalom és forrásrendszer szinten)"""
+    stat = os.stat(input_file_path)
+    samples = samples if samples is not None else read_detection_sample(input_file_path)
+    content_hash = sample_hash(samples, stat.st_size)
+
+    cache['files'][os.path.abspath(input_file_path)] = {
+        'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'hash': content_hash, 'encoding': encoding,
+    }
+    cache['hashes'][content_hash] = encoding
+    cache['sources'][source_system(input_file_path)] = encoding
 
 
 def detect_encoding_with_chardet(input_file: str):
@@ -137,29 +642,61 @@ def show_file_preview(input_file: str, encoding: str) -> None:
         print(f"✗ Hiba az előnézet megjelenítése során: {e}")
 
 
-def select_encoding_manual(input_file: str) -> str:
+def select_encoding_by_policy(samples: list, policy: dict) -> str:
+    """
+    Kódolás választása kérdés nélkül a policy['encoding_order'] kódolásai közül
+
+    Csak a mintára illő kódolás jöhet szóba (plausible_encoding - a latin2 / cp852 minden bájtot
+    dekódol, így a hibátlan dekódolás kevés); több illő közül a felismerő pontszáma (érvényes, nem
+    ASCII UTF-8-nál az UTF-8), egyenlőségnél (pl. ASCII minta) a beállított sorrend dönt.
+
+    Returns:
+        str: a választott kódolás, vagy "" ha egyik sem illik
+    """
+    fitting = [encoding for encoding in policy['encoding_order'] if plausible_encoding(samples, encoding)]
+    if not fitting:
+        print(f"❌ Egyik beállított kódolás sem működik: {', '.join(policy['encoding_order'])}")
+        return ""
+
+    histogram = sample_histogram(samples)
+    non_ascii = histogram[0x80:].any()
+
+    def score(encoding):
+        if encoding.replace('_', '-').lower().startswith('utf-8'):
+            return np.inf if non_ascii else 0.0
+        weights = encoding_weights(encoding)
+        return float((histogram * np.nan_to_num(weights)).sum()) if weights is not None else 0.0
+
+    selected = max(fitting, key=lambda encoding: (score(encoding), -fitting.index(encoding)))
+    print(f"✓ Választott kódolás: {selected}")
+    return selected
+
+
+def select_encoding_manual(input_file: str, samples: list = None) -> str:
     """Kódolás kézi kiválasztása a felhasználó által"""
 
-    encodings = ['latin2', 'cp852', 'cp1250', 'utf-8']
+    encodings = CANDIDATE_ENCODINGS
     working_encodings = []
 
+    # A jelöltek ugyanazon a mintán próbálódnak (a fájl nem olvasódik újra jelöltenként)
+    samples = samples if samples is not None else read_detection_sample(input_file)
+    head_lines = samples[0].splitlines()[:2]
+
     print("\n🧩 Kézi kódolás kiválasztása...\n")
 
     for encoding in encodings:
-        try:
-            # Csak az első néhány sor beolvasása teszteléshez
-            df_test = pd.read_csv(input_file, delimiter=';', encoding=encoding, nrows=3)
-            working_encodings.append(encoding)
-
-            print(f"=== {encoding} ===")
-            print(f"Fejléc: {list(df_test.columns)}")
-            if len(df_test) > 0:
-                print(f"1. sor: {df_test.iloc[0].tolist()}")
-            print("✓ MŰKÖDIK\n")
-
-        except Exception as e:
-            print(f"=== {encoding} ===")
-            print(f"✗ NEM MŰKÖDIK - {str(e)[:60]}\n")
+        print(f"=== {encoding} ===")
+        if not decodes_strictly(samples, encoding):
+            print(f"✗ NEM MŰKÖDIK - a fájl bájtjai nem dekódolhatók\n")
+            continue
+
+        working_encodings.append(encoding)
+        lines = [line.decode(encoding, errors='replace').lstrip('\ufeff') for line in head_lines]
+        if lines:
+            print(f"Fejléc: {lines[0].split(';')}")
+        if len(lines) > 1:
+            print(f"1. sor: {lines[1].split(';')}")
+        print("✓ MŰKÖDIK\n")
 
     if not working_encodings:
         print("❌ Egyik kódolás sem működik!")
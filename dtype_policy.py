@@ -0,0 +1,135 @@
+import re
+import pandas as pd
+from storage import DATETIME_FORMAT, table_format, read_table
+
+
+# Szöveges oszlopok tárolása: pyarrow string (kompakt, nullable), ha elérhető
+try:
+    import pyarrow  # noqa: F401
+    STRING_DTYPE = 'string[pyarrow]'
+except ImportError:
+    STRING_DTYPE = 'string'
+
+# Panel szám és hőmérséklet tárolási típusa (a panel szám a 16 bites tartományba fér)
+PANEL_DTYPE = 'int16'
+TEMPERATURE_DTYPE = 'float32'
+
+# Oszlopnév -> tárolási típus, az első illeszkedő szabály dönt ('datetime': datetime64 a DATETIME_FORMAT szerint).
+# A beolvasásnál a nullable típusok (Int16, Int32, boolean) kellenek: a hiányzó érték NA marad, nem '' kitöltés.
+DTYPE_RULES = [
+    (re.compile(r'^Panel hőfok.*Time$'), 'datetime'),
+    (re.compile(r'^Panel hőfok.*ValueY$'), TEMPERATURE_DTYPE),
+    (re.compile(r'^meres_idopont$'), 'datetime'),
+    (re.compile(r'^hofok$'), TEMPERATURE_DTYPE),
+    (re.compile(r'^panel_szam$'), 'Int16'),
+    (re.compile(r'^ADAGSZÁM$|ADAGIDŐ$'), 'Int32'),
+    (re.compile(r'_DÁTUM$'), 'category'),
+    (re.compile(r'_IDŐ$'), STRING_DTYPE),
+    (re.compile(r'^CRC_Error$'), 'boolean'),
+]
+
+# Szabály nélküli szöveges oszlop ennél kisebb különböző érték aránynál kategória lesz
+CATEGORY_MAX_RATIO = 0.5
+
+
+def column_dtype(column: str):
+    """Az oszlop tárolási típusa a DTYPE_RULES szerint (None: nincs szabály)"""
+    name = str(column).strip()
+    for pattern, dtype in DTYPE_RULES:
+        if pattern.search(name):
+            return dtype
+    return None
+
+
+def read_options(columns) -> dict:
+    """pd.read_csv paraméterek (dtype, parse_dates) a fejléc oszlopaihoz"""
+    dtypes, dates = {}, []
+    for column in columns:
+        dtype = column_dtype(column)
+        if dtype == 'datetime':
+            dates.append(column)
+        elif dtype is not None:
+            dtypes[column] = dtype
+    options = {'dtype': dtypes}
+    if dates:
+        options.update(parse_dates=dates, date_format=DATETIME_FORMAT)
+    return options
+
+
+def compact_text(series: pd.Series) -> pd.Series:
+    """Szabály nélküli szöveges (object) oszlop: kategória ismétlődő értékeknél, egyébként STRING_DTYPE"""
+    if pd.api.types.infer_dtype(series, skipna=True) != 'string':
+        return series
+    if len(series) and series.nunique() <= CATEGORY_MAX_RATIO * len(series):
+        return series.astype('category')
+    return series.astype(STRING_DTYPE)
+
+
+def apply_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    A típus szabályok alkalmazása már beolvasott DataFrame-re (parquet / feather, memóriabeli út)
+
+    A nem átalakítható oszlop (pl. szám oszlopban szöveg) változatlan marad.
+    """
+    converted = {}
+    for column in df.columns:
+        series = df[column]
+        dtype = column_dtype(column)
+        try:
+            if dtype == 'datetime':
+                if not pd.api.types.is_datetime64_any_dtype(series):
+                    parsed = pd.to_datetime(series, format=DATETIME_FORMAT, errors='coerce')
+                    # Csak ha minden meglévő érték a formátumot követi
+                    if not (parsed.isna() & series.notna()).any():
+                        converted[column] = parsed
+            elif dtype is not None:
+                # A nem nullable változat (pl. int16 az Int16 helyett) is megfelel
+                if str(series.dtype).lower() != dtype.lower():
+                    converted[column] = series.astype(dtype)
+            elif series.dtype == object:
+                converted[column] = compact_text(series)
+        except (ValueError, TypeError):
+            pass
+    if not converted:
+        return df
+    df = df.copy(deep=False)
+    for column, values in converted.items():
+        df[column] = values
+    return df
+
+
+def typed_read_csv(source, **kwargs) -> pd.DataFrame:
+    """
+    CSV beolvasása a típus szabályokkal (dtype / parse_dates már a beolvasáskor)
+
+    Ha a típusos beolvasás nem sikerül (pl. szöveg egy Int32 oszlopban), típus nélkül olvas,
+    és oszloponként alkalmazza a szabályokat.
+    """
+    columns = pd.read_csv(source, nrows=0, **kwargs).columns
+    if hasattr(source, 'seek'):
+        source.seek(0)
+    try:
+        df = pd.read_csv(source, **kwargs, **read_options(columns))
+    except (ValueError, TypeError) as e:
+        print(f"  ⚠️  Típusos beolvasás nem sikerült ({str(e)[:80]}), típus felismerés oszloponként")
+        if hasattr(source, 'seek'):
+            source.seek(0)
+        df = pd.read_csv(source, **kwargs)
+    return apply_dtypes(df)
+
+
+def read_typed_table(input_path: str) -> pd.DataFrame:
+    """Táblafájl beolvasása a típus szabályokkal (csv: már a beolvasáskor, parquet / feather: utána)"""
+    if table_format(input_path) in ('parquet', 'feather'):
+        return apply_dtypes(read_table(input_path))
+    return typed_read_csv(input_path, delimiter=';', encoding='utf-8-sig')
+
+
+def frame_memory_mb(df: pd.DataFrame) -> float:
+    """DataFrame memóriaigénye (MB, a szöveges értékekkel együtt)"""
+    return df.memory_usage(deep=True).sum() / (1024 * 1024)
+
+
+def log_frame_memory(df: pd.DataFrame, label: str) -> None:
+    """Szakaszonkénti memória napló"""
+    print(f"  🧮 Memória ({label}): {frame_memory_mb(df):.1f} MB, {len(df)} sor")
@@ -0,0 +1,149 @@
+import time
+import numpy as np
+import pandas as pd
+from column_types import DATETIME_SUFFIX, table_options
+from partitions import panel_sources
+
+
+# Mérés -> adag hozzárendelés (betöltéskor épül, a panel tábla mérési időpontjaira)
+HEAT_MAP_TABLE = 'meres_adag'
+
+# Panel mérések az adagszámmal együtt (a hozzárendelő táblán át, tartomány keresés nélkül)
+HEAT_MAP_VIEW = 'panel_meres_adag'
+
+# A hozzárendeléshez szükséges táblák
+HEAT_MAP_SOURCES = ('kezdet_adagok_NFdone', 'vege_adatok_NFdone', 'panel_szam_NFdone')
+
+# Adagok kezdete / vége: a betöltéskor összevont dátum + idő oszlopok (epoch másodperc)
+HEAT_START_COLUMN = 'Kezdet' + DATETIME_SUFFIX
+HEAT_END_COLUMN = 'Vége' + DATETIME_SUFFIX
+
+
+def build_heat_windows(kezdet: pd.DataFrame, vege: pd.DataFrame) -> pd.DataFrame:
+    """
+    Adagok időablakai (kezdet, vége) a kezdet / vége táblákból, kezdet szerint rendezve
+
+    Args:
+        kezdet, vege: ADAGSZÁM és start / end oszlop (epoch másodperc)
+
+    Returns:
+        pd.DataFrame: ADAGSZÁM, start, end (int64); a hiányos / hibás idejű adagok nélkül
+    """
+    windows = kezdet.merge(vege, on='ADAGSZÁM', how='inner').dropna(subset=['start', 'end'])
+    windows = windows.astype({'start': 'int64', 'end': 'int64'})
+    return windows[windows['start'] <= windows['end']].sort_values('start', kind='stable')
+
+
+def assign_heats(times: pd.Series, windows: pd.DataFrame) -> pd.Series:
+    """
+    Mérési időpontok hozzárendelése adagokhoz rendezett összefésüléssel (merge_asof), O(n log n)
+
+    Minden időponthoz a legutóbb (nem később) kezdődött adag tartozik, ha az időpont
+    a vége előtt (vagy pontosan akkor) van; átfedő adagoknál a később kezdődött nyer.
+
+    Args:
+        times: mérési időpontok (epoch másodperc)
+        windows: build_heat_windows eredménye
+
+    Returns:
+        pd.Series: ADAGSZÁM (Int64, adagon kívüli időpontnál <NA>), a times indexével
+    """
+    readings = pd.DataFrame({'ts': times.to_numpy(), 'pos': np.arange(len(times))})
+    readings = readings.dropna(subset=['ts']).astype({'ts': 'int64'}).sort_values('ts', kind='stable')
+
+    matched = pd.merge_asof(readings, windows, left_on='ts', right_on='start', direction='backward')
+    inside = matched['end'].notna() & (matched['ts'] <= matched['end'])
+
+    heats = pd.Series(pd.NA, index=np.arange(len(times)), dtype='Int64')
+    heats.iloc[matched.loc[inside, 'pos'].to_numpy()] = matched.loc[inside, 'ADAGSZÁM'].to_numpy()
+    heats.index = times.index
+    return heats
+
+
+def table_exists(cursor, table_name: str) -> bool:
+    """Létezik-e a tábla az adatbázisban (a particionált panel tábla helyén álló nézet is annak számít)"""
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE type IN ('table', 'view') AND name = ?", (table_name,))
+    return cursor.fetchone() is not None
+
+
+def create_heat_map_view(cursor) -> None:
+    """
+    A panel_meres_adag nézet újralétrehozása
+
+    Havi partícióknál partíciónként külön join (UNION ALL): az ADAGSZÁM szűrés minden ágba
+    lejut, és a partíció elsődleges kulcsán keres - a partíciók nézetén át teljes beolvasás lenne.
+    Blokkos tárolásnál (a panel tábla helyén nézet, index nélkül) a mérések egyszeri kicsomagolása
+    a külső ciklus (CROSS JOIN), a hozzárendelés a meres_idopont kulcson keres.
+    """
+    cursor.execute(f"DROP VIEW IF EXISTS {HEAT_MAP_VIEW}")
+    joins = []
+    for source in panel_sources(cursor):
+        cursor.execute("SELECT type FROM sqlite_master WHERE name = ?", (source,))
+        if cursor.fetchone()[0] == 'view':
+            joins.append(f"""SELECT m."ADAGSZÁM", p.*
+            FROM {source} p
+            CROSS JOIN {HEAT_MAP_TABLE} m ON m.meres_idopont = p.meres_idopont""")
+        else:
+            joins.append(f"""SELECT m."ADAGSZÁM", p.*
+            FROM {HEAT_MAP_TABLE} m
+            JOIN {source} p ON p.meres_idopont = m.meres_idopont""")
+    if joins:
+        union = "\n            UNION ALL\n            ".join(joins)
+        cursor.execute(f"""
+            CREATE VIEW {HEAT_MAP_VIEW} AS
+            {union}""")
+
+
+def build_heat_map(cursor, changed_times: list = None) -> int:
+    """
+    A mérés -> adag hozzárendelő tábla és a panel_meres_adag nézet újraépítése
+
+    A panel tábla különböző mérési időpontjait rendeli az adagokhoz (egy időponthoz minden
+    panel mérése tartozik). Az adagonkénti lekérdezés így index keresés az (ADAGSZÁM, meres_idopont)
+    indexen, majd a panel tábla elsődleges kulcsán - nem kell minden alkalommal idő tartományos join.
+
+    Args:
+        changed_times: csak ezeknek a (új / módosított) mérési időpontoknak a hozzárendelése;
+                       None esetén (vagy ha még nincs hozzárendelő tábla) teljes újraépítés
+
+    Returns:
+        int: adaghoz rendelt mérési időpontok száma (-1, ha a forrás táblák hiányoznak)
+    """
+    if not all(table_exists(cursor, table) for table in HEAT_MAP_SOURCES):
+        print("  ℹ️  Adag hozzárendelés kihagyva (hiányzó kezdet / vége / panel tábla)")
+        return -1
+
+    full = changed_times is None or not table_exists(cursor, HEAT_MAP_TABLE)
+    start = time.perf_counter()
+    conn = cursor.connection
+    kezdet = pd.read_sql(f'SELECT "ADAGSZÁM", "{HEAT_START_COLUMN}" AS start FROM kezdet_adagok_NFdone', conn)
+    vege = pd.read_sql(f'SELECT "ADAGSZÁM", "{HEAT_END_COLUMN}" AS "end" FROM vege_adatok_NFdone', conn)
+    if full:
+        # A különböző időpontok az elsődleges kulcs indexéből, rendezetten jönnek
+        readings = pd.read_sql('SELECT DISTINCT meres_idopont FROM panel_szam_NFdone', conn)
+    else:
+        readings = pd.DataFrame({'meres_idopont': pd.Series(changed_times, dtype='Int64')})
+
+    times = pd.to_numeric(readings['meres_idopont'], errors='coerce')
+    heats = assign_heats(times, build_heat_windows(kezdet, vege))
+    mapped = readings[heats.notna()]
+    mapped_heats = heats[heats.notna()].astype('int64')
+
+    if full:
+        cursor.execute(f"DROP VIEW IF EXISTS {HEAT_MAP_VIEW}")
+        cursor.execute(f"DROP TABLE IF EXISTS {HEAT_MAP_TABLE}")
+        cursor.execute(f"""
+            CREATE TABLE {HEAT_MAP_TABLE} (
+                meres_idopont INTEGER PRIMARY KEY,
+                "ADAGSZÁM" INTEGER NOT NULL REFERENCES kezdet_adagok_NFdone ("ADAGSZÁM")
+            ){table_options()}""")
+    cursor.executemany(f'INSERT OR REPLACE INTO {HEAT_MAP_TABLE} (meres_idopont, "ADAGSZÁM") VALUES (?, ?)',
+                       zip(mapped['meres_idopont'].tolist(), mapped_heats.tolist()))
+    if full:
+        cursor.execute(f'CREATE INDEX idx_{HEAT_MAP_TABLE}_ADAGSZÁM ON {HEAT_MAP_TABLE} ("ADAGSZÁM", meres_idopont)')
+    create_heat_map_view(cursor)
+
+    elapsed = time.perf_counter() - start
+    print(f"  🔗 Adag hozzárendelés: {len(mapped)} / {len(readings)} "
+          f"{'mérési' if full else 'új / módosított'} időpont adaghoz rendelve ({elapsed:.2f} s)")
+    return len(mapped)
@@ -1,15 +1,40 @@
+import io
 import os
+import sys
+import signal
 import sqlite3
-from decoding import decode_csv_file
+import argparse
+import threading
+import traceback
+from contextlib import redirect_stdout
+from concurrent.futures import ProcessPoolExecutor
+from decoding import (decode_csv_file, decode_csv_to_dataframe, decoded_filename, select_file_encoding,
+                      load_encoding_cache, save_encoding_cache)
 from browse import scan_csv_files, display_csv_files
 from create2db import create_database
-from cleaning import clean_file
-from normalizer_prepare import normalize_file
-from db_loader import load_nf_tables_to_db
+from cleaning import clean_file, clean_dataframe, CLEAN_CHUNK_ROWS
+from normalizer_prepare import normalize_file, normalize_dataframe
+from db_loader import (load_nf_tables_to_db, load_tables_to_db, discover_nf_tables, check_panel_layout, BULK_BATCH_SIZE,
+                       DUPLICATE_KEY_MODES)
+from storage import (STORAGE_FORMATS, table_extension, write_table, require_pyarrow, count_table_rows,
+                     csv_like_columns)
+from dtype_policy import read_typed_table, apply_dtypes, log_frame_memory
+from manifest import (load_manifest, save_manifest, stage_is_fresh, stage_entry, stage_outputs, record_stage,
+                      previous_encoding, remove_stale_outputs, load_is_fresh, record_load)
+from policy import (POLICY_CHOICES, RUN_SUMMARY_FILENAME, load_policy, new_run_summary, record_result,
+                    finish_run_summary)
+from metrics import (METRICS_FILENAME, new_metrics, measure, add_record, summarize_stage, write_metrics_report,
+                     save_metrics_to_db, print_metrics)
+from watcher import (WATCH_STABLE_SECONDS, WATCH_POLL_SECONDS, WATCH_QUEUE_SIZE, WATCH_COMMIT_ROWS,
+                     WATCH_COMMIT_SECONDS, run_watch)
+from pipeline import PIPELINE_QUEUE_SIZE, run_pipelined
 
-def cleanup_folder(folder_path: str, folder_name: str) -> None:
+# Mérhető / profilozható szakaszok (--metrics, --profile)
+PIPELINE_STAGES = ['create_database', 'decode', 'clean', 'normalize', 'load', 'in_memory', 'pipelined']
+
+def cleanup_folder(folder_path: str, folder_name: str, policy: dict = None) -> None:
     """
-    Mappa tartalmának kiürítése megerősítéssel
+    Mappa tartalmának kiürítése megerősítéssel (policy megadásával a policy['folders'] dönt)
     """
     if not os.path.exists(folder_path):
         return
@@ -22,7 +47,10 @@ def cleanup_folder(folder_path: str, folder_name: str) -> None:
     for file in files:
         print(f"   📄 {file}")
 
-    response = input(f"\n💥 Kiürítsem a {folder_name} mappát? (i/n): ").strip().lower()
+    if policy:
+        response = 'i' if policy['folders'] == 'wipe' else 'n'
+    else:
+        response = input(f"\n💥 Kiürítsem a {folder_name} mappát? (i/n): ").strip().lower()
     if response == 'i':
         # Összes CSV fájl törlése
         for file in files:
@@ -33,9 +61,9 @@ def cleanup_folder(folder_path: str, folder_name: str) -> None:
         print(f"ℹ️  {folder_name} mappa tartalma megmarad.")
 
 
-def check_existing_tables(db_path: str) -> bool:
+def check_existing_tables(db_path: str, policy: dict = None) -> bool:
     """
-    Meglévő táblák ellenőrzése és törlési engedély kérése
+    Meglévő táblák ellenőrzése és törlési engedély kérése (policy megadásával a policy['tables'] dönt)
     """
     if not os.path.exists(db_path):
         return True
@@ -57,6 +85,10 @@ def check_existing_tables(db_path: str) -> bool:
         for table in existing_tables:
             print(f"   📊 {table}")
 
+        if policy:
+            print(f"ℹ️  Táblák kezelése a beállítás szerint: {policy['tables']}")
+            return policy['tables'] == 'replace'
+
         response = input(f"\n💥 Törlés elutaitása esetén manuálisan kell az érintett táblákat kitörölnöd! \n Töröljem és hozzam létre újra ezeket a táblákat? (i/n): ").strip().lower()
         return response == 'i'
 
@@ -65,15 +97,111 @@ def check_existing_tables(db_path: str) -> bool:
         return False
 
 
-def process_csv_files(folder_path: str, output_folder_name: str, process_type: str = 'decode') -> None:
+def process_single_file(input_file_path: str, output_dir: str, process_type: str, encoding: str = None,
+                        fmt: str = 'csv', chunksize: int = None) -> str:
+    """
+    Egy fájl dekódolása vagy tisztítása (chunksize: darabolt tisztítás)
+    """
+    if process_type == 'decode':
+        return decode_csv_file(input_file_path, output_dir, encoding, fmt)
+    else:  # clean
+        return clean_file(input_file_path, output_dir, fmt, chunksize)
+
+
+def process_file_buffered(input_file_path: str, output_dir: str, process_type: str, encoding: str = None,
+                          fmt: str = 'csv', chunksize: int = None, measured: bool = False):
+    """
+    Egy fájl feldolgozása külön folyamatban, a konzol kimenet pufferelésével
+
+    Args:
+        measured: a worker-ben mért idő / memória visszaadása (a sorokat / bájtokat a fő folyamat tölti ki)
+
+    Returns:
+        tuple: (eredmény útvonal, konzol kimenet, hibaüzenet vagy None, mérési rekord vagy None)
+    """
+    buffer = io.StringIO()
+    error = None
+    result = ""
+    local_metrics = new_metrics(None) if measured else None
+    with redirect_stdout(buffer), measure(local_metrics, process_type, os.path.basename(input_file_path)):
+        try:
+            result = process_single_file(input_file_path, output_dir, process_type, encoding, fmt, chunksize)
+        except BaseException as e:  # exit() is SystemExit - ne állítsa le a teljes folyamatot
+            error = f"{type(e).__name__}: {e}"
+            traceback.print_exc(file=buffer)
+    record = local_metrics['records'][0] if measured else None
+    return result, buffer.getvalue(), error, record
+
+
+def record_file_io(record: dict, input_path: str, output_paths: list) -> None:
+    """Fájlonkénti mérési rekord kiegészítése a beolvasott / kiírt sorokkal és bájtokkal"""
+    if record is None or not os.path.exists(input_path):
+        return
+    outputs = [path for path in output_paths if path and os.path.exists(path)]
+    record['bytes_read'] = os.path.getsize(input_path)
+    record['rows_in'] = count_table_rows(input_path)
+    record['bytes_written'] = sum(os.path.getsize(path) for path in outputs)
+    record['rows_out'] = sum(count_table_rows(path) for path in outputs)
+
+
+def resolve_encodings(folder_path: str, csv_files: list, manifest: dict = None, encoding_cache: dict = None,
+                      policy: dict = None) -> dict:
+    """
+    Kódolások előzetes eldöntése a fő folyamatban (a kérdések itt hangzanak el, nem a workerekben)
+
+    Args:
+        manifest: megadása esetén a változatlan fájlok korábban választott kódolása újrahasznosul
+        encoding_cache: kódolás gyorsítótár - ismert fájlnál / forrásrendszernél nincs felismerés
+        policy: batch futás szabályai (kérdések helyett)
+    """
+    print("\n🔤 Kódolások előzetes meghatározása...")
+    encodings = {}
+    for csv_file in csv_files:
+        if manifest is not None:
+            known = previous_encoding(manifest, os.path.join(folder_path, csv_file))
+            if known:
+                print(f"📄 {csv_file}: {known} (korábbi futásból)")
+                encodings[csv_file] = known
+                continue
+
+        print(f"\n{'─' * 40}")
+        print(f"📄 {csv_file}")
+        print(f"{'─' * 40}")
+        encodings[csv_file] = select_file_encoding(os.path.join(folder_path, csv_file), encoding_cache, policy)
+
+    if encoding_cache is not None:
+        save_encoding_cache(encoding_cache)
+    return encodings
+
+
+def process_csv_files(folder_path: str, output_folder_name: str, process_type: str = 'decode',
+                      workers: int = 1, fmt: str = 'csv', manifest: dict = None,
+                      encoding_cache: dict = None, policy: dict = None, summary: dict = None,
+                      chunksize: int = None, metrics: dict = None) -> None:
     """
     CSV fájlok feldolgozása
+
+    Args:
+        workers: párhuzamos folyamatok száma (1 = soros feldolgozás)
+        fmt: a kimeneti fájlok formátuma ('csv', 'parquet', 'feather')
+        manifest: megadása esetén a változatlan bemenetű fájlok kimaradnak
+        encoding_cache: kódolás gyorsítótár (dekódolásnál)
+        policy: batch futás szabályai (kérdések helyett)
+        summary: futási összesítő, ebbe kerülnek a fájlonkénti eredmények
+        chunksize: tisztításnál darabolt (out-of-core) feldolgozás ennyi soros darabokban
+        metrics: mérési gyűjtő - fájlonkénti idő, CPU, memória, sorok és bájtok
     """
 
-    # 1. Mappa szkennelése
-    csv_files = scan_csv_files(folder_path)
+    # 1. Mappa szkennelése (a nyers import fájlok mindig CSV-k)
+    csv_files = scan_csv_files(folder_path, ('.csv',) if process_type == 'decode' else None)
     file_count = len(csv_files)
 
+    if manifest is not None:
+        # Eltűnt bemenetek kimeneteinek törlése
+        for removed in remove_stale_outputs(manifest, process_type,
+                                            [os.path.join(folder_path, f) for f in csv_files]):
+            print(f"🗑️  Elavult kimenet törölve: {removed}")
+
     if file_count == 0:
         print(f"ℹ️  Nincs CSV fájl a mappában: {folder_path}")
         return
@@ -89,24 +217,74 @@ def process_csv_files(folder_path: str, output_folder_name: str, process_type: s
     print(f"\n🔄 {file_count} CSV fájl {process_name.lower()}a...")
 
     successful_files = []
+    pending_files = csv_files
 
-    for csv_file in csv_files:
-        input_file_path = os.path.join(folder_path, csv_file)
+    # Változatlan bemenetek kihagyása
+    if manifest is not None:
+        fresh_files = [f for f in csv_files
+                       if stage_is_fresh(manifest, process_type, os.path.join(folder_path, f), format=fmt)]
+        for csv_file in fresh_files:
+            print(f"⏭️  VÁLTOZATLAN, kihagyva: {csv_file}")
+            record_result(summary, process_type, csv_file, None)
+        successful_files.extend(fresh_files)
+        pending_files = [f for f in csv_files if f not in fresh_files]
 
-        print(f"\n{'─' * 40}")
-        print(f"📄 {csv_file}")
-        print(f"{'─' * 40}")
+    # Kódolások előre eldöntése (párhuzamos futásnál, a manifesthez és a gyorsítótárhoz)
+    encodings = {}
+    if process_type == 'decode' and pending_files and (manifest is not None or encoding_cache is not None
+                                                        or (workers > 1 and len(pending_files) > 1)):
+        encodings = resolve_encodings(folder_path, pending_files, manifest, encoding_cache, policy)
+
+    results = {}
+    errors = {}
+    if workers > 1 and len(pending_files) > 1:
+        results = process_csv_files_parallel(folder_path, pending_files, output_dir, process_type, workers, fmt,
+                                             encodings, errors, chunksize, metrics)
+    else:
+        for csv_file in pending_files:
+            input_file_path = os.path.join(folder_path, csv_file)
 
-        if process_type == 'decode':
-            result = decode_csv_file(input_file_path, output_dir)
-        else:  # clean
-            result = clean_file(input_file_path, output_dir)
+            print(f"\n{'─' * 40}")
+            print(f"📄 {csv_file}")
+            print(f"{'─' * 40}")
 
-        if result:
-            successful_files.append(csv_file)
-            print(f"✅ SIKERES")
-        else:
-            print(f"❌ SIKERTELEN")
+            if process_type == 'decode' and encodings and not encodings.get(csv_file):
+                print(f"❌ SIKERTELEN (nincs kiválasztott kódolás)")
+                results[csv_file] = ""
+                errors[csv_file] = "nincs kiválasztott kódolás"
+                continue
+
+            with measure(metrics, process_type, csv_file) as record:
+                if policy:
+                    # Batch módban egy fájl hibája nem állítja le a futást
+                    try:
+                        result = process_single_file(input_file_path, output_dir, process_type,
+                                                     encodings.get(csv_file), fmt, chunksize)
+                    except Exception as e:
+                        result = ""
+                        errors[csv_file] = f"{type(e).__name__}: {e}"
+                        traceback.print_exc()
+                else:
+                    result = process_single_file(input_file_path, output_dir, process_type,
+                                                 encodings.get(csv_file), fmt, chunksize)
+            if metrics is not None:
+                record_file_io(record, input_file_path, [result])
+            results[csv_file] = result
+
+            if result:
+                print(f"✅ SIKERES")
+            else:
+                print(f"❌ SIKERTELEN")
+
+    for csv_file, result in results.items():
+        record_result(summary, process_type, csv_file, bool(result), errors.get(csv_file),
+                      **({'encoding': encodings[csv_file]} if result and encodings.get(csv_file) else {}))
+        if not result:
+            continue
+        successful_files.append(csv_file)
+        if manifest is not None:
+            extra = {'encoding': encodings[csv_file]} if process_type == 'decode' else {}
+            record_stage(manifest, process_type, os.path.join(folder_path, csv_file), [result], format=fmt, **extra)
 
     # 5. Eredmény jelentés
     print(f"\n{'=' * 50}")
@@ -114,31 +292,757 @@ def process_csv_files(folder_path: str, output_folder_name: str, process_type: s
     print(f"{'=' * 50}")
 
 
-def normalize_export_files(export_folder: str) -> int:
+def process_csv_files_parallel(folder_path: str, csv_files: list, output_dir: str, process_type: str,
+                               workers: int, fmt: str = 'csv', encodings: dict = None, errors: dict = None,
+                               chunksize: int = None, metrics: dict = None) -> dict:
+    """
+    Fájlok párhuzamos feldolgozása folyamatkészlettel
+
+    Az eredmények és a naplók a fájlok eredeti sorrendjében jelennek meg.
+
+    Args:
+        errors: megadása esetén ebbe kerülnek a fájlonkénti hibaüzenetek
+
+    Returns:
+        dict: fájlnév -> eredmény útvonal (üres string hiba esetén)
+    """
+    # Interaktív döntések a workerek indítása előtt
+    if process_type == 'decode' and encodings is None:
+        encodings = resolve_encodings(folder_path, csv_files)
+    encodings = encodings or {}
+
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+
+    print(f"\n⚙️  Párhuzamos feldolgozás: {min(workers, len(csv_files))} folyamat")
+
+    results = {}
+    with ProcessPoolExecutor(max_workers=min(workers, len(csv_files))) as executor:
+        futures = []
+        for csv_file in csv_files:
+            encoding = encodings.get(csv_file)
+            if process_type == 'decode' and not encoding:
+                futures.append(None)  # kódolás nélkül nincs mit dekódolni
+                continue
+            futures.append(executor.submit(process_file_buffered, os.path.join(folder_path, csv_file),
+                                           output_dir, process_type, encoding, fmt, chunksize,
+                                           metrics is not None))
+
+        # Gyűjtés determinisztikus (fájl) sorrendben
+        for csv_file, future in zip(csv_files, futures):
+            print(f"\n{'─' * 40}")
+            print(f"📄 {csv_file}")
+            print(f"{'─' * 40}")
+
+            if future is None:
+                print(f"❌ SIKERTELEN (nincs kiválasztott kódolás)")
+                results[csv_file] = ""
+                if errors is not None:
+                    errors[csv_file] = "nincs kiválasztott kódolás"
+                continue
+
+            try:
+                result, log, error, record = future.result()
+            except Exception as e:
+                result, log, error, record = "", "", f"{type(e).__name__}: {e}", None
+
+            if record is not None:
+                record_file_io(record, os.path.join(folder_path, csv_file), [result])
+                add_record(metrics, record)
+
+            print(log, end='')
+            results[csv_file] = result
+            if error and errors is not None:
+                errors[csv_file] = error
+            if result:
+                print(f"✅ SIKERES")
+            else:
+                print(f"❌ SIKERTELEN" + (f" ({error})" if error else ""))
+
+    return results
+
+
+def normalize_export_files(export_folder: str, fmt: str = 'csv', manifest: dict = None, policy: dict = None,
+                           summary: dict = None, metrics: dict = None) -> int:
     """
     Export mappa NF3 normalizálása
+
+    Args:
+        manifest: megadása esetén a változatlan tisztított fájlok normalizálása kimarad
+        policy: batch futás szabályai (kérdések helyett; egy fájl hibája nem állítja le a futást)
+        summary: futási összesítő
+        metrics: mérési gyűjtő (fájlonként)
     """
     print("\n🔧 NF3 NORMALIZÁLÁS")
     print("-" * 30)
 
-    csv_files = scan_csv_files(export_folder)
+    # A korábbi futásokból itt maradt _NFdone fájlok nem normalizálandók
+    csv_files = [f for f in scan_csv_files(export_folder) if '_NFdone' not in f]
     print(f"📁 Normalizálandó fájlok: {len(csv_files)}")
 
+    if manifest is not None:
+        for removed in remove_stale_outputs(manifest, 'normalize',
+                                            [os.path.join(export_folder, f) for f in csv_files]):
+            print(f"🗑️  Elavult kimenet törölve: {removed}")
+
     total_tables_created = 0
 
     for csv_file in csv_files:
         input_path = os.path.join(export_folder, csv_file)
-        tables_created = normalize_file(input_path, export_folder)
+
+        if manifest is not None and stage_is_fresh(manifest, 'normalize', input_path, format=fmt):
+            print(f"⏭️  VÁLTOZATLAN, kihagyva: {csv_file}")
+            total_tables_created += len(stage_entry(manifest, 'normalize', input_path)['outputs'])
+            record_result(summary, 'normalize', csv_file, None)
+            continue
+
+        # A létrejött _NFdone fájlokat a módosítási idő alapján azonosítjuk
+        before = nf_file_snapshot(export_folder)
+        with measure(metrics, 'normalize', csv_file) as record:
+            try:
+                tables_created = normalize_file(input_path, export_folder, fmt, policy)
+            except Exception as e:
+                if not policy:
+                    raise
+                print(f"❌ Hiba a normalizálás során: {e}")
+                record_result(summary, 'normalize', csv_file, False, f"{type(e).__name__}: {e}")
+                continue
         total_tables_created += tables_created
+        record_result(summary, 'normalize', csv_file, tables_created > 0, tables=tables_created)
+
+        if manifest is not None or metrics is not None:
+            after = nf_file_snapshot(export_folder)
+            outputs = [os.path.join(export_folder, f) for f, mtime in after.items() if before.get(f) != mtime]
+            if metrics is not None:
+                record_file_io(record, input_path, outputs)
+            if manifest is not None:
+                record_stage(manifest, 'normalize', input_path, outputs, format=fmt)
 
     print(f"\n✅ NF3 KÉSZ: {total_tables_created} tábla létrehozva")
     return total_tables_created
 
 
-def main():
+def nf_file_snapshot(export_folder: str) -> dict:
+    """
+    _NFdone fájlok módosítási ideje (fájlnév -> mtime_ns)
+    """
+    return {f: os.stat(os.path.join(export_folder, f)).st_mtime_ns
+            for f in discover_nf_tables(export_folder)}
+
+
+def positive_int(value: str) -> int:
+    """
+    Pozitív egész kapcsoló érték (argparse típus)
+    """
+    try:
+        number = int(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"nem egész szám: {value}")
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"legalább 1 kell legyen: {value}")
+    return number
+
+
+def parse_args(argv=None):
+    """
+    Parancssori kapcsolók feldolgozása
+    """
+    parser = argparse.ArgumentParser(description="Teljes adatfeldolgozási folyamat")
+    parser.add_argument('--load-mode', choices=['bulk', 'row'], default='bulk',
+                        help="Adatbázis betöltés módja: bulk (alapértelmezett) vagy row (soronkénti, hibakereséshez)")
+    parser.add_argument('--batch-size', type=positive_int, default=BULK_BATCH_SIZE,
+                        help=f"Köteg mérete tömeges betöltésnél (alapértelmezett: {BULK_BATCH_SIZE})")
+    parser.add_argument('--in-memory', action='store_true',
+                        help="A szakaszok DataFrame-eket adnak át egymásnak, köztes CSV fájlok nélkül")
+    parser.add_argument('--audit', action='store_true',
+                        help="Memóriabeli módban a köztes eredmények mentése a temp és export mappába")
+    parser.add_argument('--incremental', action='store_true',
+                        help="Inkrementális betöltés: upsert természetes kulcsok alapján a táblák törlése helyett")
+    parser.add_argument('--panel-blocks', action='store_true',
+                        help="Tömörített blokkos panel tárolás: a mérések panelenként napi blokkokban (panel_blokk "
+                             "tábla), a panel_szam_NFdone tábla helyén nézet; a későbbi inkrementális betöltések "
+                             "kapcsoló nélkül is blokkokba írnak, a teljes újratöltés enélkül visszaállítja a táblát")
+    parser.add_argument('--duplicate-keys', choices=DUPLICATE_KEY_MODES, default='error',
+                        help="Azonos kulcsú sorok egy betöltésen belül: error - hiba, a betöltés leáll "
+                             "(alapértelmezett); last / first - kulcsonként az utolsó / első sor marad, "
+                             "az eldobott sorok száma kiíródik")
+    parser.add_argument('--partition-months', action='store_true',
+                        help="A panel mérések havi partíció táblákba (panel_szam_NFdone_ÉÉÉÉ_HH), felettük "
+                             "panel_szam_NFdone nézet; teljes betöltésnél csak az adatban szereplő hónapok épülnek újra")
+    parser.add_argument('--no-staging', action='store_true',
+                        help="Teljes betöltés közvetlenül az élő adatbázisba (alapértelmezés: átmeneti "
+                             "db/data.db.staging fájlba, majd egyetlen tranzakcióban közzétéve; ehhez az adatbázis "
+                             "méretének megfelelő szabad hely kell)")
+    parser.add_argument('--no-encoding-cache', action='store_true',
+                        help="Kódolás gyorsítótár (db/encoding_cache.json) nélkül: minden fájl kódolása "
+                             "felismeréssel dől el, és nem is rögzül")
+    parser.add_argument('--format', choices=list(STORAGE_FORMATS), default='csv', dest='storage_format',
+                        help="Köztes fájlok (temp, export, _NFdone) formátuma: csv (Excel, alapértelmezett), "
+                             "parquet vagy feather (gyors, típustartó, pyarrow szükséges)")
+    parser.add_argument('--skip-unchanged', action='store_true',
+                        help="Tartalom hash alapú manifest (db/manifest.json): a változatlan bemenetek dekódolása, "
+                             "tisztítása, normalizálása és betöltése kimarad; a mappák nem ürülnek")
+    parser.add_argument('--workers', type=positive_int, default=1,
+                        help="Dekódolás és tisztítás párhuzamos folyamatainak száma (alapértelmezett: 1)")
+    parser.add_argument('--clean-chunksize', type=positive_int, nargs='?', const=CLEAN_CHUNK_ROWS, default=None,
+                        help=f"Darabolt (RAM-nál nagyobb fájlokhoz való) CSV tisztítás N soros darabokban "
+                             f"(érték nélkül: {CLEAN_CHUNK_ROWS})")
+
+    parser.add_argument('--metrics', nargs='?', const='', default=None, metavar='RIPORT',
+                        help=f"Szakaszonkénti mérés (fal- és CPU idő, csúcs memória, sorok, bájtok): riport JSON vagy "
+                             f"CSV fájlba (alapértelmezett: db/{METRICS_FILENAME}) és a data.db run_metrics táblájába")
+    parser.add_argument('--profile', choices=PIPELINE_STAGES,
+                        help="A megadott szakasz cProfile alatt fut; a profil a riport mellé kerül (--metrics-et kapcsol)")
+
+    parser.add_argument('--pipelined', action='store_true',
+                        help="Futószalagos futás: a szakaszok fájlonként, egymással átfedve futnak, korlátos sorokkal "
+                             "összekötve (batch módot kapcsol)")
+
+    watch = parser.add_argument_group("figyelő mód - az import mappába érkező fájlok folyamatos betöltése")
+    watch.add_argument('--watch', action='store_true',
+                       help="Az import mappa figyelése (inotify, különben szkennelés); batch módot és upsertet kapcsol")
+    watch.add_argument('--stable-seconds', type=float, default=WATCH_STABLE_SECONDS,
+                       help=f"Ennyi ideig változatlan fájl számít késznek (alapértelmezett: {WATCH_STABLE_SECONDS:g})")
+    watch.add_argument('--poll-interval', type=float, default=WATCH_POLL_SECONDS,
+                       help=f"Szkennelési időköz másodpercben (alapértelmezett: {WATCH_POLL_SECONDS:g})")
+    watch.add_argument('--queue-size', type=positive_int, default=None,
+                       help=f"Várakozó fájlok legnagyobb száma szakaszonként (alapértelmezett: --watch esetén "
+                            f"{WATCH_QUEUE_SIZE}, --pipelined esetén {PIPELINE_QUEUE_SIZE})")
+    watch.add_argument('--commit-rows', type=positive_int, default=WATCH_COMMIT_ROWS,
+                       help=f"Ennyi összegyűlt sor után azonnal betölt (alapértelmezett: {WATCH_COMMIT_ROWS})")
+    watch.add_argument('--commit-seconds', type=float, default=WATCH_COMMIT_SECONDS,
+                       help=f"Legfeljebb ennyit vár a betöltéssel (alapértelmezett: {WATCH_COMMIT_SECONDS:g})")
+
+    batch = parser.add_argument_group("felügyelet nélküli (batch) futás - kérdések helyett szabályok")
+    batch.add_argument('--batch', action='store_true',
+                       help="Kérdések nélküli futás a szabályok szerint; az eredmény gépileg olvasható összesítőbe kerül")
+    batch.add_argument('--config', help="Szabályok JSON fájlból (batch módot kapcsol; a kapcsolók felülírják)")
+    batch.add_argument('--encoding-order',
+                       help="Alacsony megbízhatóságú felismerésnél a mintára illő kódolások közül egyenlő "
+                            "pontszámnál ez a sorrend dönt, pl. utf-8,latin2,cp1250")
+    batch.add_argument('--min-confidence', type=float, help="A felismert kódolás elfogadási küszöbe (pl. 0.99)")
+    batch.add_argument('--folders', choices=POLICY_CHOICES['folders'], help="temp / export mappa: wipe vagy keep")
+    batch.add_argument('--tables', choices=POLICY_CHOICES['tables'],
+                       help="Meglévő táblák: replace (újra létrehozás) vagy append (upsert, mint --incremental)")
+    batch.add_argument('--check-table', choices=POLICY_CHOICES['check_table'],
+                       help="Hibátlan adagidőknél az ellenőrző tábla: keep vagy drop")
+    batch.add_argument('--summary', help=f"Futási összesítő útvonala (alapértelmezett: db/{RUN_SUMMARY_FILENAME})")
+    args = parser.parse_args(argv)
+    if args.in_memory and not (args.watch or args.pipelined):
+        ignored = [option for option, used in (('--workers', args.workers != 1),
+                                               ('--skip-unchanged', args.skip_unchanged)) if used]
+        if ignored:
+            parser.error(f"--in-memory mellett nem érvényes: {', '.join(ignored)} "
+                         f"(a fájlok sorban, köztes fájlok nélkül dolgozódnak fel)")
+    if args.panel_blocks and args.partition_months:
+        parser.error("--panel-blocks és --partition-months együtt nem használható (a panel tábla helyén "
+                     "vagy a blokkok, vagy a havi partíciók nézete áll)")
+    if args.queue_size is None:
+        args.queue_size = WATCH_QUEUE_SIZE if args.watch else PIPELINE_QUEUE_SIZE
+    return args
+
+
+def build_policy(args) -> dict:
+    """
+    Batch futás szabályai a konfigurációs fájlból és a kapcsolókból (None interaktív futásnál)
+
+    Raises:
+        ValueError, OSError: hibás vagy nem olvasható konfiguráció esetén
+    """
+    if not (args.batch or args.config or args.watch or args.pipelined):
+        return None
+    return load_policy(args.config, encoding_order=args.encoding_order, min_confidence=args.min_confidence,
+                       folders=args.folders, tables=args.tables, check_table=args.check_table)
+
+
+def write_mode(args, policy: dict = None) -> str:
+    """
+    Betöltési mód a kapcsolók (és batch módban a policy['tables']) alapján
+    """
+    if args.incremental or args.watch or (policy and policy['tables'] == 'append'):
+        return 'incremental'
+    return 'replace'
+
+
+def save_audit_table(df, folder_path: str, filename: str) -> None:
+    """
+    Köztes eredmény mentése ellenőrzési (audit) célra, a kiterjesztés szerinti formátumban
+    """
+    if not os.path.exists(folder_path):
+        os.makedirs(folder_path)
+    file_path = os.path.join(folder_path, filename)
+    write_table(df, file_path)
+    print(f"  🗂️  Audit mentés: {file_path}")
+
+
+def process_files_in_memory(import_folder: str, temp_folder: str, export_folder: str,
+                            write_intermediate: bool = False, fmt: str = 'csv', encoding_cache: dict = None,
+                            policy: dict = None, summary: dict = None, metrics: dict = None) -> dict:
+    """
+    Dekódolás → tisztítás → NF3 normalizálás memóriában, köztes CSV fájlok nélkül
+
+    Batch módban (policy) egy fájl hibája csak az adott fájlt hagyja ki.
+    metrics megadásával fájlonként mér (beolvasott bájtok, kimenő NF3 sorok).
+
+    Returns:
+        dict: táblanév -> DataFrame, az adatbázisba töltendő NF3 táblák
+    """
+    csv_files = scan_csv_files(import_folder, ('.csv',))
+
+    if not csv_files:
+        print(f"ℹ️  Nincs CSV fájl a mappában: {import_folder}")
+        return {}
+
+    display_csv_files(csv_files, import_folder)
+
+    nf_tables = {}
+    successful_files = []
+
+    for csv_file in csv_files:
+        input_file_path = os.path.join(import_folder, csv_file)
+
+        print(f"\n{'─' * 40}")
+        print(f"📄 {csv_file}")
+        print(f"{'─' * 40}")
+
+        with measure(metrics, 'in_memory', csv_file) as record:
+            try:
+                tables = process_dataframe_in_memory(input_file_path, temp_folder, export_folder,
+                                                     write_intermediate, fmt, encoding_cache, policy)
+            except Exception as e:
+                if not policy:
+                    raise
+                traceback.print_exc()
+                tables, error = None, f"{type(e).__name__}: {e}"
+            else:
+                error = None
+
+        if metrics is not None:
+            record['bytes_read'] = os.path.getsize(input_file_path)
+            record['rows_out'] = sum(len(table_data) for table_data in (tables or {}).values())
+
+        record_result(summary, 'in_memory', csv_file, bool(tables), error)
+        if not tables:
+            print(f"❌ SIKERTELEN")
+            continue
+
+        nf_tables.update(tables)
+        successful_files.append(csv_file)
+        print(f"✅ SIKERES")
+
+    if encoding_cache is not None:
+        save_encoding_cache(encoding_cache)
+
+    print(f"\n{'=' * 50}")
+    print(f"🎉 MEMÓRIABELI FELDOLGOZÁS KÉSZ: {len(successful_files)}/{len(csv_files)} fájl")
+    print(f"{'=' * 50}")
+
+    return nf_tables
+
+
+def process_dataframe_in_memory(input_file_path: str, temp_folder: str, export_folder: str,
+                                write_intermediate: bool = False, fmt: str = 'csv', encoding_cache: dict = None,
+                                policy: dict = None, encoding: str = None) -> dict:
+    """
+    Egy fájl dekódolása, tisztítása és NF3 normalizálása memóriában
+
+    Args:
+        encoding: előre kiválasztott kódolás (megadása esetén nincs felismerés)
+
+    Returns:
+        dict: táblanév -> DataFrame (None, ha a dekódolás sikertelen)
+    """
+    csv_file = os.path.basename(input_file_path)
+
+    # Dekódolás
+    if encoding is None:
+        encoding = select_file_encoding(input_file_path, encoding_cache, policy)
+    df = decode_csv_to_dataframe(input_file_path, encoding) if encoding else None
+    if df is None:
+        return None
+    log_frame_memory(df, "dekódolva")
+
+    decoded_name = decoded_filename(csv_file, fmt)
+    if write_intermediate:
+        save_audit_table(df, temp_folder, decoded_name)
+
+    # Tisztítás
+    df = clean_dataframe(df)
+    print(f"✅ Tisztított adatok: {len(df)} sor, {len(df.columns)} oszlop")
+    log_frame_memory(df, "tisztítva")
+
+    name, ext = os.path.splitext(decoded_name)
+    clean_name = f"{name}_clean{ext}"
+    if write_intermediate:
+        save_audit_table(df, export_folder, clean_name)
+
+    # NF3 normalizálás; a táblák a fájl alapú úttal (csv kiírás + típusos visszaolvasás) azonos
+    # értelmezésben: '' -> hiányzó érték, szám oszlop számként (különben pl. a hofok TEXT lenne)
+    tables = {table_name: apply_dtypes(csv_like_columns(table_data))
+              for table_name, table_data in normalize_dataframe(df, clean_name, policy).items()}
+    for table_name, table_data in tables.items():
+        print(f"  📋 {table_name} ({len(table_data)} sor)")
+        log_frame_memory(table_data, table_name)
+        if write_intermediate:
+            save_audit_table(table_data, export_folder, f"{table_name}{table_extension(fmt)}")
+
+    return tables
+
+
+def ingest_file_buffered(input_file_path: str, encoding: str, fmt: str = 'csv', policy: dict = None):
+    """
+    Figyelő módban egy fájl dekódolása, tisztítása és normalizálása külön folyamatban, pufferelt kimenettel
+
+    Returns:
+        tuple: (táblanév -> DataFrame vagy None, konzol kimenet, hibaüzenet vagy None)
+    """
+    buffer = io.StringIO()
+    tables, error = None, None
+    with redirect_stdout(buffer):
+        try:
+            tables = process_dataframe_in_memory(input_file_path, None, None, False, fmt, policy=policy,
+                                                 encoding=encoding)
+        except (Exception, SystemExit) as e:  # exit() is SystemExit - ne állítsa le a figyelést (a Ctrl+C igen)
+            error = f"{type(e).__name__}: {e}"
+            traceback.print_exc(file=buffer)
+    return tables, buffer.getvalue(), error
+
+
+def ignore_sigint() -> None:
+    """
+    Feldolgozó folyamat inicializálója: a Ctrl+C (SIGINT) a teljes folyamatcsoportnak szól, a leállítást
+    viszont a fő folyamat vezérli - a workerek befejezik a megkezdett fájlt
+    """
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+
+def encoding_cache_for(args, db_path: str):
+    """
+    A kódolás gyorsítótár (None, ha --no-encoding-cache)
+    """
+    return None if args.no_encoding_cache else load_encoding_cache(os.path.dirname(db_path))
+
+
+def main_watch(args, root_dir: str, db_path: str, policy: dict, summary: dict = None) -> None:
+    """
+    Figyelő mód: az import mappába érkező fájlok folyamatos feldolgozása és betöltése
+
+    A kódolás kiválasztása (gyorsítótárral) a fő folyamatban, a feldolgozás --workers folyamatban,
+    a betöltés egyetlen író szálban, kötegelt tranzakciókkal (upsert) történik. Leállítás: Ctrl+C.
+    """
+    import_folder = os.path.join(root_dir, 'import')
+    encoding_cache = encoding_cache_for(args, db_path)
+    encoding_lock = threading.Lock()
+    workers = max(1, args.workers)
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=ignore_sigint) as executor:
+
+        def process_file(path):
+            # A kódolás gyorsítótára közös: a kiválasztás és a mentés sorban történik
+            with encoding_lock:
+                encoding = select_file_encoding(path, encoding_cache, policy)
+                if encoding_cache is not None:
+                    save_encoding_cache(encoding_cache)
+            if not encoding:
+                return None, "nincs kiválasztott kódolás"
+            tables, log, error = executor.submit(ingest_file_buffered, path, encoding, args.storage_format,
+                                                 policy).result()
+            print(f"\n📄 {os.path.basename(path)}\n{log}", end='')
+            return tables, error
+
+        def load_tables(tables):
+            load_tables_to_db(tables, db_path, args.load_mode, args.batch_size, 'incremental', analyze=False,
+                              panel_blocks=args.panel_blocks, partition_months=args.partition_months,
+                              staging=not args.no_staging, duplicate_keys=args.duplicate_keys)
+
+        def on_result(filename, ok, error):
+            record_result(summary, 'watch', filename, ok, error)
+
+        # Szolgáltatásként futtatva SIGTERM-re is rendben (a folyamatban lévő fájlok befejezésével) áll le
+        stop_event = threading.Event()
+        if threading.current_thread() is threading.main_thread():
+            signal.signal(signal.SIGTERM, lambda signum, frame: stop_event.set())
+
+        run_watch(import_folder, process_file, load_tables, workers, ('.csv',), args.stable_seconds,
+                  args.poll_interval, args.queue_size, args.commit_rows, args.commit_seconds,
+                  stop_event, on_result)
+
+
+def normalize_file_buffered(input_file_path: str, policy: dict = None):
+    """
+    Futószalagos módban egy tisztított fájl NF3 normalizálása külön folyamatban, pufferelt kimenettel
+
+    A táblák közvetlenül a betöltéshez kerülnek: a közös export/<tábla>_NFdone fájlokat a párhuzamos
+    workerek egymás alatt írnák felül, miközben a betöltés még olvassa őket.
+
+    Returns:
+        tuple: (táblanév -> DataFrame vagy None, konzol kimenet, hibaüzenet vagy None)
+    """
+    buffer = io.StringIO()
+    tables, error = None, None
+    with redirect_stdout(buffer):
+        try:
+            tables = normalize_dataframe(read_typed_table(input_file_path), os.path.basename(input_file_path), policy)
+            for table_name, table_data in tables.items():
+                print(f"  📋 {table_name} ({len(table_data)} sor)")
+        except (Exception, SystemExit) as e:  # exit() is SystemExit - ne állítsa le a futószalagot
+            error = f"{type(e).__name__}: {e}"
+            traceback.print_exc(file=buffer)
+    return tables, buffer.getvalue(), error
+
+
+def main_pipelined(args, root_dir: str, temp_folder: str, export_folder: str, db_path: str,
+                   policy: dict, summary: dict = None, metrics: dict = None) -> None:
+    """
+    Futószalagos mód: dekódolás → tisztítás → normalizálás (→ betöltés) fájlonként, egymással átfedve
+
+    Minden szakasz saját szálon fut, korlátos sorokkal összekötve (--queue-size); a dekódolás,
+    tisztítás és normalizálás egy folyamatkészletben. A normalizált táblák DataFrame-ként jutnak
+    a betöltéshez. Inkrementális módban a betöltés egyetlen szálon, fájlonként egy tranzakcióban
+    (upsert) fut; teljes újratöltésnél a futószalag végén egyetlen betöltés (egy átmeneti adatbázis,
+    egy közzététel), azonos táblánál - mint a fájl alapú módban - a később listázott fájl táblájával.
+    A kódolások és a táblák felülírása előre, a fő szálon dőlnek el.
+    """
+    import_folder = os.path.join(root_dir, 'import')
+    csv_files = scan_csv_files(import_folder, ('.csv',))
+    if not csv_files:
+        print(f"ℹ️  Nincs CSV fájl a mappában: {import_folder}")
+        return
+    display_csv_files(csv_files, import_folder)
+
+    encodings = resolve_encodings(import_folder, csv_files, None, encoding_cache_for(args, db_path),
+                                  policy)
+    mode = write_mode(args, policy)
+    if mode == 'replace' and not check_existing_tables(db_path, policy):
+        print("❌ Adatbázis betöltés megszakítva!")
+        record_result(summary, 'load', db_path, False, "a meglévő táblák nem írhatók felül")
+        return
+    for folder in (temp_folder, export_folder):
+        if not os.path.exists(folder):
+            os.makedirs(folder)
+
+    workers = max(1, args.workers)
+    with ProcessPoolExecutor(max_workers=3 * workers) as executor:
+
+        def run_buffered(input_path, output_dir, process_type, encoding=None):
+            result, log, error, record = executor.submit(process_file_buffered, input_path, output_dir,
+                                                         process_type, encoding, args.storage_format,
+                                                         args.clean_chunksize, metrics is not None).result()
+            print(f"\n📄 {os.path.basename(input_path)} ({process_type})\n{log}", end='')
+            if record is not None:
+                record_file_io(record, input_path, [result])
+                add_record(metrics, record)
+            if error:
+                raise RuntimeError(error)
+            return result
+
+        def decode(path):
+            encoding = encodings.get(os.path.basename(path))
+            if not encoding:
+                raise ValueError("nincs kiválasztott kódolás")
+            return run_buffered(path, temp_folder, 'decode', encoding)
+
+        def clean(path):
+            return run_buffered(path, export_folder, 'clean')
+
+        def normalize(path):
+            tables, log, error = executor.submit(normalize_file_buffered, path, policy).result()
+            print(f"\n📄 {os.path.basename(path)} (normalize)\n{log}", end='')
+            if error:
+                raise RuntimeError(error)
+            return tables
+
+        def load(tables):
+            load_tables_to_db(tables, db_path, args.load_mode, args.batch_size, mode, analyze=False,
+                              panel_blocks=args.panel_blocks, partition_months=args.partition_months,
+                              staging=not args.no_staging, duplicate_keys=args.duplicate_keys)
+            return tables
+
+        def on_result(stage, name, ok, error):
+            record_result(summary, stage, name, ok, error)
+            print(f"{'✅' if ok else '❌'} {name}: {stage}" + (f" ({error})" if error else ""))
+
+        stages = [{'name': 'decode', 'func': decode, 'workers': workers},
+                  {'name': 'clean', 'func': clean, 'workers': workers},
+                  {'name': 'normalize', 'func': normalize, 'workers': workers}]
+        if mode == 'incremental':
+            stages.append({'name': 'load', 'func': load, 'workers': 1})
+        print(f"\n⚙️  Futószalag: {' → '.join(stage['name'] for stage in stages)} "
+              f"({workers} szál szakaszonként, sor: {args.queue_size})")
+        with measure(metrics, 'pipelined'):
+            finished = run_pipelined([(f, os.path.join(import_folder, f)) for f in csv_files], stages,
+                                     args.queue_size, on_result)
+            if mode == 'replace':
+                finished = load_pipelined_tables(args, finished, csv_files, db_path, on_result)
+    summarize_stage(metrics, 'pipelined')
+
+    loaded = [item['name'] for item in finished if item['error'] is None]
+    print("\n" + "=" * 60)
+    print(f"🎉 FUTÓSZALAG KÉSZ: {len(loaded)}/{len(csv_files)} fájl betöltve")
+    print("=" * 60)
+    print(f"\n💾 Adatbázis: {db_path}")
+
+
+def load_pipelined_tables(args, finished: list, csv_files: list, db_path: str, on_result) -> list:
+    """
+    Teljes újratöltés a futószalag végén: a sikeresen normalizált fájlok táblái egyetlen betöltésben
+
+    Returns:
+        list: az elemek, a betöltés hibájával kiegészítve
+    """
+    order = {name: index for index, name in enumerate(csv_files)}
+    ready = sorted((item for item in finished if item['error'] is None), key=lambda item: order[item['name']])
+    if not ready:
+        return finished
+
+    tables = {}
+    for item in ready:
+        tables.update(item['value'])
+    print(f"\n💾 Betöltés: {len(ready)} fájl, {len(tables)} tábla")
+    try:
+        load_tables_to_db(tables, db_path, args.load_mode, args.batch_size, 'replace',
+                          panel_blocks=args.panel_blocks, partition_months=args.partition_months,
+                          staging=not args.no_staging, duplicate_keys=args.duplicate_keys)
+        error = None
+    except Exception as e:
+        traceback.print_exc()
+        error = f"{type(e).__name__}: {e}"
+    for item in ready:
+        item['error'] = error
+        on_result('load', item['name'], error is None, error)
+    return finished
+
+
+def main_in_memory(args, root_dir: str, temp_folder: str, export_folder: str, db_path: str,
+                   policy: dict = None, summary: dict = None, metrics: dict = None) -> None:
+    """
+    Memóriabeli folyamat: a szakaszok DataFrame-eket adnak át egymásnak
+    """
+    import_folder = os.path.join(root_dir, 'import')
+
+    # 2-4. LÉPÉS: Dekódolás, tisztítás és normalizálás memóriában
+    print("\n2-4. 🧠 DEKÓDOLÁS, TISZTÍTÁS ÉS NF3 NORMALIZÁLÁS MEMÓRIÁBAN")
+    print("-" * 30)
+    print(f"🔍 Forrás: {import_folder}")
+    if args.audit:
+        print(f"🗂️  Köztes fájlok mentése: temp és export mappa")
+
+    with measure(metrics, 'in_memory'):
+        nf_tables = process_files_in_memory(import_folder, temp_folder, export_folder, args.audit,
+                                            args.storage_format, encoding_cache_for(args, db_path),
+                                            policy, summary, metrics)
+    summarize_stage(metrics, 'in_memory')
+
+    if not nf_tables:
+        print("❌ NF3 normalizálás sikertelen, folyamat leállítva!")
+        record_result(summary, 'load', db_path, False, "nincs betölthető NF3 tábla")
+        return
+
+    # 5. LÉPÉS: Adatbázis betöltés NF3 táblákkal
+    print("\n5. 🗃️  ADATBÁZIS BETÖLTÉS NF3 TÁBLÁKKAL")
+    print("-" * 30)
+
+    if write_mode(args, policy) == 'replace' and not check_existing_tables(db_path, policy):
+        print("❌ Adatbázis betöltés megszakítva!")
+        record_result(summary, 'load', db_path, False, "a meglévő táblák nem írhatók felül")
+        return
+
+    with measure(metrics, 'load') as record:
+        record['rows_in'] = sum(len(table_data) for table_data in nf_tables.values())
+        table_count = load_tables_to_db(nf_tables, db_path, args.load_mode, args.batch_size,
+                                        write_mode(args, policy), panel_blocks=args.panel_blocks,
+                                        partition_months=args.partition_months,
+                                        staging=not args.no_staging, duplicate_keys=args.duplicate_keys)
+    record_result(summary, 'load', db_path, True, tables=table_count)
+
+    print("\n" + "=" * 60)
+    print("🎉 MINDEN FOLYAMAT SIKERESEN BEFEJEZVE!")
+    print("=" * 60)
+
+    print(f"\n📊 NF3 TÁBLÁK: {len(nf_tables)} tábla")
+    for table_name, table_data in nf_tables.items():
+        print(f"   📋 {table_name} ({len(table_data)} sor)")
+
+    print(f"\n💾 Adatbázis: {db_path}")
+
+
+def main(args=None):
     """
     Főprogram - Teljes adatfeldolgozási folyamat
+
+    Batch módban (--batch / --config) nincs kérdés és futás közbeni kilépés: a hibák a futási
+    összesítőbe (db/run_summary.json) kerülnek, a visszatérési érték a kilépési kód.
     """
+    if args is None:
+        args = parse_args()
+
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    summary_path = args.summary or os.path.join(os.path.dirname(current_dir), 'db', RUN_SUMMARY_FILENAME)
+
+    try:
+        policy = build_policy(args)
+    except (OSError, ValueError) as e:
+        print(f"❌ Hibás batch beállítás: {e}")
+        summary = new_run_summary(None)
+        record_result(summary, 'config', args.config or 'kapcsolók', False, str(e))
+        finish_run_summary(summary, summary_path, 'failed')
+        return 2
+
+    metrics = None
+    if args.metrics is not None or args.profile:
+        report_path = args.metrics or os.path.join(os.path.dirname(current_dir), 'db', METRICS_FILENAME)
+        metrics = new_metrics(report_path, args.profile)
+
+    if policy is None:
+        try:
+            run_pipeline(args, metrics=metrics)
+        finally:
+            finish_metrics(metrics)
+        return 0
+
+    print(f"🤖 Batch mód: {policy}")
+    summary = new_run_summary(policy)
+    try:
+        run_pipeline(args, policy, summary, metrics)
+    except Exception as e:
+        traceback.print_exc()
+        record_result(summary, 'pipeline', 'main', False, f"{type(e).__name__}: {e}")
+    finish_metrics(metrics)
+
+    status = finish_run_summary(summary, summary_path)
+    print(f"\n📋 Futási összesítő: {summary_path} ({status})")
+    return 0 if status == 'ok' else 1
+
+
+def finish_metrics(metrics: dict) -> None:
+    """Mérések mentése a riportba és az adatbázis run_metrics táblájába"""
+    if metrics is None or not metrics['records']:
+        return
+
+    print_metrics(metrics)
+    print(f"📈 Mérési riport: {write_metrics_report(metrics)}")
+
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    db_path = os.path.join(os.path.dirname(current_dir), 'db', 'data.db')
+    if os.path.exists(db_path):
+        save_metrics_to_db(metrics, db_path)
+
+
+def run_pipeline(args, policy: dict = None, summary: dict = None, metrics: dict = None) -> None:
+    """
+    A teljes folyamat lépései (policy megadásával kérdések nélkül, metrics megadásával szakaszonként mérve)
+    """
+    if not require_pyarrow(args.storage_format):
+        record_result(summary, 'config', args.storage_format, False, "a formátumhoz pyarrow szükséges")
+        return
+
+    # A meglévő adatbázison inkrementálisan nem váltható panel tárolás - még a feldolgozás előtt kiderül
+    data_db = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'db', 'data.db')
+    layout_error = check_panel_layout(data_db, write_mode(args, policy), args.panel_blocks, args.partition_months)
+    if layout_error:
+        print(f"❌ {layout_error}")
+        record_result(summary, 'config', 'data.db', False, layout_error)
+        return
 
     print("=" * 60)
     print("🚀 TELJES ADATFELDOLGOZÁSI FOLYAMAT")
@@ -156,24 +1060,46 @@ def main():
     export_folder = os.path.join(root_dir, 'export')
     db_path = os.path.join(root_dir, 'db', 'data.db')  # root/db/data.db
 
-    # Temp mappa kiürítése
-    cleanup_folder(temp_folder, "temp")
+    # Manifest alapú futásnál a korábbi kimenetek megmaradnak (ezekből dől el, mi hagyható ki)
+    manifest = None
+    if args.skip_unchanged and not (args.in_memory or args.pipelined):
+        manifest = load_manifest(os.path.dirname(db_path))
+        print("ℹ️  Változatlan bemenetek kihagyása (manifest): a temp és export mappa megmarad")
 
-    # Export mappa kiürítése
-    cleanup_folder(export_folder, "export")
+    # Memóriabeli módban köztes fájlok csak audit esetén keletkeznek
+    elif (not args.in_memory or args.audit) and not args.watch:
+        # Temp mappa kiürítése
+        cleanup_folder(temp_folder, "temp", policy)
+
+        # Export mappa kiürítése
+        cleanup_folder(export_folder, "export", policy)
 
     # 1. LÉPÉS: Adatbázis létrehozás - ÁTADJUK A TELJES ÚTVONALAT
     print("\n1. 📊 ADATBÁZIS LÉTREHOZÁS")
     print("-" * 30)
 
-    db_success = create_database(db_path)  # <- MÓDOSÍTOTT: átadjuk a db_path-et
+    with measure(metrics, 'create_database'):
+        db_success = create_database(db_path)  # <- MÓDOSÍTOTT: átadjuk a db_path-et
 
     if not db_success:
         print("❌ Adatbázis létrehozása sikertelen, folyamat leállítva!")
+        record_result(summary, 'database', db_path, False, "az adatbázis nem hozható létre")
         return
 
     print("✅ Adatbázis sikeresen létrehozva!")
 
+    if args.watch:
+        main_watch(args, root_dir, db_path, policy, summary)
+        return
+
+    if args.pipelined:
+        main_pipelined(args, root_dir, temp_folder, export_folder, db_path, policy, summary, metrics)
+        return
+
+    if args.in_memory:
+        main_in_memory(args, root_dir, temp_folder, export_folder, db_path, policy, summary, metrics)
+        return
+
     # 2. LÉPÉS: Import mappa dekódolása → temp mappa
     print("\n2. 📁 IMPORT MAPPA DEKÓDOLÁSA")
     print("-" * 30)
@@ -182,7 +1108,12 @@ def main():
     print(f"🔍 Forrás: {import_folder}")
     print(f"🎯 Cél: temp mappa")
 
-    process_csv_files(import_folder, 'temp', 'decode')
+    with measure(metrics, 'decode'):
+        process_csv_files(import_folder, 'temp', 'decode', args.workers, args.storage_format, manifest,
+                          encoding_cache_for(args, db_path), policy, summary, metrics=metrics)
+    summarize_stage(metrics, 'decode')
+    if manifest is not None:
+        save_manifest(manifest)
 
     # 3. LÉPÉS: Temp mappa tisztítása → export mappa
     print("\n3. 🧹 TEMP MAPPA TISZTÍTÁSA")
@@ -191,28 +1122,70 @@ def main():
     print(f"🔍 Forrás: {temp_folder}")
     print(f"🎯 Cél: export mappa")
 
-    process_csv_files(temp_folder, 'export', 'clean')
+    with measure(metrics, 'clean'):
+        process_csv_files(temp_folder, 'export', 'clean', args.workers, args.storage_format, manifest,
+                          policy=policy, summary=summary, chunksize=args.clean_chunksize, metrics=metrics)
+    summarize_stage(metrics, 'clean')
+    if manifest is not None:
+        save_manifest(manifest)
 
     # 4. LÉPÉS: Export mappa NF3 normalizálása
     print("\n4. 🔧 EXPORT MAPPA NF3 NORMALIZÁLÁSA")
     print("-" * 30)
 
-    tables_created = normalize_export_files(export_folder)
+    with measure(metrics, 'normalize'):
+        tables_created = normalize_export_files(export_folder, args.storage_format, manifest, policy, summary,
+                                                metrics)
+    summarize_stage(metrics, 'normalize')
+    if manifest is not None:
+        save_manifest(manifest)
 
     if tables_created == 0:
         print("❌ NF3 normalizálás sikertelen, folyamat leállítva!")
+        record_result(summary, 'load', db_path, False, "nincs betölthető NF3 tábla")
         return
 
     # 5. LÉPÉS: Adatbázis betöltés NF3 táblákkal
     print("\n5. 🗃️  ADATBÁZIS BETÖLTÉS NF3 TÁBLÁKKAL")
     print("-" * 30)
 
-    # Meglévő táblák ellenőrzése
-    if not check_existing_tables(db_path):
-        print("❌ Adatbázis betöltés megszakítva!")
-        return
+    nf_files = None
+    load_skipped = False
+    if manifest is not None:
+        # Csak a manifestben nyilvántartott (aktuális) _NFdone fájlok töltődnek be
+        nf_paths = [path for path in stage_outputs(manifest, 'normalize') if os.path.exists(path)]
+        nf_files = [os.path.basename(path) for path in nf_paths]
+        load_skipped = load_is_fresh(manifest, nf_paths, db_path, write_mode(args, policy))
+
+    if load_skipped:
+        print("⏭️  VÁLTOZATLAN _NFdone fájlok, az adatbázis betöltés kimarad")
+        record_result(summary, 'load', db_path, None)
+    else:
+        # Meglévő táblák ellenőrzése (inkrementális módban nincs törlés)
+        if write_mode(args, policy) == 'replace' and not check_existing_tables(db_path, policy):
+            print("❌ Adatbázis betöltés megszakítva!")
+            record_result(summary, 'load', db_path, False, "a meglévő táblák nem írhatók felül")
+            return
+
+        load_io = {}
+        if metrics is not None:
+            # A bemenet mérete a mérésen kívül számolódik
+            load_paths = [os.path.join(export_folder, f)
+                          for f in (nf_files if nf_files is not None else discover_nf_tables(export_folder))]
+            load_io = {'rows_in': sum(count_table_rows(path) for path in load_paths),
+                       'bytes_read': sum(os.path.getsize(path) for path in load_paths)}
+
+        with measure(metrics, 'load') as record:
+            record.update(load_io)
+            table_count = load_nf_tables_to_db(export_folder, db_path, args.load_mode, args.batch_size,
+                                               write_mode(args, policy), nf_files, panel_blocks=args.panel_blocks,
+                                               partition_months=args.partition_months,
+                                               staging=not args.no_staging, duplicate_keys=args.duplicate_keys)
+        record_result(summary, 'load', db_path, True, tables=table_count)
 
-    load_nf_tables_to_db(export_folder, db_path)  # <- MÓDOSÍTOTT: átadjuk a db_path-et
+        if manifest is not None:
+            record_load(manifest, nf_paths, db_path, write_mode(args, policy))
+            save_manifest(manifest)
 
     # 6. LÉPÉS: Végleges eredmény
     print("\n" + "=" * 60)
@@ -241,4 +1214,4 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    sys.exit(main())
@@ -0,0 +1,199 @@
+import os
+import json
+import sqlite3
+import hashlib
+
+
+MANIFEST_FILENAME = 'manifest.json'
+HASH_CHUNK_SIZE = 1024 * 1024
+
+
+def manifest_path(db_dir: str) -> str:
+    """Manifest fájl útvonala (a db mappában)"""
+    return os.path.join(db_dir, MANIFEST_FILENAME)
+
+
+def load_manifest(db_dir: str) -> dict:
+    """
+    Manifest betöltése - fájl hash-ek, kódolások és szakasz kimenetek nyilvántartása
+
+    Returns:
+        dict: a manifest (üres szerkezet, ha még nincs vagy sérült)
+    """
+    manifest = {'root': os.path.dirname(os.path.abspath(db_dir)), 'db_dir': db_dir, 'files': {}, 'stages': {}}
+
+    path = manifest_path(db_dir)
+    if os.path.exists(path):
+        try:
+            with open(path, 'r', encoding='utf-8') as file:
+                stored = json.load(file)
+            manifest['files'] = stored.get('files', {})
+            manifest['stages'] = stored.get('stages', {})
+        except (OSError, ValueError) as e:
+            print(f"⚠️  A manifest nem olvasható, újraépül: {e}")
+
+    return manifest
+
+
+def save_manifest(manifest: dict) -> None:
+    """Manifest mentése (atomikus cserével)"""
+    db_dir = manifest['db_dir']
+    if not os.path.exists(db_dir):
+        os.makedirs(db_dir)
+
+    path = manifest_path(db_dir)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w', encoding='utf-8') as file:
+        json.dump({'files': manifest['files'], 'stages': manifest['stages']}, file, ensure_ascii=False, indent=2)
+    os.replace(tmp_path, path)
+
+
+def manifest_key(manifest: dict, path: str) -> str:
+    """Fájl kulcsa a manifestben (a projekt gyökeréhez relatív útvonal)"""
+    return os.path.relpath(os.path.abspath(path), manifest['root']).replace(os.sep, '/')
+
+
+def file_hash(manifest: dict, path: str) -> str:
+    """
+    Fájl tartalmának SHA-256 hash-e
+
+    Ha a méret és a módosítási idő nem változott, a korábban számolt hash-t használjuk
+    (a fájl újraolvasása nélkül).
+    """
+    stat = os.stat(path)
+    key = manifest_key(manifest, path)
+    cached = manifest['files'].get(key)
+    if cached and cached['size'] == stat.st_size and cached['mtime_ns'] == stat.st_mtime_ns:
+        return cached['hash']
+
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for chunk in iter(lambda: file.read(HASH_CHUNK_SIZE), b''):
+            digest.update(chunk)
+
+    manifest['files'][key] = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'hash': digest.hexdigest()}
+    return digest.hexdigest()
+
+
+def stage_entry(manifest: dict, stage: str, source_path: str) -> dict:
+    """Szakasz bejegyzése egy forrásfájlhoz (None, ha nincs)"""
+    return manifest['stages'].get(stage, {}).get(manifest_key(manifest, source_path))
+
+
+def stage_is_fresh(manifest: dict, stage: str, source_path: str, **settings) -> bool:
+    """
+    Kihagyható-e a szakasz: a forrás hash-e és a beállítások (pl. formátum) nem változtak,
+    és minden rögzített kimenet létezik a rögzített tartalommal
+    """
+    entry = stage_entry(manifest, stage, source_path)
+    if not entry or not os.path.exists(source_path):
+        return False
+    if entry['source_hash'] != file_hash(manifest, source_path):
+        return False
+    if any(entry.get(name) != value for name, value in settings.items()):
+        return False
+
+    for output_key, output_hash in entry['outputs'].items():
+        output_path = os.path.join(manifest['root'], output_key)
+        if not os.path.exists(output_path) or file_hash(manifest, output_path) != output_hash:
+            return False
+
+    return True
+
+
+def record_stage(manifest: dict, stage: str, source_path: str, output_paths: list, **extra) -> None:
+    """
+    Szakasz eredményének rögzítése (forrás hash, kimenetek hash-e, egyéb adatok pl. kódolás, formátum)
+
+    Az ugyanebből a forrásból korábban készült, de most már nem keletkező kimenetek
+    (pl. formátumváltás után) törlődnek.
+    """
+    entry = {
+        'source_hash': file_hash(manifest, source_path),
+        'outputs': {manifest_key(manifest, path): file_hash(manifest, path) for path in output_paths},
+    }
+    entry.update(extra)
+
+    previous = stage_entry(manifest, stage, source_path)
+    if previous:
+        for output_key in previous['outputs']:
+            output_path = os.path.join(manifest['root'], output_key)
+            if output_key not in entry['outputs'] and os.path.exists(output_path):
+                os.remove(output_path)
+
+    manifest['stages'].setdefault(stage, {})[manifest_key(manifest, source_path)] = entry
+
+
+def previous_encoding(manifest: dict, source_path: str) -> str:
+    """Korábban választott kódolás, ha a forrás tartalma azóta nem változott"""
+    entry = stage_entry(manifest, 'decode', source_path)
+    if entry and entry.get('encoding') and entry['source_hash'] == file_hash(manifest, source_path):
+        return entry['encoding']
+    return None
+
+
+def combined_hash(manifest: dict, paths: list, *extra) -> str:
+    """Több fájl együttes hash-e (pl. a betöltött _NFdone fájlok halmaza)"""
+    digest = hashlib.sha256()
+    for path in sorted(paths, key=lambda p: manifest_key(manifest, p)):
+        digest.update(manifest_key(manifest, path).encode('utf-8'))
+        digest.update(file_hash(manifest, path).encode('ascii'))
+    for item in extra:
+        digest.update(str(item).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def remove_stale_outputs(manifest: dict, stage: str, current_sources: list) -> list:
+    """
+    A már nem létező forrásokhoz tartozó kimenetek törlése a manifestből és a lemezről
+
+    Returns:
+        list: a törölt kimeneti fájlok
+    """
+    current_keys = {manifest_key(manifest, path) for path in current_sources}
+    entries = manifest['stages'].get(stage, {})
+    removed = []
+
+    for source_key in [key for key in entries if key not in current_keys]:
+        for output_key in entries.pop(source_key)['outputs']:
+            output_path = os.path.join(manifest['root'], output_key)
+            if os.path.exists(output_path):
+                os.remove(output_path)
+                removed.append(output_path)
+
+    return removed
+
+
+def stage_outputs(manifest: dict, stage: str) -> list:
+    """Egy szakasz összes rögzített kimenete (abszolút útvonalak)"""
+    return [os.path.join(manifest['root'], output_key)
+            for entry in manifest['stages'].get(stage, {}).values()
+            for output_key in entry['outputs']]
+
+
+def load_is_fresh(manifest: dict, nf_paths: list, db_path: str, *settings) -> bool:
+    """
+    Kihagyható-e az adatbázis betöltés: ugyanazok az _NFdone fájlok, ugyanazzal a beállítással,
+    és a korábban betöltött táblák még megvannak
+    """
+    entry = manifest['stages'].get('load', {}).get(manifest_key(manifest, db_path))
+    if entry is None or not os.path.exists(db_path) or not nf_paths:
+        return False
+    if entry['source_hash'] != combined_hash(manifest, nf_paths, *settings):
+        return False
+
+    conn = sqlite3.connect(db_path)
+    try:
+        existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+    finally:
+        conn.close()
+    return all(table in existing for table in entry['tables'])
+
+
+def record_load(manifest: dict, nf_paths: list, db_path: str, *settings) -> None:
+    """Sikeres adatbázis betöltés rögzítése"""
+    manifest['stages'].setdefault('load', {})[manifest_key(manifest, db_path)] = {
+        'source_hash': combined_hash(manifest, nf_paths, *settings),
+        'outputs': {},
+        'tables': [os.path.splitext(os.path.basename(path))[0] for path in nf_paths],
+    }
@@ -0,0 +1,225 @@
+import os
+import io
+import sys
+import csv
+import json
+import time
+import pstats
+import sqlite3
+import cProfile
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+METRICS_FILENAME = 'run_metrics.json'
+METRICS_TABLE = 'run_metrics'
+
+# A riport / tábla oszlopai sorrendben
+METRIC_FIELDS = ['run_id', 'stage', 'item', 'started', 'wall_seconds', 'cpu_seconds', 'peak_rss_mb',
+                 'rss_growth_mb', 'rows_in', 'rows_out', 'bytes_read', 'bytes_written']
+
+
+def peak_rss_mb(who: str = 'self') -> float:
+    """
+    A folyamat (who='children': a már befejezett gyermekfolyamatok) teljes élettartama alatti
+    csúcs memóriahasználata (MB; Linuxon a reset_peak_rss nullázza) - szakaszonkénti méréshez a szakasz
+    külön folyamatban fusson
+    """
+    if resource is None:
+        return float('nan')
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN if who == 'children' else resource.RUSAGE_SELF)
+    # Linuxon KB-ban, macOS-en bájtban
+    return usage.ru_maxrss / (1024 * 1024) if sys.platform == 'darwin' else usage.ru_maxrss / 1024
+
+
+def proc_status_mb(field: str) -> float:
+    """A /proc/self/status egy memória sora (pl. VmRSS, VmHWM) MB-ban (Linux)"""
+    with open('/proc/self/status') as file:
+        for line in file:
+            if line.startswith(f"{field}:"):
+                return int(line.split()[1]) / 1024
+    raise ValueError(f"Nincs {field} a /proc/self/status-ban")
+
+
+def reset_peak_rss():
+    """
+    A folyamat csúcs memóriájának (VmHWM) nullázása a jelenlegi memóriára (Linux, /proc/self/clear_refs),
+    hogy a következő kiolvasás csak az azóta eltelt időre vonatkozzon
+
+    Returns:
+        float | None: a nullázás előtti csúcs (MB); None, ha a rendszer nem támogatja
+    """
+    try:
+        peak = proc_status_mb('VmHWM')
+        with open('/proc/self/clear_refs', 'w') as file:
+            file.write('5')
+        return peak
+    except (OSError, ValueError):
+        return None
+
+
+def children_cpu_seconds() -> float:
+    """A befejezett gyermekfolyamatok (pl. worker-ek) CPU ideje"""
+    if resource is None:
+        return 0.0
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def new_metrics(report_path: str, profile_stage: str = None) -> dict:
+    """
+    Mérési gyűjtő egy futáshoz
+
+    Args:
+        report_path: a riport útvonala (.json vagy .csv); a profil kimenet is mellé kerül
+        profile_stage: ennek a szakasznak a futása cProfile alatt megy
+    """
+    return {
+        'run_id': time.strftime('%Y%m%dT%H%M%S'),
+        'report_path': report_path,
+        'profile_stage': profile_stage,
+        'records': [],
+        'open_records': [],
+    }
+
+
+@contextmanager
+def measure(metrics: dict, stage: str, item: str = None):
+    """
+    Egy szakasz (item=None) vagy egy fájl feldolgozásának mérése
+
+    A kapott rekordba a hívó beírhatja a rows_in / rows_out / bytes_read / bytes_written értékeket.
+    A peak_rss_mb a mérés alatti csúcs memória: a folyamat csúcsa a mérés elején nullázódik (a még futó
+    külső mérések addigi csúcsa előbb beléjük kerül), a közben felvett worker rekordok csúcsa is beszámít;
+    ahol a nullázás nem támogatott (nem Linux), üres. metrics=None esetén nem mér semmit.
+    """
+    if metrics is None:
+        yield {}
+        return
+
+    record = {'run_id': metrics['run_id'], 'stage': stage, 'item': item,
+              'started': time.strftime('%Y-%m-%dT%H:%M:%S'),
+              'rows_in': None, 'rows_out': None, 'bytes_read': None, 'bytes_written': None}
+
+    profiler = None
+    if item is None and metrics['profile_stage'] == stage:
+        profiler = cProfile.Profile()
+
+    open_records = metrics['open_records']
+    outer_peak = reset_peak_rss()
+    rss_before = None
+    if outer_peak is not None:
+        for outer in open_records:
+            outer['peak_rss_mb'] = max(outer['peak_rss_mb'], outer_peak)
+        rss_before = proc_status_mb('VmRSS')
+    record['peak_rss_mb'] = rss_before
+    record['rss_growth_mb'] = None
+    open_records.append(record)
+    first_record = len(metrics['records'])
+
+    cpu_start = time.process_time() + children_cpu_seconds()
+    wall_start = time.perf_counter()
+    if profiler:
+        profiler.enable()
+    try:
+        yield record
+    finally:
+        if profiler:
+            profiler.disable()
+        record['wall_seconds'] = time.perf_counter() - wall_start
+        record['cpu_seconds'] = time.process_time() + children_cpu_seconds() - cpu_start
+        open_records.remove(record)
+        if rss_before is not None:
+            added = [r['peak_rss_mb'] for r in metrics['records'][first_record:] if r.get('peak_rss_mb') is not None]
+            record['peak_rss_mb'] = max([record['peak_rss_mb'], proc_status_mb('VmHWM')] + added)
+            record['rss_growth_mb'] = record['peak_rss_mb'] - rss_before
+        metrics['records'].append(record)
+        if profiler:
+            dump_profile(metrics, stage, profiler)
+
+
+def add_record(metrics: dict, record: dict) -> None:
+    """Máshol (pl. worker folyamatban) mért rekord felvétele"""
+    if metrics is not None and record:
+        record['run_id'] = metrics['run_id']
+        metrics['records'].append(record)
+
+
+def summarize_stage(metrics: dict, stage: str) -> None:
+    """A szakasz rekordjába a fájlonkénti sorok / bájtok összege kerül"""
+    if metrics is None:
+        return
+    items = [r for r in metrics['records'] if r['stage'] == stage and r['item'] is not None]
+    totals = [r for r in metrics['records'] if r['stage'] == stage and r['item'] is None]
+    if not items or not totals:
+        return
+    for field in ('rows_in', 'rows_out', 'bytes_read', 'bytes_written'):
+        values = [r[field] for r in items if r[field] is not None]
+        if values and totals[-1][field] is None:
+            totals[-1][field] = sum(values)
+
+
+def dump_profile(metrics: dict, stage: str, profiler) -> None:
+    """cProfile eredmény mentése a riport mellé (.prof + olvasható .txt összesítő)"""
+    base = os.path.splitext(metrics['report_path'])[0]
+    prof_path = f"{base}.{stage}.prof"
+    profiler.dump_stats(prof_path)
+
+    text = io.StringIO()
+    pstats.Stats(profiler, stream=text).sort_stats('cumulative').print_stats(40)
+    with open(f"{base}.{stage}.txt", 'w', encoding='utf-8') as file:
+        file.write(text.getvalue())
+    print(f"🔬 Profil ({stage}): {prof_path}")
+
+
+def write_metrics_report(metrics: dict) -> str:
+    """Mérések mentése JSON vagy CSV riportba (a kiterjesztés szerint)"""
+    path = metrics['report_path']
+    report_dir = os.path.dirname(os.path.abspath(path))
+    if not os.path.exists(report_dir):
+        os.makedirs(report_dir)
+
+    if path.lower().endswith('.csv'):
+        with open(path, 'w', encoding='utf-8-sig', newline='') as file:
+            writer = csv.DictWriter(file, fieldnames=METRIC_FIELDS, delimiter=';')
+            writer.writeheader()
+            writer.writerows(metrics['records'])
+    else:
+        with open(path, 'w', encoding='utf-8') as file:
+            json.dump({'run_id': metrics['run_id'], 'records': metrics['records']}, file,
+                      ensure_ascii=False, indent=2)
+    return path
+
+
+def save_metrics_to_db(metrics: dict, db_path: str) -> None:
+    """Mérések hozzáfűzése az adatbázis run_metrics táblájához"""
+    conn = sqlite3.connect(db_path)
+    try:
+        conn.execute(f"""
+            CREATE TABLE IF NOT EXISTS {METRICS_TABLE} (
+                run_id TEXT, stage TEXT, item TEXT, started TEXT,
+                wall_seconds REAL, cpu_seconds REAL, peak_rss_mb REAL, rss_growth_mb REAL,
+                rows_in INTEGER, rows_out INTEGER, bytes_read INTEGER, bytes_written INTEGER
+            )""")
+        conn.executemany(
+            f"INSERT INTO {METRICS_TABLE} ({', '.join(METRIC_FIELDS)}) VALUES ({', '.join('?' * len(METRIC_FIELDS))})",
+            [[record.get(field) for field in METRIC_FIELDS] for record in metrics['records']])
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def print_metrics(metrics: dict) -> None:
+    """Szakaszonkénti összesítő a konzolra"""
+    print(f"\n{'Szakasz':<16} {'fal (s)':>9} {'CPU (s)':>9} {'csúcs MB':>9} {'sor be':>10} {'sor ki':>10}")
+    for record in metrics['records']:
+        if record['item'] is not None:
+            continue
+        peak = f"{record['peak_rss_mb']:.1f}" if record['peak_rss_mb'] is not None else '-'
+        print(f"{record['stage']:<16} {record['wall_seconds']:>9.2f} {record['cpu_seconds']:>9.2f} "
+              f"{peak:>9} {record['rows_in'] if record['rows_in'] is not None else '-':>10} "
+              f"{record['rows_out'] if record['rows_out'] is not None else '-':>10}")
@@ -1,18 +1,17 @@
+import numpy as np
 import pandas as pd
 import os
-from datetime import datetime
+from storage import DATETIME_FORMAT, table_extension, write_table
+from dtype_policy import read_typed_table, log_frame_memory
 
 
-def calculate_time_difference(start_date, start_time, end_date, end_time):
-    """Időkülönbség számítása percekben"""
-    start_str = f"{start_date} {start_time}"
-    end_str = f"{end_date} {end_time}"
+def calculate_time_differences(start_dates, start_times, end_dates, end_times):
+    """Időkülönbségek számítása percekben, oszloponként (vektorizált)"""
+    start_dt = pd.to_datetime(start_dates.astype(str) + ' ' + start_times.astype(str), format=DATETIME_FORMAT)
+    end_dt = pd.to_datetime(end_dates.astype(str) + ' ' + end_times.astype(str), format=DATETIME_FORMAT)
 
-    start_dt = datetime.strptime(start_str, '%Y.%m.%d %H:%M:%S')
-    end_dt = datetime.strptime(end_str, '%Y.%m.%d %H:%M:%S')
-
-    diff_minutes = (end_dt - start_dt).total_seconds() / 60
-    return int(diff_minutes)  # Egész percekben
+    diff_minutes = (end_dt - start_dt).dt.total_seconds() / 60
+    return np.trunc(diff_minutes).astype('int64')  # Egész percekben (nulla felé csonkolva)
 
 
 def normalize_adagok(df):
@@ -27,38 +26,30 @@ def normalize_adagok(df):
     vege_adatok = df[['ADAGSZÁM', 'Vége_DÁTUM', 'Vége_IDŐ']].copy()
 
     # 3. Tábla: Idő ellenőrzés - CSAK A LÉNYEGES OSZLOPOK
-    ido_ellenorzes_data = []
-    hiba_count = 0
-
-    for _, row in df.iterrows():
-        # Adagidő számítása
-        szamitott_adagido = calculate_time_difference(
-            row['Kezdet_DÁTUM'], row['Kezdet_IDŐ'],
-            row['Vége_DÁTUM'], row['Vége_IDŐ']
-        )
-
-        # CRC hiba ellenőrzés
-        crc_error = abs(szamitott_adagido - row['ADAGIDŐ']) > 1
-
-        if crc_error:
-            hiba_count += 1
-
-        ido_ellenorzes_data.append({
-            'ADAGSZÁM': row['ADAGSZÁM'],
-            'Örökölt_ADAGIDŐ': row['ADAGIDŐ'],
-            'Számított_ADAGIDŐ': szamitott_adagido,
-            'CRC_Error': crc_error
-        })
-
-    ido_ellenorzes = pd.DataFrame(ido_ellenorzes_data)
-
-    # Hibajelzés a konzolon
+    # Adagidő számítása oszloponként
+    szamitott_adagido = calculate_time_differences(
+        df['Kezdet_DÁTUM'], df['Kezdet_IDŐ'],
+        df['Vége_DÁTUM'], df['Vége_IDŐ']
+    )
+
+    # CRC hiba ellenőrzés logikai maszkkal
+    crc_error = (szamitott_adagido - df['ADAGIDŐ']).abs() > 1
+    hiba_count = int(crc_error.sum())
+
+    ido_ellenorzes = pd.DataFrame({
+        'ADAGSZÁM': df['ADAGSZÁM'].array,
+        'Örökölt_ADAGIDŐ': df['ADAGIDŐ'].array,
+        'Számított_ADAGIDŐ': szamitott_adagido.to_numpy(dtype='int32'),
+        'CRC_Error': crc_error.array
+    })
+
+    # Hibajelzés a konzolon - egyetlen összesítő kiírás
     if hiba_count > 0:
-        print(f"  ⚠️  FIGYELMEZTETÉS: {hiba_count} CRC hiba található!")
-        print("  Hibás adagok:")
-        for _, hiba in ido_ellenorzes[ido_ellenorzes['CRC_Error'] == True].iterrows():
-            print(
-                f"    Adag {hiba['ADAGSZÁM']}: Örökölt={hiba['Örökölt_ADAGIDŐ']} vs Számított={hiba['Számított_ADAGIDŐ']}")
+        hibak = ido_ellenorzes[ido_ellenorzes['CRC_Error']]
+        sorok = [f"    Adag {adag}: Örökölt={orokolt} vs Számított={szamitott}"
+                 for adag, orokolt, szamitott in zip(hibak['ADAGSZÁM'], hibak['Örökölt_ADAGIDŐ'],
+                                                     hibak['Számított_ADAGIDŐ'])]
+        print(f"  ⚠️  FIGYELMEZTETÉS: {hiba_count} CRC hiba található!\n  Hibás adagok:\n" + "\n".join(sorok))
     else:
         print("  ✅ Minden adagidő pontos!")
 
@@ -69,14 +60,34 @@ def normalize_adagok(df):
     }, hiba_count
 
 
-def normalize_adagok_with_prompt(df, output_dir, source_filename):
-    """Adagok normalizálása felhasználói interakcióval"""
+def normalize_adagok_with_prompt(df, output_dir, source_filename, fmt='csv', policy=None):
+    """Adagok normalizálása felhasználói interakcióval (policy megadásával kérdés nélkül)"""
+    normalized_tables = normalize_adagok_tables(df, policy)
+
+    # Fájlok mentése
+    for table_name, table_data in normalized_tables.items():
+        output_name = f"{table_name}{table_extension(fmt)}"
+        write_table(table_data, os.path.join(output_dir, output_name))
+        print(f"  💾 {output_name} ({len(table_data)} sor)")
+
+    return len(normalized_tables)
+
+
+def normalize_adagok_tables(df, policy=None):
+    """Adagok normalizálása felhasználói interakcióval, mentés nélkül
+
+    policy: batch futás szabályai - megadása esetén a policy['check_table'] ('keep' / 'drop') dönt kérdés helyett
+    """
     normalized_tables, hiba_count = normalize_adagok(df)
 
     # Ha nincs hiba, kérdezzük meg, tartsuk-e az ellenőrző táblát
     if hiba_count == 0:
         print(f"\n💡 KÉRDÉS: Minden adagidő pontos ({len(normalized_tables['ido_ellenorzes_NFdone'])} adag)")
-        response = input("   Megtartsam az ellenőrző táblát tájékoztatás céljából? (i/n): ").strip().lower()
+        if policy:
+            response = 'i' if policy['check_table'] == 'keep' else 'n'
+            print(f"   Ellenőrző tábla a beállítás szerint: {policy['check_table']}")
+        else:
+            response = input("   Megtartsam az ellenőrző táblát tájékoztatás céljából? (i/n): ").strip().lower()
 
         if response != 'i':
             # Tábla törlése
@@ -85,22 +96,17 @@ def normalize_adagok_with_prompt(df, output_dir, source_filename):
         else:
             print("   ✅ Ellenőrző tábla megmarad")
 
-    # Fájlok mentése
-    for table_name, table_data in normalized_tables.items():
-        output_path = os.path.join(output_dir, f"{table_name}.csv")
-        table_data.to_csv(output_path, index=False, sep=';', encoding='utf-8-sig')
-        print(f"  💾 {table_name}.csv ({len(table_data)} sor)")
-
-    return len(normalized_tables)
+    return normalized_tables
 
 
-def process_adagok_file(input_file_path, output_dir):
+def process_adagok_file(input_file_path, output_dir, fmt='csv', policy=None):
     """Adagok fájl feldolgozása"""
     filename = os.path.basename(input_file_path)
     print(f"🎯 ADAGOK NF3: {filename}")
 
-    # Beolvasás
-    df = pd.read_csv(input_file_path, delimiter=';', encoding='utf-8-sig')
+    # Beolvasás (típusos: a DTYPE_RULES szerint)
+    df = read_typed_table(input_file_path)
+    log_frame_memory(df, "beolvasva")
 
     # Normalizálás
-    return normalize_adagok_with_prompt(df, output_dir, filename)
+    return normalize_adagok_with_prompt(df, output_dir, filename, fmt, policy)
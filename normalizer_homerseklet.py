@@ -1,38 +1,83 @@
+import re
+import numpy as np
 import pandas as pd
 import os
+from storage import table_extension, write_table
+from dtype_policy import PANEL_DTYPE, TEMPERATURE_DTYPE, read_typed_table, log_frame_memory
 
 
-def normalize_homerseklet(df):
-    """Hőmérséklet NF3 normalizálása - JAVÍTOTT (redundáns meres_id nélkül)"""
-    print("  Hőmérséklet NF3 normalizálása...")
+# Panel oszlopok fejléce, pl. 'Panel hőfok 12 [°C] Time' / 'Panel hőfok 12 [°C] ValueY'
+PANEL_COLUMN_PATTERN = re.compile(r'^Panel hőfok\s*(\d+)\s*\[°C\]\s*(Time|ValueY)$')
+
 
-    # Hosszú formátum (tidy data)
-    long_data = []
+def discover_panels(columns):
+    """Panelek felismerése a fejlécekből
 
-    for i in range(1, 16):
-        if i == 7:  # 7-es panel nincs
-            continue
+    Returns:
+        list: (panel_szam, idő oszlop, érték oszlop) hármasok panelszám szerint rendezve,
+              csak azok a panelek, amelyeknek idő és érték oszlopa is van
+    """
+    found = {}
+    for col in columns:
+        match = PANEL_COLUMN_PATTERN.match(str(col).strip())
+        if match:
+            found.setdefault(int(match.group(1)), {})[match.group(2)] = col
 
-        time_col = f'Panel hőfok {i} [°C] Time'
-        value_col = f'Panel hőfok {i} [°C] ValueY'
+    return [(panel, cols['Time'], cols['ValueY'])
+            for panel, cols in sorted(found.items())
+            if 'Time' in cols and 'ValueY' in cols]
 
-        if time_col in df.columns and value_col in df.columns:
-            panel_df = df[[time_col, value_col]].copy()
-            panel_df.columns = ['meres_idopont', 'hofok']
-            panel_df['panel_szam'] = i
-            panel_df = panel_df.dropna()
 
-            long_data.append(panel_df)
+def normalize_homerseklet(df):
+    """Hőmérséklet NF3 normalizálása - JAVÍTOTT (redundáns meres_id nélkül)"""
+    print("  Hőmérséklet NF3 normalizálása...")
+
+    panels = discover_panels(df.columns)
+    print(f"  🔎 Felismert panelek: {len(panels)} ({', '.join(str(p[0]) for p in panels)})")
+
+    if not panels:
+        return {
+            'panel_szam_NFdone': pd.DataFrame({'meres_idopont': pd.Series(dtype='datetime64[ns]'),
+                                               'hofok': pd.Series(dtype=TEMPERATURE_DTYPE),
+                                               'panel_szam': pd.Series(dtype=PANEL_DTYPE)})
+        }
+
+    # Panel szám int16-ként, ha belefér (a hosszú formátumban soronként ismétlődik)
+    panel_numbers = np.array([p[0] for p in panels])
+    fits = panel_numbers.max() <= np.iinfo(PANEL_DTYPE).max
+    panel_numbers = panel_numbers.astype(PANEL_DTYPE if fits else 'int32')
+    time_cols = [p[1] for p in panels]
+    value_cols = [p[2] for p in panels]
+
+    # Hosszú formátum (tidy data) egyetlen vektorizált lépésben:
+    # a panel oszlopokat oszlopfolytonosan (panelenként) egymás alá fűzzük, panelenkénti másolat nélkül
+    n_rows = len(df)
+    times = df[time_cols].to_numpy().ravel(order='F')
+    # A nem szám érték (pl. típus nélkül beolvasott üres szöveg) hiányzó érték; float32 hőfokok
+    values = pd.to_numeric(pd.Series(df[value_cols].to_numpy().ravel(order='F')),
+                           errors='coerce').to_numpy(dtype=TEMPERATURE_DTYPE, na_value=np.nan)
+
+    # Hiányzó mérések kiszűrése (idő és érték is kell)
+    valid = np.flatnonzero(pd.notna(times) & pd.notna(values))
+
+    # Duplikáció szűrés ugyanebben a menetben: kulcs = (időpont kód, panel index)
+    time_codes, _ = pd.factorize(times[valid])
+    panel_index = valid // n_rows if n_rows else valid
+    keys = time_codes.astype('int64') * len(panels) + panel_index
+    duplicated = pd.Index(keys).duplicated(keep='first')
+    keep = valid[~duplicated]
 
     # Összefésülés - NINCS meres_id, mert redundáns
-    homerseklet_3nf = pd.concat(long_data, ignore_index=True)
+    homerseklet_3nf = pd.DataFrame({
+        'meres_idopont': times[keep],
+        'hofok': values[keep],
+        'panel_szam': panel_numbers[keep // n_rows]
+    })
 
     # Egyedi rekordok ellenőrzése
-    duplicate_check = homerseklet_3nf.duplicated(subset=['meres_idopont', 'panel_szam']).sum()
+    duplicate_check = int(duplicated.sum())
     if duplicate_check > 0:
         print(f"  ⚠️  Figyelem: {duplicate_check} duplikált mérés található")
-        # Duplikáltak eltávolítása
-        homerseklet_3nf = homerseklet_3nf.drop_duplicates(subset=['meres_idopont', 'panel_szam'])
         print(f"  ✅ Duplikáltak eltávolítva: {len(homerseklet_3nf)} egyedi mérés maradt")
 
     return {
@@ -40,22 +85,25 @@ def normalize_homerseklet(df):
     }
 
 
-def process_homerseklet_file(input_file_path, output_dir):
+def process_homerseklet_file(input_file_path, output_dir, fmt='csv'):
     """Hőmérséklet fájl feldolgozása"""
     filename = os.path.basename(input_file_path)
     print(f"🎯 HŐMÉRSÉKLET NF3: {filename}")
 
-    # Beolvasás
-    df = pd.read_csv(input_file_path, delimiter=';', encoding='utf-8-sig')
+    # Beolvasás (típusos: datetime64 időpontok, float32 hőfokok)
+    df = read_typed_table(input_file_path)
+    log_frame_memory(df, "beolvasva")
 
     # Normalizálás
     normalized_tables = normalize_homerseklet(df)
+    del df
 
     # Fájlok mentése
     for table_name, table_data in normalized_tables.items():
-        output_path = os.path.join(output_dir, f"{table_name}.csv")
-        table_data.to_csv(output_path, index=False, sep=';', encoding='utf-8-sig')
-        print(f"  💾 {table_name}.csv ({len(table_data)} sor)")
+        output_name = f"{table_name}{table_extension(fmt)}"
+        write_table(table_data, os.path.join(output_dir, output_name))
+        print(f"  💾 {output_name} ({len(table_data)} sor)")
+        log_frame_memory(table_data, table_name)
 
         # Első néhány sor megjelenítése ellenőrzésként
         print(f"     Előnézet: {len(table_data.columns)} oszlop")
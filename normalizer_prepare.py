@@ -1,34 +1,64 @@
 import os
-import pandas as pd
-from normalizer_adagok import process_adagok_file
-from normalizer_homerseklet import process_homerseklet_file
+from normalizer_adagok import process_adagok_file, normalize_adagok_tables
+from normalizer_homerseklet import process_homerseklet_file, normalize_homerseklet
+from storage import table_extension, write_table
+from dtype_policy import read_typed_table, log_frame_memory
 
 
-def normalize_file(input_file_path, output_dir):
-    """Fájl NF3 normalizálása - fő koordináló függvény"""
+def normalize_file(input_file_path, output_dir, fmt='csv', policy=None):
+    """Fájl NF3 normalizálása - fő koordináló függvény
+
+    fmt: a kimeneti _NFdone fájlok formátuma ('csv', 'parquet', 'feather');
+         a bemenet formátumát a kiterjesztés határozza meg
+    policy: batch futás szabályai (kérdések helyett)
+    """
     filename = os.path.basename(input_file_path)
 
     # Fájltípus alapú útválasztás
     if 'Adagok' in filename:
-        return process_adagok_file(input_file_path, output_dir)
+        return process_adagok_file(input_file_path, output_dir, fmt, policy)
     elif any(x in filename for x in ['Hutopanelek', 'homerseklet', 'panel']):
-        return process_homerseklet_file(input_file_path, output_dir)
+        return process_homerseklet_file(input_file_path, output_dir, fmt)
     else:
         # Alapértelmezett - nincs normalizálás, csak _NFdone hozzáadás
         print(f"🎯 ALAPÉRTELMEZETT NF3: {filename}")
 
-        df = pd.read_csv(input_file_path, delimiter=';', encoding='utf-8-sig')
-        name_only = filename.replace('.csv', '')
+        df = read_typed_table(input_file_path)
+        log_frame_memory(df, "beolvasva")
+        name_only = os.path.splitext(filename)[0]
         normalized_tables = {f"{name_only}_NFdone": df}
 
         for table_name, table_data in normalized_tables.items():
-            output_path = os.path.join(output_dir, f"{table_name}.csv")
-            table_data.to_csv(output_path, index=False, sep=';', encoding='utf-8-sig')
-            print(f"  💾 {table_name}.csv ({len(table_data)} sor)")
+            output_name = f"{table_name}{table_extension(fmt)}"
+            write_table(table_data, os.path.join(output_dir, output_name))
+            print(f"  💾 {output_name} ({len(table_data)} sor)")
 
         return len(normalized_tables)
 
 
+def normalize_dataframe(df, filename, policy=None):
+    """DataFrame NF3 normalizálása fájlműveletek nélkül
+
+    Args:
+        df: a megtisztított adatok
+        filename: az eredeti fájl neve (ez alapján választunk normalizálót)
+        policy: batch futás szabályai (kérdések helyett)
+
+    Returns:
+        dict: táblanév -> DataFrame
+    """
+    if 'Adagok' in filename:
+        print(f"🎯 ADAGOK NF3: {filename}")
+        return normalize_adagok_tables(df, policy)
+    elif any(x in filename for x in ['Hutopanelek', 'homerseklet', 'panel']):
+        print(f"🎯 HŐMÉRSÉKLET NF3: {filename}")
+        return normalize_homerseklet(df)
+    else:
+        print(f"🎯 ALAPÉRTELMEZETT NF3: {filename}")
+        name_only = os.path.splitext(filename)[0]
+        return {f"{name_only}_NFdone": df}
+
+
 def get_normalizer_info():
     """Normalizálók információja"""
     return {
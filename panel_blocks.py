@@ -0,0 +1,369 @@
+import time
+import numpy as np
+import pandas as pd
+from column_types import epoch_seconds, format_epoch, table_options
+from heat_map import table_exists
+from rollups import PANEL_TABLE, day_ranges
+
+
+# Tömörített blokkos panel tárolás (választható): a mérések panelenként és napi blokkonként egyetlen
+# sorban, az időpontok és a kvantált hőfokok BLOB-okban; a panel_szam_NFdone tábla helyén ugyanilyen
+# nevű nézet csomagolja ki őket (a hosszú formátumú tábla nem tárolódik)
+BLOCK_TABLE = 'panel_blokk'
+
+# Sorszám tábla (0, 1, ... a leghosszabb blokk mérésszámáig): a nézet ezzel bontja elemeire a blokkokat
+BLOCK_INDEX_TABLE = 'panel_blokk_sorszam'
+
+# A korábbi (a panel tábla melletti másolatként tárolt) blokkok nézete - elrendezés váltáskor eldobódik
+LEGACY_BLOCK_VIEW = 'panel_blokk_meresek'
+
+# Blokk hossza másodpercben (a blokk kezdete meres_idopont - meres_idopont % BLOCK_SECONDS);
+# a napi összesítővel azonos, így az inkrementális frissítés ugyanazokat a napokat érinti
+BLOCK_SECONDS = 86400
+
+# Hőfok kvantálás: egész érték = round(hofok * 10 ** tizedesek), blokkonként a legkevesebb tizedesjeggyel,
+# amely mellett minden érték pontosan visszaáll (a forrás adatok két tizedesjegyesek: 0.01 °C);
+# ha HOFOK_MAX_DECIMALS tizedes sem elég (vagy nem fér 4 bájtba), a blokk nem tárolható - hiba
+HOFOK_DECIMALS = 2
+HOFOK_MAX_DECIMALS = 6
+
+# Blokkok egyszerre memóriába olvasott mérései (panelenként, időrendben)
+BLOCK_CHUNK_ROWS = 500000
+
+# Betöltés közbeni munkatábla: a blokkokból kicsomagolt (vagy újonnan betöltött) mérések ugyanazon
+# a néven, a temp sémában - a minősítetlen hivatkozások (upsert, adag hozzárendelés, összesítők)
+# ezt látják a nézet helyett; a main séma nézetei továbbra is a blokkokra hivatkoznak
+WORK_TABLE_SQL = f"""
+    CREATE TEMP TABLE {PANEL_TABLE} (
+    "meres_idopont" INTEGER, "hofok" REAL, "panel_szam" INTEGER,
+    PRIMARY KEY ("meres_idopont", "panel_szam")){table_options()}"""
+
+
+def create_block_table(cursor) -> None:
+    """
+    Blokk tábla létrehozása, ha még nincs
+
+    Oszlopok:
+        blokk_kezdet  - a blokk kezdete (epoch másodperc)
+        elso_idopont  - a blokk első mérési időpontja (epoch másodperc)
+        db            - mérések száma a blokkban
+        ido_lepes     - az időpontok eltolásának egysége másodpercben (az eltolások legnagyobb közös osztója)
+        ido_bajt      - egy eltolás mérete (2 vagy 4 bájt, előjel nélküli)
+        hofok_bajt    - egy kvantált hőfok mérete (2 vagy 4 bájt, előjeles)
+        hofok_tizedes - a kvantálás tizedesjegyei (hőfok = egész érték / 10 ** hofok_tizedes)
+        idok          - db eltolás (little-endian): időpont = elso_idopont + eltolás * ido_lepes
+        hofokok       - db kvantált hőfok (little-endian)
+    """
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {BLOCK_TABLE} (
+        panel_szam INTEGER, blokk_kezdet INTEGER, elso_idopont INTEGER, db INTEGER, ido_lepes INTEGER,
+        ido_bajt INTEGER, hofok_bajt INTEGER, hofok_tizedes INTEGER, idok BLOB, hofokok BLOB,
+        PRIMARY KEY (panel_szam, blokk_kezdet)){table_options()}""")
+    cursor.execute(f"CREATE TABLE IF NOT EXISTS {BLOCK_INDEX_TABLE} (i INTEGER PRIMARY KEY){table_options()}")
+
+
+def quantize(values: np.ndarray) -> tuple:
+    """
+    Hőfokok egészre kvantálása a legkevesebb, pontos visszaállítást adó tizedesjeggyel (HOFOK_DECIMALS-tól)
+
+    Returns:
+        tuple: (egész értékek int64, tizedesjegyek, pontosan vissza nem álló értékek száma)
+    """
+    int32 = np.iinfo('int32')
+    best = None
+    for decimals in range(HOFOK_DECIMALS, HOFOK_MAX_DECIMALS + 1):
+        scaled = np.round(values * 10 ** decimals)
+        if scaled.min() < int32.min or scaled.max() > int32.max:
+            break
+        quantized = scaled.astype('int64')
+        lossy = int(np.count_nonzero(quantized / 10 ** decimals != values))
+        best = (quantized, decimals, lossy)
+        if not lossy:
+            break
+    if best is None:
+        raise ValueError(f"A hőfok {HOFOK_DECIMALS} tizedesjeggyel sem fér 4 bájtba "
+                         f"({values.min()} - {values.max()})")
+    return best
+
+
+def encode_block(times: np.ndarray, values: np.ndarray) -> tuple:
+    """
+    Egy blokk kódolása
+
+    Args:
+        times: időrendben növekvő mérési időpontok (epoch másodperc, int64)
+        values: hőfokok (lebegőpontos)
+
+    Returns:
+        tuple: ((elso_idopont, db, ido_lepes, ido_bajt, hofok_bajt, hofok_tizedes, idok, hofokok),
+                pontosan vissza nem álló hőfokok száma)
+    """
+    offsets = times - times[0]
+    step = int(np.gcd.reduce(offsets)) or 1
+    offsets //= step
+    time_width = 2 if offsets.max() <= np.iinfo('uint16').max else 4
+    quantized, decimals, lossy = quantize(values)
+    int16 = np.iinfo('int16')
+    value_width = 2 if quantized.min() >= int16.min and quantized.max() <= int16.max else 4
+    return ((int(times[0]), len(times), step, time_width, value_width, decimals,
+             offsets.astype(f'<u{time_width}').tobytes(), quantized.astype(f'<i{value_width}').tobytes()), lossy)
+
+
+def decode_block(first: int, step: int, time_width: int, value_width: int, decimals: int, idok: bytes,
+                 hofokok: bytes) -> tuple:
+    """
+    Egy blokk kicsomagolása NumPy tömbökbe (a BLOB-okból másolás nélkül, vektorizáltan)
+
+    Returns:
+        tuple: (időpontok: epoch másodperc, int64; hőfokok: float64)
+    """
+    times = np.frombuffer(idok, dtype=f'<u{time_width}').astype('int64') * step + first
+    values = np.frombuffer(hofokok, dtype=f'<i{value_width}') / 10 ** decimals
+    return times, values
+
+
+def encode_readings(readings: pd.DataFrame) -> tuple:
+    """
+    Panel szám, majd időpont szerint rendezett mérések blokkokra bontása és kódolása
+
+    Returns:
+        tuple: ((panel_szam, blokk_kezdet, elso_idopont, db, ido_lepes, ido_bajt, hofok_bajt, hofok_tizedes,
+                 idok, hofokok) sorok listája, pontosan vissza nem álló hőfokok száma)
+    """
+    if readings.empty:
+        return [], 0
+    panels = readings['panel_szam'].to_numpy(dtype='int64')
+    times = readings['meres_idopont'].to_numpy(dtype='int64')
+    values = readings['hofok'].to_numpy(dtype='float64')
+    blocks = times - times % BLOCK_SECONDS
+
+    # Új blokk kezdődik, ahol a panel vagy a blokk kezdete változik
+    breaks = np.flatnonzero((np.diff(panels) != 0) | (np.diff(blocks) != 0)) + 1
+    starts = np.concatenate(([0], breaks))
+    ends = np.concatenate((breaks, [len(times)]))
+    rows, lossy = [], 0
+    for s, e in zip(starts, ends):
+        row, block_lossy = encode_block(times[s:e], values[s:e])
+        rows.append((int(panels[s]), int(blocks[s])) + row)
+        lossy += block_lossy
+    return rows, lossy
+
+
+def write_blocks(cursor, start: int = None, end: int = None) -> tuple:
+    """
+    A munkatábla [start, end) méréseinek blokkokba írása (panelenként, időrendben, a (panel_szam,
+    meres_idopont) másodlagos index sorrendjében)
+
+    A blokkok az egyetlen tárolt példány: hiányzó érték, vagy pontosan vissza nem álló hőfok esetén hiba.
+
+    Returns:
+        tuple: (mérések száma, blokkok száma)
+    """
+    where, params = '', ()
+    if start is not None:
+        where, params = " WHERE meres_idopont >= ? AND meres_idopont < ?", (start, end)
+    cursor.execute(f"SELECT COUNT(*) FROM (SELECT * FROM temp.{PANEL_TABLE}{where}) "
+                   f"WHERE hofok IS NULL OR meres_idopont IS NULL OR panel_szam IS NULL", params)
+    missing = cursor.fetchone()[0]
+    if missing:
+        raise ValueError(f"{PANEL_TABLE}: {missing} hiányos mérés (üres időpont / hőfok / panel) nem tárolható "
+                         f"blokkokban - betöltés --panel-blocks nélkül")
+
+    sql = (f"SELECT panel_szam, meres_idopont, hofok FROM temp.{PANEL_TABLE}{where} "
+           f"ORDER BY panel_szam, meres_idopont")
+    readings, blocks, lossy = 0, 0, 0
+    carry = None
+    insert_sql = f"INSERT INTO {BLOCK_TABLE} VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+    for chunk in pd.read_sql(sql, cursor.connection, params=params, chunksize=BLOCK_CHUNK_ROWS):
+        # A darab végén félbemaradt blokk a következő darabbal együtt kódolódik
+        if carry is not None:
+            chunk = pd.concat([carry, chunk], ignore_index=True)
+        last = chunk.iloc[-1]
+        tail = ((chunk['panel_szam'] == last['panel_szam']) &
+                (chunk['meres_idopont'] - chunk['meres_idopont'] % BLOCK_SECONDS ==
+                 last['meres_idopont'] - last['meres_idopont'] % BLOCK_SECONDS))
+        carry = chunk[tail]
+        rows, chunk_lossy = encode_readings(chunk[~tail])
+        cursor.executemany(insert_sql, rows)
+        readings += int((~tail).sum())
+        blocks += len(rows)
+        lossy += chunk_lossy
+    if carry is not None and not carry.empty:
+        rows, chunk_lossy = encode_readings(carry)
+        cursor.executemany(insert_sql, rows)
+        readings += len(carry)
+        blocks += len(rows)
+        lossy += chunk_lossy
+    if lossy:
+        raise ValueError(f"{PANEL_TABLE}: {lossy} hőfok {HOFOK_MAX_DECIMALS} tizedesjeggyel sem állítható vissza "
+                         f"pontosan, blokkokban nem tárolható - betöltés --panel-blocks nélkül")
+    return readings, blocks
+
+
+def extend_block_index(cursor) -> None:
+    """A sorszám tábla kiegészítése a leghosszabb blokk mérésszámáig"""
+    cursor.execute(f"SELECT COALESCE(MAX(db), 0) FROM {BLOCK_TABLE}")
+    needed = cursor.fetchone()[0]
+    cursor.execute(f"SELECT COUNT(*) FROM {BLOCK_INDEX_TABLE}")
+    present = cursor.fetchone()[0]
+    cursor.executemany(f"INSERT INTO {BLOCK_INDEX_TABLE} (i) VALUES (?)", ((i,) for i in range(present, needed)))
+
+
+def sql_byte(blob: str, position: str) -> str:
+    """A BLOB egy bájtja egészként SQL kifejezésben (position: 1-től számozott bájt pozíció)"""
+    digits = "'0123456789ABCDEF'"
+    hex_byte = f"hex(substr({blob}, {position}, 1))"
+    return (f"((instr({digits}, substr({hex_byte}, 1, 1)) - 1) * 16 + "
+            f"instr({digits}, substr({hex_byte}, 2, 1)) - 1)")
+
+
+def sql_element(blob: str, index: str, width_column: str, signed: bool) -> str:
+    """A BLOB index-edik (0-tól számozott) little-endian eleme SQL kifejezésben, 2 vagy 4 bájtos elemekkel"""
+    cases = []
+    for width in (2, 4):
+        value = ' + '.join(f"{sql_byte(blob, f'({index}) * {width} + {k + 1}')} * {256 ** k}" for k in range(width))
+        if signed:
+            value = f"(({value}) + {2 ** (8 * width - 1)}) % {2 ** (8 * width)} - {2 ** (8 * width - 1)}"
+        cases.append(f"WHEN {width} THEN {value}")
+    return f"(CASE {width_column} {' '.join(cases)} END)"
+
+
+def sql_scale(decimals_column: str) -> str:
+    """SQL kifejezés: 10 ** tizedesek lebegőpontosan (a power() nem mindenhol elérhető)"""
+    cases = [f"WHEN {d} THEN {10 ** d}.0" for d in range(HOFOK_DECIMALS, HOFOK_MAX_DECIMALS + 1)]
+    return f"(CASE {decimals_column} {' '.join(cases)} END)"
+
+
+def create_block_view(cursor) -> None:
+    """
+    A panel_szam_NFdone nézet a blokkok fölött (meres_idopont, hofok, panel_szam - mint a táblában)
+
+    A blokkok a sorszám táblával párosítva bomlanak elemeikre (rekurzió nélkül); a panel_szam szűrés
+    a blokk tábla kulcsán keres, időtartományra a teljes kicsomagolás után szűr - tartomány olvasáshoz
+    a read_panel_blocks a gyors út.
+    """
+    cursor.execute(f"DROP VIEW IF EXISTS main.{PANEL_TABLE}")
+    cursor.execute(f"""
+        CREATE VIEW main.{PANEL_TABLE} AS
+        SELECT b.elso_idopont + {sql_element('b.idok', 's.i', 'b.ido_bajt', False)} * b.ido_lepes AS meres_idopont,
+               {sql_element('b.hofokok', 's.i', 'b.hofok_bajt', True)} / {sql_scale('b.hofok_tizedes')} AS hofok,
+               b.panel_szam
+        FROM {BLOCK_TABLE} b CROSS JOIN {BLOCK_INDEX_TABLE} s
+        WHERE s.i < b.db""")
+
+
+def is_block_layout(cursor) -> bool:
+    """Blokkos-e a tárolás (a panel tábla helyén a blokkok nézete áll)"""
+    cursor.execute("SELECT type FROM sqlite_master WHERE name = ?", (PANEL_TABLE,))
+    row = cursor.fetchone()
+    return row is not None and row[0] == 'view' and table_exists(cursor, BLOCK_TABLE)
+
+
+def has_work_table(cursor) -> bool:
+    """Nyitva van-e a betöltés közbeni munkatábla"""
+    cursor.execute("SELECT 1 FROM sqlite_temp_master WHERE type = 'table' AND name = ?", (PANEL_TABLE,))
+    return cursor.fetchone() is not None
+
+
+def open_panel_blocks(cursor, unpack: bool = True) -> int:
+    """
+    Munkatábla nyitása a betöltéshez (a temp sémában, a panel tábla nevén)
+
+    Args:
+        unpack: a tárolt blokkok kicsomagolása a munkatáblába (inkrementális betöltéshez, illetve ha
+                az adag hozzárendelés / összesítők a méréseket olvassák); False: üres munkatábla
+
+    Returns:
+        int: kicsomagolt mérések száma
+    """
+    cursor.execute(f"DROP TABLE IF EXISTS temp.{PANEL_TABLE}")
+    cursor.execute(WORK_TABLE_SQL)
+    cursor.execute(f'CREATE INDEX temp."idx_{PANEL_TABLE}_panel_szam_meres_idopont" '
+                   f'ON {PANEL_TABLE} (panel_szam, meres_idopont)')
+    if not unpack or not table_exists(cursor, BLOCK_TABLE):
+        return 0
+
+    # Naponként (a kulcs sorrendjében), hogy a munkatábla elsődleges kulcsa sorfolytonosan épüljön
+    start = time.perf_counter()
+    count = 0
+    cursor.execute(f"SELECT DISTINCT blokk_kezdet FROM {BLOCK_TABLE} ORDER BY blokk_kezdet")
+    for (day,) in cursor.fetchall():
+        rows = cursor.connection.execute(
+            f"SELECT panel_szam, elso_idopont, ido_lepes, ido_bajt, hofok_bajt, hofok_tizedes, idok, hofokok "
+            f"FROM {BLOCK_TABLE} WHERE blokk_kezdet = ?", (day,)).fetchall()
+        decoded = [(row[0],) + decode_block(*row[1:]) for row in rows]
+        times = np.concatenate([block[1] for block in decoded])
+        values = np.concatenate([block[2] for block in decoded])
+        panels = np.concatenate([np.full(len(block[1]), block[0], dtype='int64') for block in decoded])
+        order = np.lexsort((panels, times))
+        cursor.executemany(f"INSERT INTO temp.{PANEL_TABLE} VALUES (?, ?, ?)",
+                           zip(times[order].tolist(), values[order].tolist(), panels[order].tolist()))
+        count += len(times)
+    print(f"  🧱 Blokkok kicsomagolva: {count} mérés ({time.perf_counter() - start:.2f} s)")
+    return count
+
+
+def store_panel_blocks(cursor, changed: dict) -> None:
+    """
+    A munkatábla visszaírása blokkokba, a nézet frissítése, majd a munkatábla eldobása
+    (a betöltés tranzakciójában, az adag hozzárendelés és az összesítők után)
+
+    Teljes újratöltésnél (vagy ha még nincs blokk tábla) minden blokk újraépül; inkrementális
+    betöltésnél csak a változott méréseket tartalmazó napok blokkjai; ha a panel tábla nem változott,
+    a blokkok is változatlanok.
+
+    Args:
+        changed: táblanév -> None (teljes újratöltés) vagy a változott sorok első kulcsának értékei
+    """
+    full = not table_exists(cursor, BLOCK_TABLE) or (PANEL_TABLE in changed and changed[PANEL_TABLE] is None)
+    create_block_table(cursor)
+    start = time.perf_counter()
+    if full:
+        cursor.execute(f"DELETE FROM {BLOCK_TABLE}")
+        readings, blocks = write_blocks(cursor)
+        print(f"  🧱 Blokkok újraépítve: {readings} mérés, {blocks} blokk ({time.perf_counter() - start:.2f} s)")
+    else:
+        for bounds in day_ranges(changed.get(PANEL_TABLE) or []):
+            cursor.execute(f"DELETE FROM {BLOCK_TABLE} WHERE blokk_kezdet >= ? AND blokk_kezdet < ?", bounds)
+            readings, blocks = write_blocks(cursor, *bounds)
+            print(f"  🧱 Blokkok frissítve ({format_epoch(bounds[0], '%Y.%m.%d')} - "
+                  f"{format_epoch(bounds[1], '%Y.%m.%d')}): {readings} mérés, {blocks} blokk")
+    extend_block_index(cursor)
+    create_block_view(cursor)
+    cursor.execute(f"DROP TABLE temp.{PANEL_TABLE}")
+
+
+def drop_block_layout(cursor) -> None:
+    """A blokkos tárolás eldobása (a nézet, a blokk és sorszám tábla, a munkatábla; a régi blokk nézet is)"""
+    if is_block_layout(cursor):
+        cursor.execute(f"DROP VIEW main.{PANEL_TABLE}")
+    cursor.execute(f"DROP TABLE IF EXISTS temp.{PANEL_TABLE}")
+    cursor.execute(f"DROP VIEW IF EXISTS {LEGACY_BLOCK_VIEW}")
+    cursor.execute(f"DROP TABLE IF EXISTS {BLOCK_TABLE}")
+    cursor.execute(f"DROP TABLE IF EXISTS {BLOCK_INDEX_TABLE}")
+
+
+def read_panel_blocks(conn, panel, start, end) -> tuple:
+    """
+    Egy panel méréseinek [start, end) tartománya a blokkokból, közvetlenül NumPy tömbökbe
+
+    Args:
+        conn: sqlite3 kapcsolat
+        panel: panel szám
+        start, end: időpont ('ÉÉÉÉ.HH.NN óó:pp:mm' szöveg, datetime vagy pd.Timestamp)
+
+    Returns:
+        tuple: (időpontok: datetime64[s] tömb, hőfokok: float64 tömb), időrendben
+    """
+    start, end = epoch_seconds(start), epoch_seconds(end)
+    rows = conn.execute(f"SELECT elso_idopont, ido_lepes, ido_bajt, hofok_bajt, hofok_tizedes, idok, hofokok "
+                        f"FROM {BLOCK_TABLE} WHERE panel_szam = ? AND blokk_kezdet >= ? AND blokk_kezdet < ? "
+                        f"ORDER BY blokk_kezdet", (int(panel), start - start % BLOCK_SECONDS, end)).fetchall()
+    if not rows:
+        return np.array([], dtype='datetime64[s]'), np.array([], dtype='float64')
+
+    decoded = [decode_block(*row) for row in rows]
+    times = np.concatenate([block[0] for block in decoded])
+    values = np.concatenate([block[1] for block in decoded])
+    inside = (times >= start) & (times < end)
+    return times[inside].astype('datetime64[s]'), values[inside]
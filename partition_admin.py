@@ -0,0 +1,195 @@
+import os
+import sys
+import sqlite3
+import argparse
+from column_types import format_epoch
+from db_loader import create_secondary_indexes
+from heat_map import HEAT_MAP_TABLE, build_heat_map, create_heat_map_view, table_exists
+from rollups import PANEL_TABLE, update_rollups
+from partitions import ARCHIVE_FOLDER, parse_month, month_bounds, list_partitions, create_partition_view
+
+# Az archív adatbázis csatolási neve
+ARCHIVE_SCHEMA = 'archiv'
+
+
+def archive_path(db_path: str, name: str) -> str:
+    """A partíció archív adatbázis fájlja (db/archive/<partíció>.db)"""
+    return os.path.join(os.path.dirname(os.path.abspath(db_path)), ARCHIVE_FOLDER, f"{name}.db")
+
+
+def month_days(name: str) -> list:
+    """A partíció hónapjának napjai (epoch másodperc) - a származtatott táblák napi frissítéséhez"""
+    start, end = month_bounds(name)
+    return list(range(start, end, 86400))
+
+
+def refresh_derived(cursor, name: str, restored_times: list = None) -> None:
+    """
+    Adag hozzárendelés és összesítők frissítése egy hónap eldobása / visszatöltése után
+
+    Args:
+        restored_times: visszatöltésnél a partíció mérési időpontjai (None: eldobás)
+    """
+    changed = {PANEL_TABLE: month_days(name)}
+    if restored_times is not None:
+        build_heat_map(cursor, restored_times)
+    update_rollups(cursor, changed)
+    if restored_times is None and table_exists(cursor, HEAT_MAP_TABLE):
+        # Az érintett adagok összesítője már a hozzárendelés alapján újraszámolódott
+        cursor.execute(f"DELETE FROM {HEAT_MAP_TABLE} WHERE meres_idopont >= ? AND meres_idopont < ?",
+                       month_bounds(name))
+    if table_exists(cursor, HEAT_MAP_TABLE):
+        create_heat_map_view(cursor)
+
+
+def require_partition(cursor, name: str) -> None:
+    """Hiba, ha a partíció nem létezik, vagy az utolsó (a nézet nem maradhat üresen)"""
+    partitions = list_partitions(cursor)
+    if name not in partitions:
+        raise ValueError(f"Nincs ilyen partíció: {name}")
+    if partitions == [name]:
+        raise ValueError(f"{name} az utolsó partíció - helyette teljes újratöltés (--tables replace)")
+
+
+def drop_month(cursor, name: str) -> None:
+    """Egy havi partíció eldobása (a hívó tranzakciójában)"""
+    require_partition(cursor, name)
+    cursor.execute(f"DROP TABLE {name}")
+    create_partition_view(cursor)
+    refresh_derived(cursor, name)
+
+
+def list_months(conn, db_path: str) -> None:
+    """Partíciók listája: sorok száma, időtartomány, archív fájl"""
+    cursor = conn.cursor()
+    partitions = list_partitions(cursor)
+    if not partitions:
+        print("ℹ️  Nincsenek havi partíciók")
+    for name in partitions:
+        cursor.execute(f"SELECT COUNT(*), MIN(meres_idopont), MAX(meres_idopont) FROM {name}")
+        rows, first, last = cursor.fetchone()
+        span = f"{format_epoch(first)} - {format_epoch(last)}" if rows else "üres"
+        archived = " (archiválva is)" if os.path.exists(archive_path(db_path, name)) else ""
+        print(f"📅 {name}: {rows} sor, {span}{archived}")
+
+
+def run_in_transaction(conn, action, archive: str = None) -> None:
+    """Művelet egyetlen tranzakcióban; archív fájlnál csatolva (az ATTACH tranzakción kívül kell)"""
+    cursor = conn.cursor()
+    if archive:
+        cursor.execute(f"ATTACH DATABASE ? AS {ARCHIVE_SCHEMA}", (archive,))
+    try:
+        cursor.execute("BEGIN")
+        action(cursor)
+        cursor.execute("COMMIT")
+    except Exception:
+        if conn.in_transaction:
+            cursor.execute("ROLLBACK")
+        raise
+    finally:
+        if archive:
+            cursor.execute(f"DETACH DATABASE {ARCHIVE_SCHEMA}")
+
+
+def archive_month(conn, db_path: str, name: str) -> str:
+    """
+    Partíció áthelyezése saját adatbázis fájlba (db/archive/<partíció>.db), majd eldobása
+
+    Előbb a másolás véglegesedik, csak utána az eldobás: WAL módú adatbázisnál a csatolt fájlokra
+    kiterjedő tranzakció fájlonként atomi, együtt nem - így megszakadáskor legfeljebb mindkét helyen megvan.
+    """
+    path = archive_path(db_path, name)
+    if os.path.exists(path):
+        raise ValueError(f"Az archív fájl már létezik: {path}")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+
+    def copy(cursor):
+        require_partition(cursor, name)
+        cursor.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?", (name,))
+        create_sql = cursor.fetchone()[0]
+        cursor.execute(create_sql.replace(name, f"{ARCHIVE_SCHEMA}.{name}", 1))
+        cursor.execute(f"INSERT INTO {ARCHIVE_SCHEMA}.{name} SELECT * FROM main.{name}")
+
+    try:
+        run_in_transaction(conn, copy, path)
+    except Exception:
+        if os.path.exists(path):
+            os.remove(path)
+        raise
+    run_in_transaction(conn, lambda cursor: drop_month(cursor, name))
+    return path
+
+
+def restore_month(conn, db_path: str, name: str) -> int:
+    """
+    Archivált partíció visszatöltése (a nézet, adag hozzárendelés, összesítők frissülnek)
+
+    Returns:
+        int: visszatöltött sorok száma
+    """
+    path = archive_path(db_path, name)
+    if not os.path.exists(path):
+        raise ValueError(f"Nincs archív fájl: {path}")
+    restored = {}
+
+    def action(cursor):
+        if name in list_partitions(cursor):
+            raise ValueError(f"A partíció már létezik: {name} (előbb: drop)")
+        cursor.execute(f"SELECT sql FROM {ARCHIVE_SCHEMA}.sqlite_master WHERE type = 'table' AND name = ?", (name,))
+        cursor.execute(cursor.fetchone()[0])
+        cursor.execute(f"INSERT INTO main.{name} SELECT * FROM {ARCHIVE_SCHEMA}.{name} "
+                       f"ORDER BY meres_idopont, panel_szam")
+        create_secondary_indexes(cursor, name)
+        create_partition_view(cursor)
+        cursor.execute(f"SELECT DISTINCT meres_idopont FROM {name}")
+        restored['times'] = [row[0] for row in cursor.fetchall()]
+        refresh_derived(cursor, name, restored['times'])
+        cursor.execute(f"SELECT COUNT(*) FROM {name}")
+        restored['rows'] = cursor.fetchone()[0]
+
+    run_in_transaction(conn, action, path)
+    return restored['rows']
+
+
+def main():
+    """Havi partíciók kezelése parancssorból"""
+    current_dir = os.path.dirname(os.path.abspath(__file__))
+    default_db = os.path.join(os.path.dirname(current_dir), 'db', 'data.db')
+
+    parser = argparse.ArgumentParser(description="Havi panel partíciók: listázás, eldobás, archiválás, visszatöltés")
+    parser.add_argument('command', choices=['list', 'drop', 'archive', 'restore'], help="Művelet")
+    parser.add_argument('month', nargs='?', help="Hónap (ÉÉÉÉ.HH) vagy partíció neve")
+    parser.add_argument('--db', default=default_db, help=f"Adatbázis (alapértelmezett: {default_db})")
+    args = parser.parse_args()
+
+    if args.command != 'list' and not args.month:
+        parser.error("a hónap megadása kötelező (ÉÉÉÉ.HH)")
+    if not os.path.exists(args.db):
+        print(f"❌ Nincs adatbázis: {args.db}")
+        return 2
+
+    conn = sqlite3.connect(args.db, isolation_level=None)
+    conn.execute("PRAGMA busy_timeout = 30000")
+    try:
+        if args.command == 'list':
+            list_months(conn, args.db)
+            return 0
+        name = parse_month(args.month)
+        if args.command == 'drop':
+            run_in_transaction(conn, lambda cursor: drop_month(cursor, name))
+            print(f"🗑️  {name} eldobva")
+        elif args.command == 'archive':
+            print(f"📦 {name} archiválva: {archive_month(conn, args.db, name)}")
+        else:
+            print(f"📥 {name} visszatöltve: {restore_month(conn, args.db, name)} sor")
+        conn.execute("PRAGMA optimize")
+        return 0
+    except ValueError as e:
+        print(f"❌ {e}")
+        return 1
+    finally:
+        conn.close()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
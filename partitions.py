@@ -0,0 +1,130 @@
+import re
+import numpy as np
+import pandas as pd
+from column_types import format_epoch
+
+
+# Havonta particionálható tábla: particionált elrendezésben ugyanezen a néven UNION ALL nézet
+# fogja össze a havi táblákat, így a lekérdezések (összesítők, adag hozzárendelés) változatlanok
+PARTITIONED_TABLE = 'panel_szam_NFdone'
+
+# Havi partíció tábla neve: panel_szam_NFdone_ÉÉÉÉ_HH (a hónap a meres_idopont szerint)
+PARTITION_COLUMN = 'meres_idopont'
+PARTITION_PATTERN = re.compile(rf'^{PARTITIONED_TABLE}_(\d{{4}})_(\d{{2}})$')
+
+# Archivált partíciók helye az adatbázis mappáján belül (partíciónként egy adatbázis fájl)
+ARCHIVE_FOLDER = 'archive'
+
+
+def base_table(table_name: str) -> str:
+    """A partíció alaptáblájának neve (nem partíció esetén maga a név) - a TABLE_SPECS kulcsokhoz"""
+    return PARTITIONED_TABLE if PARTITION_PATTERN.match(table_name) else table_name
+
+
+def partition_name(month_start: int) -> str:
+    """A hónap (kezdete epoch másodpercben) partíció táblájának neve"""
+    return f"{PARTITIONED_TABLE}_{format_epoch(month_start, '%Y_%m')}"
+
+
+def parse_month(month: str) -> str:
+    """Hónap megadása (ÉÉÉÉ.HH, ÉÉÉÉ-HH, ÉÉÉÉ_HH vagy a partíció neve) partíció névként"""
+    if PARTITION_PATTERN.match(month):
+        return month
+    match = re.match(r'^(\d{4})[._-](\d{2})$', month.strip())
+    if not match or not 1 <= int(match.group(2)) <= 12:
+        raise ValueError(f"Érvénytelen hónap: {month} (ÉÉÉÉ.HH formában kell megadni)")
+    return f"{PARTITIONED_TABLE}_{match.group(1)}_{match.group(2)}"
+
+
+def month_bounds(name: str) -> tuple:
+    """A partíció [kezdet, vége) tartománya epoch másodpercként"""
+    year, month = (int(part) for part in PARTITION_PATTERN.match(name).groups())
+    start = np.datetime64(f'{year:04d}-{month:02d}', 'M')
+    return tuple(int(bound.astype('datetime64[s]').astype('int64')) for bound in (start, start + 1))
+
+
+def month_starts(times: np.ndarray) -> np.ndarray:
+    """Időpontokat (epoch másodperc) tartalmazó hónapok kezdete, vektorizáltan"""
+    return times.astype('datetime64[s]').astype('datetime64[M]').astype('datetime64[s]').astype('int64')
+
+
+def split_by_month(df: pd.DataFrame) -> list:
+    """
+    Séma szerinti (epoch másodperces) DataFrame szétosztása havi partíciókra
+
+    Returns:
+        list: (partíció neve, DataFrame) párok időrendben; a hiányzó időpontú sorok nélkül
+    """
+    times = df[PARTITION_COLUMN]
+    missing = int(times.isna().sum())
+    if missing:
+        print(f"  ⚠️  {missing} sor időpont nélkül, egyik partícióba sem kerül")
+        df, times = df[times.notna()], times.dropna()
+    months = month_starts(times.to_numpy(dtype='int64'))
+    return [(partition_name(month), df[months == month]) for month in np.unique(months)]
+
+
+def list_partitions(cursor) -> list:
+    """Meglévő havi partíciók nevei időrendben"""
+    cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE ?", (f'{PARTITIONED_TABLE}_%',))
+    return sorted(name for (name,) in cursor.fetchall() if PARTITION_PATTERN.match(name))
+
+
+def is_partitioned(cursor) -> bool:
+    """Particionált-e a tábla (vannak havi partíciók; a blokkos tárolás nézete nem számít)"""
+    return bool(list_partitions(cursor))
+
+
+def create_partition_view(cursor) -> list:
+    """
+    A havi partíciókat összefogó UNION ALL nézet újralétrehozása (partíció hozzáadása / eldobása után)
+
+    Returns:
+        list: a nézetbe került partíciók
+    """
+    partitions = list_partitions(cursor)
+    cursor.execute(f"DROP VIEW IF EXISTS {PARTITIONED_TABLE}")
+    if partitions:
+        union = "\n            UNION ALL ".join(f"SELECT * FROM {name}" for name in partitions)
+        cursor.execute(f"""
+            CREATE VIEW {PARTITIONED_TABLE} AS
+            {union}""")
+    return partitions
+
+
+def drop_partitioned_layout(cursor) -> None:
+    """A nézet és minden havi partíció eldobása (visszaállás egyetlen táblára teljes újratöltéskor)"""
+    cursor.execute(f"DROP VIEW IF EXISTS {PARTITIONED_TABLE}")
+    for name in list_partitions(cursor):
+        cursor.execute(f"DROP TABLE {name}")
+    print(f"  🗑️  Havi partíciók eldobva ({PARTITIONED_TABLE} újra egyetlen tábla)")
+
+
+def panel_sources(cursor, start: int = None, end: int = None) -> list:
+    """
+    A [start, end) időtartomány méréseit tartalmazó fizikai táblák (partíció szűrés)
+
+    Nem particionált elrendezésben maga a tábla; határ nélkül minden partíció.
+    """
+    if not is_partitioned(cursor):
+        return [PARTITIONED_TABLE]
+    sources = []
+    for name in list_partitions(cursor):
+        month_start, month_end = month_bounds(name)
+        if (start is None or month_end > start) and (end is None or month_start < end):
+            sources.append(name)
+    return sources
+
+
+def range_source(cursor, start: int = None, end: int = None) -> str:
+    """
+    FROM forrás a [start, end) tartományra: csak az érintett partíciók (egy táblánál maga a tábla)
+
+    Ha egyik partíció sem érintett, a teljes nézet (a feltétel úgyis üres eredményt ad).
+    """
+    sources = panel_sources(cursor, start, end)
+    if not sources:
+        return PARTITIONED_TABLE
+    if len(sources) == 1:
+        return sources[0]
+    return "(" + " UNION ALL ".join(f"SELECT * FROM {name}" for name in sources) + ")"
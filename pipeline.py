@@ -0,0 +1,89 @@
+import queue
+import threading
+import traceback
+
+
+# Szakaszok közötti sorok alapértelmezett mérete (ennyi fájl várhat egy szakasz előtt)
+PIPELINE_QUEUE_SIZE = 2
+
+
+def stage_loop(stage: dict, in_queue, out_queue, state: dict, on_result=None) -> None:
+    """
+    Egy szakasz munkaszála: elemek feldolgozása a bemeneti sorból a kimeneti sorba
+
+    A hibás elem tovább halad (a további szakaszok kihagyják). A szakasz utolsó leálló szála
+    a következő szakasz minden szálának továbbadja a leállás jelzését (None).
+    """
+    while True:
+        item = in_queue.get()
+        if item is None:
+            with state['lock']:
+                state['running'] -= 1
+                last = state['running'] == 0
+            if last:
+                for _ in range(state['next_workers']):
+                    out_queue.put(None)
+            return
+
+        if item['error'] is None:
+            try:
+                item['value'] = stage['func'](item['value'])
+                if not item['value']:
+                    item['error'] = "nincs eredmény"
+            except Exception as e:
+                traceback.print_exc()
+                item['error'] = f"{type(e).__name__}: {e}"
+            if on_result:
+                on_result(stage['name'], item['name'], item['error'] is None, item['error'])
+
+        # Telített kimeneti sornál itt vár (visszatartás: a gyors szakasz nem fut el a lassú előtt)
+        out_queue.put(item)
+
+
+def run_pipelined(items: list, stages: list, queue_size: int = PIPELINE_QUEUE_SIZE, on_result=None) -> list:
+    """
+    Elemek (fájlok) futószalagos feldolgozása: minden szakasz saját szál(ak)on fut, a szakaszokat
+    korlátos sorok kötik össze, így az N. elem betöltése alatt az N+1. már normalizálódik
+
+    Args:
+        items: (név, kezdőérték) párok, pl. (fájlnév, útvonal)
+        stages: szakaszok sorrendben: {'name': ..., 'func': érték -> új érték, 'workers': szálak száma}
+        queue_size: a szakaszok előtti sorok mérete
+        on_result: (szakasz, elem neve, sikeres, hibaüzenet) visszahívás minden elvégzett lépés után
+
+    Returns:
+        list: az elemek {'name', 'value', 'error'} szótárai, befejezési sorrendben
+    """
+    workers = [max(1, stage.get('workers', 1)) for stage in stages]
+    queues = [queue.Queue(maxsize=queue_size) for _ in range(len(stages) + 1)]
+
+    threads = []
+    for index, stage in enumerate(stages):
+        state = {'lock': threading.Lock(), 'running': workers[index],
+                 'next_workers': workers[index + 1] if index + 1 < len(stages) else 1}
+        for worker in range(workers[index]):
+            threads.append(threading.Thread(target=stage_loop, name=f"{stage['name']}-{worker + 1}", daemon=True,
+                                            args=(stage, queues[index], queues[index + 1], state, on_result)))
+    for thread in threads:
+        thread.start()
+
+    def feed():
+        for name, value in items:
+            queues[0].put({'name': name, 'value': value, 'error': None})
+        for _ in range(workers[0]):
+            queues[0].put(None)
+
+    feeder = threading.Thread(target=feed, name="adagolo", daemon=True)
+    feeder.start()
+
+    finished = []
+    while True:
+        item = queues[-1].get()
+        if item is None:
+            break
+        finished.append(item)
+
+    feeder.join()
+    for thread in threads:
+        thread.join()
+    return finished
@@ -0,0 +1,135 @@
+import os
+import json
+import time
+import codecs
+
+
+# Felügyelet nélküli (batch) futás döntései - a kérdések (input) helyett
+# encoding_order: alacsony megbízhatóságú felismerésnél a mintára illő kódolások közül a felismerő pontszáma,
+#                 egyenlőségnél ez a sorrend dönt (az utf-8 elöl: a latin2 minden bájtot dekódol)
+# min_confidence: e fölött a felismert kódolás elfogadható
+# folders: 'wipe' (temp / export kiürítése) vagy 'keep'
+# tables: 'replace' (meglévő táblák újra létrehozása) vagy 'append' (megtartás, upsert a természetes kulcsokon)
+# check_table: hibátlan adagidőknél az ellenőrző tábla 'keep' vagy 'drop'
+DEFAULT_POLICY = {
+    'encoding_order': ['utf-8', 'latin2', 'cp1250', 'cp852'],
+    'min_confidence': 0.99,
+    'folders': 'wipe',
+    'tables': 'replace',
+    'check_table': 'keep',
+}
+
+POLICY_CHOICES = {
+    'folders': ('wipe', 'keep'),
+    'tables': ('replace', 'append'),
+    'check_table': ('keep', 'drop'),
+}
+
+RUN_SUMMARY_FILENAME = 'run_summary.json'
+
+
+def load_policy(config_path: str = None, **overrides) -> dict:
+    """
+    Batch futás szabályainak összeállítása: alapértékek ← konfigurációs fájl (JSON) ← parancssori kapcsolók
+
+    Raises:
+        ValueError: ismeretlen kulcs vagy érvénytelen érték esetén
+    """
+    policy = dict(DEFAULT_POLICY)
+
+    if config_path:
+        with open(config_path, 'r', encoding='utf-8') as file:
+            config = json.load(file)
+        unknown = [key for key in config if key not in DEFAULT_POLICY]
+        if unknown:
+            raise ValueError(f"Ismeretlen beállítás a konfigurációban: {', '.join(unknown)}")
+        policy.update(config)
+
+    policy.update({key: value for key, value in overrides.items() if value is not None})
+
+    if isinstance(policy['encoding_order'], str):
+        policy['encoding_order'] = [enc.strip() for enc in policy['encoding_order'].split(',') if enc.strip()]
+    validate_encoding_order(policy['encoding_order'])
+    policy['min_confidence'] = validate_min_confidence(policy['min_confidence'])
+    for key, choices in POLICY_CHOICES.items():
+        if policy[key] not in choices:
+            raise ValueError(f"Érvénytelen érték: {key}={policy[key]} (lehetséges: {', '.join(choices)})")
+
+    return policy
+
+
+def validate_encoding_order(encoding_order) -> None:
+    """
+    Raises:
+        ValueError: ha nem (nem üres) kódolás lista, vagy valamelyik név nem ismert kódolás
+    """
+    if not isinstance(encoding_order, list) or not encoding_order:
+        raise ValueError(f"Érvénytelen érték: encoding_order={encoding_order!r} (kódolás nevek listája kell)")
+    for encoding in encoding_order:
+        try:
+            codecs.lookup(encoding)
+        except (LookupError, TypeError):
+            raise ValueError(f"Ismeretlen kódolás az encoding_order-ben: {encoding!r}")
+
+
+def validate_min_confidence(min_confidence) -> float:
+    """
+    Returns:
+        float: a [0, 1] tartományba eső küszöb
+
+    Raises:
+        ValueError: ha nem szám, vagy a [0, 1] tartományon kívül esik
+    """
+    if isinstance(min_confidence, bool) or not isinstance(min_confidence, (int, float)) \
+            or not 0 <= min_confidence <= 1:
+        raise ValueError(f"Érvénytelen érték: min_confidence={min_confidence!r} (0 és 1 közötti szám kell)")
+    return float(min_confidence)
+
+
+def new_run_summary(policy: dict) -> dict:
+    """Gépileg olvasható futási összesítő kezdeti állapota"""
+    return {
+        'started': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'finished': None,
+        'status': 'running',
+        'policy': policy,
+        'stages': {},
+        'failures': [],
+    }
+
+
+def record_result(summary: dict, stage: str, item: str, ok: bool, error: str = None, **extra) -> None:
+    """Egy elem (fájl, tábla) eredményének rögzítése az összesítőben"""
+    if summary is None:
+        return
+
+    stage_summary = summary['stages'].setdefault(stage, {'succeeded': [], 'failed': [], 'skipped': []})
+    if ok is None:
+        stage_summary['skipped'].append(item)
+    elif ok:
+        stage_summary['succeeded'].append(dict(item=item, **extra) if extra else item)
+    else:
+        failure = {'stage': stage, 'item': item, 'error': error or 'sikertelen'}
+        stage_summary['failed'].append(failure)
+        summary['failures'].append(failure)
+
+
+def finish_run_summary(summary: dict, output_path: str, status: str = None) -> str:
+    """
+    Összesítő lezárása és mentése JSON formátumban
+
+    Returns:
+        str: a végső állapot ('ok', 'partial', 'failed')
+    """
+    if status is None:
+        status = 'partial' if summary['failures'] else 'ok'
+    summary['status'] = status
+    summary['finished'] = time.strftime('%Y-%m-%dT%H:%M:%S')
+
+    output_dir = os.path.dirname(os.path.abspath(output_path))
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+    with open(output_path, 'w', encoding='utf-8') as file:
+        json.dump(summary, file, ensure_ascii=False, indent=2)
+
+    return status
@@ -0,0 +1,285 @@
+import time
+import numpy as np
+import pandas as pd
+from column_types import epoch_seconds, format_epoch, table_options
+from heat_map import HEAT_MAP_TABLE, table_exists
+from partitions import PARTITIONED_TABLE, range_source
+
+
+# Panel hőmérséklet összesítők időbeli szintjei, finomtól a durva felé:
+#   table   - összesítő tábla (kulcs: panel_szam, periodus = a periódus kezdete, epoch másodperc)
+#   seconds - periódus hossza másodpercben (a periódus kezdete meres_idopont - meres_idopont % seconds)
+ROLLUP_LEVELS = {
+    'perc': {'table': 'panel_osszesito_perc', 'seconds': 60},
+    'ora': {'table': 'panel_osszesito_ora', 'seconds': 3600},
+    'nap': {'table': 'panel_osszesito_nap', 'seconds': 86400},
+}
+
+# Adagonkénti összesítő (kulcs: ADAGSZÁM, panel_szam)
+HEAT_ROLLUP_TABLE = 'panel_osszesito_adag'
+
+PANEL_TABLE = PARTITIONED_TABLE
+HEAT_TABLES = ('kezdet_adagok_NFdone', 'vege_adatok_NFdone')
+
+# Ennyi mérés kerül egyszerre memóriába az összesítők számításakor
+ROLLUP_CHUNK_ROWS = 500000
+
+# Összesítő oszlopok: az átlag sum_hofok / db, így a részösszesítők egyesíthetők
+ROLLUP_COLUMNS = ['min_hofok', 'max_hofok', 'sum_hofok', 'db', 'utolso_idopont', 'utolso_hofok']
+
+
+def create_rollup_tables(cursor) -> None:
+    """Összesítő táblák létrehozása, ha még nincsenek"""
+    value_sql = """min_hofok REAL, max_hofok REAL, sum_hofok REAL, db INTEGER,
+            utolso_idopont INTEGER, utolso_hofok REAL"""
+    for level in ROLLUP_LEVELS.values():
+        cursor.execute(f"""
+            CREATE TABLE IF NOT EXISTS {level['table']} (
+            panel_szam INTEGER, periodus INTEGER, {value_sql},
+            PRIMARY KEY (panel_szam, periodus)){table_options()}""")
+    cursor.execute(f"""
+        CREATE TABLE IF NOT EXISTS {HEAT_ROLLUP_TABLE} (
+        "ADAGSZÁM" INTEGER REFERENCES kezdet_adagok_NFdone ("ADAGSZÁM"), panel_szam INTEGER, {value_sql},
+        PRIMARY KEY ("ADAGSZÁM", panel_szam)){table_options()}""")
+
+
+def period_start(times: pd.Series, level: str) -> pd.Series:
+    """A mérési időpontokat (epoch másodperc) tartalmazó periódus kezdete, vektorizáltan"""
+    seconds = ROLLUP_LEVELS[level]['seconds']
+    return times - times % seconds
+
+
+def partial_aggregates(readings: pd.DataFrame, keys: list) -> pd.DataFrame:
+    """
+    Részösszesítők kulcsonként egyetlen group-by-jal
+
+    Args:
+        readings: meres_idopont szerint rendezett mérések, hiányzó hőfok nélkül
+        keys: csoportosító oszlopok
+    """
+    grouped = readings.groupby(keys, sort=False)
+    result = grouped['hofok'].agg(['min', 'max', 'sum', 'count'])
+    result.columns = ['min_hofok', 'max_hofok', 'sum_hofok', 'db']
+    # A rendezés miatt a csoport utolsó sora a legkésőbbi mérés
+    last = grouped[['meres_idopont', 'hofok']].last()
+    result['utolso_idopont'] = last['meres_idopont']
+    result['utolso_hofok'] = last['hofok']
+    return result.reset_index()
+
+
+def combine_partials(partials: pd.DataFrame, keys: list) -> pd.DataFrame:
+    """Finomabb szint részösszesítőinek egyesítése durvább kulcsokra (pl. perc -> óra)"""
+    partials = partials.sort_values('utolso_idopont', kind='stable')
+    grouped = partials.groupby(keys, sort=False)
+    return grouped.agg(min_hofok=('min_hofok', 'min'), max_hofok=('max_hofok', 'max'),
+                       sum_hofok=('sum_hofok', 'sum'), db=('db', 'sum'),
+                       utolso_idopont=('utolso_idopont', 'last'),
+                       utolso_hofok=('utolso_hofok', 'last')).reset_index()
+
+
+def merge_partials(cursor, table: str, keys: list, partials: pd.DataFrame) -> None:
+    """Részösszesítők beírása; meglévő kulcsnál egyesítés (min, max, összeg, darab, utolsó)"""
+    if partials.empty:
+        return
+    # Kulcs szerinti sorrendben az elsődleges kulcs indexe sorfolytonosan bővül
+    partials = partials.sort_values(keys, kind='stable')
+    columns = keys + ROLLUP_COLUMNS
+    column_list = ', '.join(f'"{c}"' for c in columns)
+    key_list = ', '.join(f'"{k}"' for k in keys)
+    cursor.executemany(f"""
+        INSERT INTO {table} ({column_list}) VALUES ({', '.join('?' * len(columns))})
+        ON CONFLICT ({key_list}) DO UPDATE SET
+            min_hofok = MIN(min_hofok, excluded.min_hofok),
+            max_hofok = MAX(max_hofok, excluded.max_hofok),
+            sum_hofok = sum_hofok + excluded.sum_hofok,
+            db = db + excluded.db,
+            utolso_hofok = CASE WHEN excluded.utolso_idopont >= utolso_idopont
+                                THEN excluded.utolso_hofok ELSE utolso_hofok END,
+            utolso_idopont = MAX(utolso_idopont, excluded.utolso_idopont)""",
+                       zip(*(partials[c].tolist() for c in columns)))
+
+
+def aggregate_readings(cursor, sql: str, params: tuple, levels: list, heats: bool) -> int:
+    """
+    Mérések beolvasása darabonként és a kért összesítők frissítése
+
+    Returns:
+        int: feldolgozott mérések száma
+    """
+    count = 0
+    for chunk in pd.read_sql(sql, cursor.connection, params=params, chunksize=ROLLUP_CHUNK_ROWS):
+        chunk = chunk.dropna(subset=['hofok', 'meres_idopont'])
+        if chunk.empty:
+            continue
+        chunk = chunk.astype({'meres_idopont': 'int64', 'panel_szam': 'int64'})
+        chunk = chunk.sort_values('meres_idopont', kind='stable')
+        count += len(chunk)
+
+        # A legfinomabb szint a mérésekből, a durvábbak az előző szint részösszesítőiből
+        partials = None
+        for level in levels:
+            if partials is None:
+                chunk['periodus'] = period_start(chunk['meres_idopont'], level)
+                partials = partial_aggregates(chunk, ['panel_szam', 'periodus'])
+            else:
+                partials['periodus'] = period_start(partials['periodus'], level)
+                partials = combine_partials(partials, ['panel_szam', 'periodus'])
+            merge_partials(cursor, ROLLUP_LEVELS[level]['table'], ['panel_szam', 'periodus'], partials)
+        if heats:
+            in_heat = chunk[chunk['ADAGSZÁM'].notna()].astype({'ADAGSZÁM': 'int64'})
+            merge_partials(cursor, HEAT_ROLLUP_TABLE, ['ADAGSZÁM', 'panel_szam'],
+                           partial_aggregates(in_heat, ['ADAGSZÁM', 'panel_szam']))
+    return count
+
+
+def readings_sql(where: str = '', heat_map: bool = True, source: str = PANEL_TABLE) -> str:
+    """
+    Mérések lekérdezése az adagszámmal (adagon kívül, vagy hozzárendelés híján NULL), időrendben
+
+    source: a mérések forrása (időtartománynál a range_source szerinti partíciók)
+    """
+    if not heat_map:
+        return f'SELECT meres_idopont, panel_szam, hofok, NULL AS "ADAGSZÁM" FROM {source} p {where} ' \
+               f'ORDER BY meres_idopont'
+    return (f'SELECT p.meres_idopont, p.panel_szam, p.hofok, m."ADAGSZÁM" '
+            f'FROM {source} p LEFT JOIN {HEAT_MAP_TABLE} m ON m.meres_idopont = p.meres_idopont '
+            f'{where} ORDER BY p.meres_idopont')
+
+
+def day_ranges(times: list) -> list:
+    """
+    A változott időpontokat tartalmazó napok összefüggő [kezdet, vége) tartományokként
+
+    Returns:
+        list: (kezdet, vége) epoch másodperc párok
+    """
+    day = ROLLUP_LEVELS['nap']['seconds']
+    days = np.unique(pd.Series(times, dtype='Int64').dropna().to_numpy(dtype='int64') // day)
+    if not len(days):
+        return []
+    # Új tartomány kezdődik, ahol az előző nap nem a közvetlen szomszéd
+    breaks = np.flatnonzero(np.diff(days) != 1) + 1
+    return [(int(run[0]) * day, (int(run[-1]) + 1) * day) for run in np.split(days, breaks)]
+
+
+def update_rollups(cursor, changed: dict) -> None:
+    """
+    Összesítők frissítése a betöltés után (a betöltés tranzakciójában)
+
+    Teljes újratöltésnél minden összesítő újraszámolódik; inkrementális betöltésnél csak
+    a változott méréseket tartalmazó napok, illetve az érintett adagok.
+
+    Args:
+        changed: táblanév -> None (teljes újratöltés) vagy a változott sorok első kulcsának
+                 (meres_idopont, ADAGSZÁM) értékei
+    """
+    if not table_exists(cursor, PANEL_TABLE):
+        return
+    heat_map = table_exists(cursor, HEAT_MAP_TABLE)
+    missing = not all(table_exists(cursor, table)
+                      for table in [level['table'] for level in ROLLUP_LEVELS.values()] + [HEAT_ROLLUP_TABLE])
+    create_rollup_tables(cursor)
+
+    start = time.perf_counter()
+    changed_times = changed.get(PANEL_TABLE)
+    levels_full = missing or (PANEL_TABLE in changed and changed_times is None)
+    heats_full = missing or levels_full or any(table in changed for table in HEAT_TABLES)
+
+    if heats_full or not heat_map:
+        cursor.execute(f"DELETE FROM {HEAT_ROLLUP_TABLE}")
+
+    if levels_full:
+        for level in ROLLUP_LEVELS.values():
+            cursor.execute(f"DELETE FROM {level['table']}")
+        rows = aggregate_readings(cursor, readings_sql(heat_map=heat_map), (), list(ROLLUP_LEVELS), heat_map)
+        print(f"  📊 Összesítők újraszámolva: {rows} mérés ({time.perf_counter() - start:.2f} s)")
+        return
+
+    # A változott méréseket tartalmazó teljes napok (a napi a legdurvább időbeli szint)
+    ranges = day_ranges(changed_times) if changed_times else []
+    for bounds in ranges:
+        for level in ROLLUP_LEVELS.values():
+            cursor.execute(f"DELETE FROM {level['table']} WHERE periodus >= ? AND periodus < ?", bounds)
+        rows = aggregate_readings(cursor, readings_sql('WHERE p.meres_idopont >= ? AND p.meres_idopont < ?',
+                                                       heat_map, range_source(cursor, *bounds)),
+                                  bounds, list(ROLLUP_LEVELS), heats=False)
+        print(f"  📊 Összesítők frissítve ({format_epoch(bounds[0], '%Y.%m.%d')} - "
+              f"{format_epoch(bounds[1], '%Y.%m.%d')}): {rows} mérés")
+
+    if not heat_map:
+        return
+    if heats_full:
+        rows = aggregate_readings(cursor, readings_sql('WHERE m."ADAGSZÁM" IS NOT NULL'), (), [], heats=True)
+        print(f"  📊 Adag összesítő újraszámolva: {rows} mérés")
+        return
+
+    # Az érintett adagok teljes hosszukban újraszámolódnak
+    affected = (f'SELECT DISTINCT "ADAGSZÁM" FROM {HEAT_MAP_TABLE} '
+                f'WHERE meres_idopont >= ? AND meres_idopont < ?')
+    for bounds in ranges:
+        cursor.execute(f'DELETE FROM {HEAT_ROLLUP_TABLE} WHERE "ADAGSZÁM" IN ({affected})', bounds)
+        rows = aggregate_readings(cursor, readings_sql(f'WHERE m."ADAGSZÁM" IN ({affected})'), bounds, [],
+                                  heats=True)
+        print(f"  📊 Adag összesítő frissítve: {rows} mérés")
+
+
+def rollup_level_for_range(start, end):
+    """
+    A legdurvább összesítő szint, amelynek periódushatárai a [start, end) tartomány határaira esnek
+
+    Args:
+        start, end: epoch másodperc
+
+    Returns:
+        str | None: szint neve (pl. 'ora'), vagy None, ha csak a nyers mérések adják ki pontosan
+    """
+    for level in reversed(list(ROLLUP_LEVELS)):
+        seconds = ROLLUP_LEVELS[level]['seconds']
+        if start % seconds == 0 and end % seconds == 0:
+            return level
+    return None
+
+
+def query_panel_range(conn, start, end, panels=None):
+    """
+    Panelenkénti min / max / átlag / utolsó hőfok a [start, end) időtartományra
+
+    A tartományt pontosan lefedő legdurvább összesítőből számol; ha egyik sem illeszkedik
+    (pl. másodperc pontos határ), a nyers panel táblából (havi partícióknál csak az érintettekből).
+
+    Args:
+        conn: sqlite3 kapcsolat
+        start, end: időpont ('ÉÉÉÉ.HH.NN óó:pp:mm' szöveg, datetime vagy pd.Timestamp)
+        panels: csak ezek a panelek (alapértelmezés: mind)
+
+    Returns:
+        tuple: (forrás szint vagy 'nyers', DataFrame: panel_szam, min_hofok, max_hofok,
+                atlag_hofok, utolso_hofok, utolso_idopont (datetime64), db)
+    """
+    start, end = epoch_seconds(start), epoch_seconds(end)
+    params = [start, end]
+    panel_sql = ''
+    if panels is not None:
+        panels = [int(panel) for panel in panels]
+        panel_sql = f" AND panel_szam IN ({', '.join('?' * len(panels))})"
+        params += panels
+
+    level = rollup_level_for_range(start, end)
+    if level is None:
+        source = 'nyers'
+        readings = range_source(conn.cursor(), start, end)
+        rows = pd.read_sql(f"SELECT panel_szam, hofok AS min_hofok, hofok AS max_hofok, hofok AS sum_hofok, "
+                           f"1 AS db, meres_idopont AS utolso_idopont, hofok AS utolso_hofok FROM {readings} "
+                           f"WHERE meres_idopont >= ? AND meres_idopont < ? AND hofok IS NOT NULL{panel_sql}",
+                           conn, params=params)
+    else:
+        source = level
+        rows = pd.read_sql(f"SELECT panel_szam, {', '.join(ROLLUP_COLUMNS)} FROM {ROLLUP_LEVELS[level]['table']} "
+                           f"WHERE periodus >= ? AND periodus < ?{panel_sql}", conn, params=params)
+
+    result = combine_partials(rows, ['panel_szam']).sort_values('panel_szam')
+    result['atlag_hofok'] = result['sum_hofok'] / result['db']
+    result['utolso_idopont'] = pd.to_datetime(result['utolso_idopont'], unit='s')
+    result = result.reset_index(drop=True)[['panel_szam', 'min_hofok', 'max_hofok', 'atlag_hofok',
+                                            'utolso_hofok', 'utolso_idopont', 'db']]
+    return source, result
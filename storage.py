@@ -0,0 +1,172 @@
+import os
+import numpy as np
+import pandas as pd
+
+
+# A forrásrendszer időpont formátuma (csv-be datetime64 oszlop is így íródik)
+DATETIME_FORMAT = '%Y.%m.%d %H:%M:%S'
+
+# Támogatott köztes tárolási formátumok és kiterjesztéseik
+# csv: pontosvesszős UTF-8-BOM (Excel kompatibilis, alapértelmezett)
+# parquet / feather: oszlopos bináris formátum pyarrow-val (gyors, típustartó)
+STORAGE_FORMATS = {
+    'csv': '.csv',
+    'parquet': '.parquet',
+    'feather': '.feather',
+}
+
+
+def table_extension(fmt: str = 'csv') -> str:
+    """Formátumhoz tartozó fájlkiterjesztés"""
+    if fmt not in STORAGE_FORMATS:
+        raise ValueError(f"Ismeretlen tárolási formátum: {fmt} (lehetséges: {', '.join(STORAGE_FORMATS)})")
+    return STORAGE_FORMATS[fmt]
+
+
+def table_format(filename: str) -> str:
+    """Fájl formátuma a kiterjesztése alapján (None, ha nem támogatott)"""
+    ext = os.path.splitext(filename)[1].lower()
+    for fmt, fmt_ext in STORAGE_FORMATS.items():
+        if ext == fmt_ext:
+            return fmt
+    return None
+
+
+def require_pyarrow(fmt: str) -> bool:
+    """Ellenőrzi, hogy az oszlopos formátumhoz elérhető-e a pyarrow"""
+    if fmt == 'csv':
+        return True
+    try:
+        import pyarrow  # noqa: F401
+        return True
+    except ImportError:
+        print(f"❌ A(z) {fmt} formátumhoz a pyarrow csomag szükséges: pip install pyarrow")
+        return False
+
+
+def csv_like_column(series: pd.Series) -> pd.Series:
+    """
+    object oszlop a csv visszaolvasással azonos értelmezésben: '' -> hiányzó érték, és ha minden
+    meglévő érték szám (vagy számként olvasható szöveg), szám oszlop - mint a pd.read_csv-nél
+    """
+    if series.dtype != object:
+        return series
+    values = series.mask(series.map(lambda x: isinstance(x, str) and x == ''))
+    if pd.api.types.infer_dtype(values, skipna=True) == 'boolean':
+        return values
+    numeric = pd.to_numeric(values, errors='coerce')
+    if (numeric.isna() & values.notna()).any():
+        return values
+    return numeric
+
+
+def csv_like_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """A DataFrame object oszlopai a csv visszaolvasással azonos értelmezésben (lásd csv_like_column)"""
+    columns = list(df.select_dtypes(include=['object']).columns)
+    if not columns:
+        return df
+    df = df.copy(deep=False)
+    for col in columns:
+        df[col] = csv_like_column(df[col])
+    return df
+
+
+def arrow_safe(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    object oszlopok parquet / feather íráshoz, a csv visszaolvasással azonos típussal
+
+    '' -> hiányzó érték, a szám oszlop szám marad (lásd csv_like_columns); csak a valóban vegyes
+    (szám + szöveg) oszlopok értékei alakulnak szöveggé, mert ezt a pyarrow nem tudja tárolni.
+    """
+    df = csv_like_columns(df)
+    mixed = [col for col in df.select_dtypes(include=['object']).columns
+             if pd.api.types.infer_dtype(df[col], skipna=True) in ('mixed', 'mixed-integer')]
+    if not mixed:
+        return df
+    df = df.copy(deep=False)
+    for col in mixed:
+        df[col] = df[col].map(lambda x: x if pd.isna(x) or isinstance(x, str) else str(x))
+    return df
+
+
+def format_datetime_columns(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    datetime64 oszlopok szöveggé alakítása csv íráshoz a DATETIME_FORMAT szerint
+
+    Csak a különböző időpontok formázódnak, az oszlopokon együtt (a panel Time oszlopok
+    ugyanazokat az időpontokat tartalmazzák; a to_csv date_format értékenként hívja a strftime-ot).
+    """
+    columns = [col for col in df.columns if pd.api.types.is_datetime64_any_dtype(df[col])]
+    if not columns:
+        return df
+    values = np.concatenate([df[col].to_numpy(dtype='datetime64[ns]') for col in columns])
+    codes, uniques = pd.factorize(values)
+    text = np.append(pd.DatetimeIndex(uniques).strftime(DATETIME_FORMAT).to_numpy(dtype=object), None)
+
+    df = df.copy(deep=False)
+    for position, col in enumerate(columns):
+        # A -1 kód (hiányzó időpont) az utolsó elemre, None-ra mutat
+        df[col] = text[codes[position * len(df):(position + 1) * len(df)]]
+    return df
+
+
+def write_table(df: pd.DataFrame, output_path: str) -> str:
+    """DataFrame mentése a fájl kiterjesztése szerinti formátumban"""
+    fmt = table_format(output_path)
+
+    if fmt == 'parquet':
+        arrow_safe(df).to_parquet(output_path, index=False)
+    elif fmt == 'feather':
+        # A feather csak alapértelmezett indexet tud tárolni
+        arrow_safe(df).reset_index(drop=True).to_feather(output_path)
+    else:
+        format_datetime_columns(df).to_csv(output_path, index=False, sep=';', encoding='utf-8-sig')
+
+    return output_path
+
+
+def read_table(input_path: str, **kwargs) -> pd.DataFrame:
+    """Táblafájl beolvasása a kiterjesztése szerinti formátumban"""
+    fmt = table_format(input_path)
+
+    if fmt == 'parquet':
+        return pd.read_parquet(input_path, **kwargs)
+    elif fmt == 'feather':
+        return pd.read_feather(input_path, **kwargs)
+    else:
+        return pd.read_csv(input_path, delimiter=';', encoding='utf-8-sig', **kwargs)
+
+
+def count_table_rows(input_path: str) -> int:
+    """
+    Táblafájl sorainak száma teljes beolvasás nélkül (parquet: metaadat, feather: a rekord kötegek
+    sorszámai, csv: az idézőjelen kívüli sortörések a fejléc nélkül - az idézőjeles mezőben lévő
+    sortörés nem kezd új sort)
+    """
+    fmt = table_format(input_path)
+
+    if fmt == 'parquet':
+        import pyarrow.parquet as pq
+        return pq.ParquetFile(input_path).metadata.num_rows
+    elif fmt == 'feather':
+        import pyarrow as pa
+        with pa.memory_map(input_path) as source:
+            reader = pa.ipc.open_file(source)
+            return sum(reader.get_batch(i).num_rows for i in range(reader.num_record_batches))
+
+    line_count = 0
+    last_byte = b'\n'
+    in_quotes = False  # a darab végén nyitott idézőjel (a "" escape a paritást nem változtatja)
+    with open(input_path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1024 * 1024), b''):
+            last_byte = chunk[-1:]
+            if not in_quotes and b'"' not in chunk:
+                line_count += chunk.count(b'\n')
+                continue
+            data = np.frombuffer(chunk, dtype=np.uint8)
+            quoted = (np.cumsum(data == ord('"')) + in_quotes) % 2 == 1
+            line_count += int(np.count_nonzero((data == ord('\n')) & ~quoted))
+            in_quotes = bool(quoted[-1])
+    if last_byte != b'\n':
+        line_count += 1  # utolsó sor sortörés nélkül
+    return max(line_count - 1, 0)
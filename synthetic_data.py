@@ -0,0 +1,186 @@
+import os
+import argparse
+import numpy as np
+import pandas as pd
+
+
+# Generálás kötegmérete (a memóriahasználat a teljes sorszámtól független)
+GENERATOR_CHUNK_ROWS = 500000
+
+ADAGOK_COLUMNS = ['ADAGSZÁM', 'Kezdet_DÁTUM', 'Kezdet_IDŐ', 'Vége_DÁTUM', 'Vége_IDŐ', 'ADAGIDŐ']
+DATE_FORMAT = '%Y.%m.%d'
+TIME_FORMAT = '%H:%M:%S'
+TIMESTAMP_FORMAT = '%Y.%m.%d %H:%M:%S'
+
+
+def panel_columns(panel_numbers):
+    """Hutopanelek fejléc a megadott panelszámokkal"""
+    columns = []
+    for panel in panel_numbers:
+        columns += [f'Panel hőfok {panel} [°C] Time', f'Panel hőfok {panel} [°C] ValueY']
+    return columns
+
+
+def default_panel_numbers(panel_count: int) -> list:
+    """Panelszámok 1-től, a gyári export szerint a 7-es kihagyásával"""
+    numbers = []
+    panel = 1
+    while len(numbers) < panel_count:
+        if panel != 7:
+            numbers.append(panel)
+        panel += 1
+    return numbers
+
+
+def write_chunk(df: pd.DataFrame, output_path: str, encoding: str, first: bool) -> None:
+    """Köteg hozzáfűzése a kimeneti CSV-hez a nyers export formátumában"""
+    df.to_csv(output_path, sep=';', index=False, header=first, mode='w' if first else 'a',
+              encoding=encoding, lineterminator='\r\n')
+
+
+def generate_adagok_csv(output_path: str, rows: int, encoding: str = 'latin2', crc_error_rate: float = 0.01,
+                        duplicate_rate: float = 0.0, start: str = '2020-01-01 06:00:00', seed: int = None) -> int:
+    """
+    Adagok.csv jellegű nyers fájl generálása
+
+    Args:
+        rows: adagok száma
+        encoding: a nyers fájl kódolása (pl. latin2, cp1250)
+        crc_error_rate: azon adagok aránya, amelyeknél az ADAGIDŐ eltér a számított időtől
+        duplicate_rate: ismételten kiírt (duplikált) sorok aránya
+
+    Returns:
+        int: a kiírt sorok száma (duplikátumokkal együtt)
+    """
+    rng = np.random.default_rng(seed)
+    next_start = pd.Timestamp(start)
+    written = 0
+
+    for offset in range(0, rows, GENERATOR_CHUNK_ROWS):
+        n = min(GENERATOR_CHUNK_ROWS, rows - offset)
+
+        # Adagidő 40-90 perc, szünet 5-20 perc, másodperc pontossággal
+        duration = rng.integers(40 * 60, 90 * 60, n)
+        pause = rng.integers(5 * 60, 20 * 60, n)
+        start_offsets = np.concatenate(([0], np.cumsum(duration + pause)[:-1]))
+        starts = next_start + pd.to_timedelta(start_offsets, unit='s')
+        ends = starts + pd.to_timedelta(duration, unit='s')
+        next_start = ends[-1] + pd.Timedelta(seconds=int(pause[-1]))
+
+        adagido = duration // 60
+        crc_errors = rng.random(n) < crc_error_rate
+        adagido[crc_errors] += rng.integers(2, 15, int(crc_errors.sum()))
+
+        df = pd.DataFrame({
+            'ADAGSZÁM': np.arange(offset, offset + n) + 100000,
+            'Kezdet_DÁTUM': starts.strftime(DATE_FORMAT),
+            'Kezdet_IDŐ': starts.strftime(TIME_FORMAT),
+            'Vége_DÁTUM': ends.strftime(DATE_FORMAT),
+            'Vége_IDŐ': ends.strftime(TIME_FORMAT),
+            'ADAGIDŐ': adagido,
+        })
+        df = add_duplicates(df, duplicate_rate, rng)
+
+        write_chunk(df, output_path, encoding, offset == 0)
+        written += len(df)
+
+    return written
+
+
+def generate_hutopanelek_csv(output_path: str, rows: int, panel_count: int = 14, encoding: str = 'cp1250',
+                             duplicate_rate: float = 0.01, missing_rate: float = 0.001,
+                             start: str = '2020-01-01 06:00:00', interval_seconds: int = 60,
+                             seed: int = None) -> int:
+    """
+    Hutopanelek.csv jellegű nyers fájl generálása (széles formátum, panelenként Time / ValueY oszloppár)
+
+    Args:
+        rows: mérési időpontok száma
+        panel_count: panelek száma (a 7-es panel a gyári export szerint hiányzik)
+        duplicate_rate: ismételten kiírt (duplikált) sorok aránya
+        missing_rate: hiányzó mérések aránya panelenként
+
+    Returns:
+        int: a kiírt sorok száma (duplikátumokkal együtt)
+    """
+    rng = np.random.default_rng(seed)
+    panel_numbers = default_panel_numbers(panel_count)
+    columns = panel_columns(panel_numbers)
+    start_ts = pd.Timestamp(start)
+    written = 0
+
+    for offset in range(0, rows, GENERATOR_CHUNK_ROWS):
+        n = min(GENERATOR_CHUNK_ROWS, rows - offset)
+        times = pd.Series((start_ts + pd.to_timedelta((np.arange(n) + offset) * interval_seconds, unit='s'))
+                          .strftime(TIMESTAMP_FORMAT))
+
+        data = {}
+        for panel, (time_col, value_col) in zip(panel_numbers, zip(columns[0::2], columns[1::2])):
+            values = np.round(rng.normal(35.0 + panel, 4.0, n), 2)
+            missing = rng.random(n) < missing_rate
+            data[time_col] = times.where(~missing)
+            data[value_col] = np.where(missing, np.nan, values)
+
+        df = add_duplicates(pd.DataFrame(data, columns=columns), duplicate_rate, rng)
+
+        write_chunk(df, output_path, encoding, offset == 0)
+        written += len(df)
+
+    return written
+
+
+def add_duplicates(df: pd.DataFrame, duplicate_rate: float, rng) -> pd.DataFrame:
+    """Véletlen sorok megismétlése közvetlenül az eredeti után (mint a hibás exportokban)"""
+    if duplicate_rate <= 0 or len(df) == 0:
+        return df
+    repeat = np.where(rng.random(len(df)) < duplicate_rate, 2, 1)
+    return df.loc[df.index.repeat(repeat)]
+
+
+def generate_dataset(output_dir: str, adagok_rows: int, panel_rows: int, panel_count: int = 14,
+                     adagok_encoding: str = 'latin2', panel_encoding: str = 'cp1250',
+                     crc_error_rate: float = 0.01, duplicate_rate: float = 0.01, seed: int = 42) -> dict:
+    """
+    Teljes szintetikus import készlet (Adagok.csv + Hutopanelek.csv) generálása
+
+    Returns:
+        dict: fájlnév -> kiírt sorok száma
+    """
+    if not os.path.exists(output_dir):
+        os.makedirs(output_dir)
+
+    adagok_path = os.path.join(output_dir, 'Adagok.csv')
+    panel_path = os.path.join(output_dir, 'Hutopanelek.csv')
+
+    return {
+        'Adagok.csv': generate_adagok_csv(adagok_path, adagok_rows, adagok_encoding, crc_error_rate,
+                                          duplicate_rate, seed=seed),
+        'Hutopanelek.csv': generate_hutopanelek_csv(panel_path, panel_rows, panel_count, panel_encoding,
+                                                    duplicate_rate, seed=seed),
+    }
+
+
+def main():
+    """Szintetikus adatok generálása parancssorból"""
+    parser = argparse.ArgumentParser(description="Szintetikus Adagok / Hutopanelek CSV generátor")
+    parser.add_argument('output_dir', help="Kimeneti mappa (pl. az import mappa)")
+    parser.add_argument('--adagok-rows', type=int, default=10000, help="Adagok sorainak száma")
+    parser.add_argument('--panel-rows', type=int, default=100000, help="Hutopanelek sorainak (időpontjainak) száma")
+    parser.add_argument('--panels', type=int, default=14, help="Panelek száma")
+    parser.add_argument('--adagok-encoding', default='latin2', help="Adagok.csv kódolása")
+    parser.add_argument('--panel-encoding', default='cp1250', help="Hutopanelek.csv kódolása")
+    parser.add_argument('--crc-error-rate', type=float, default=0.01, help="CRC hibás adagok aránya")
+    parser.add_argument('--duplicate-rate', type=float, default=0.01, help="Duplikált sorok aránya")
+    parser.add_argument('--seed', type=int, default=42, help="Véletlenszám mag (ismételhető generálás)")
+    args = parser.parse_args()
+
+    counts = generate_dataset(args.output_dir, args.adagok_rows, args.panel_rows, args.panels,
+                              args.adagok_encoding, args.panel_encoding, args.crc_error_rate,
+                              args.duplicate_rate, args.seed)
+    for filename, count in counts.items():
+        file_size = os.path.getsize(os.path.join(args.output_dir, filename)) / 1024
+        print(f"✅ {filename}: {count} sor ({file_size:.1f} KB)")
+
+
+if __name__ == "__main__":
+    main()
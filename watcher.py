@@ -0,0 +1,324 @@
+import os
+import sys
+import time
+import queue
+import select
+import shutil
+import threading
+import traceback
+
+import pandas as pd
+
+try:
+    import ctypes
+    import ctypes.util
+except ImportError:
+    ctypes = None
+
+
+# Feldolgozott / hibás bemenetek helye az import mappán belül (a szkennelés csak a fájlokat nézi)
+PROCESSED_FOLDER = 'feldolgozott'
+FAILED_FOLDER = 'hibas'
+
+# Alapbeállítások
+WATCH_STABLE_SECONDS = 5.0   # ennyi ideig nem változó méretű / idejű fájl számít késznek
+WATCH_POLL_SECONDS = 2.0     # szkennelési időköz (inotify nélkül, illetve várakozó fájlok mellett)
+WATCH_IDLE_SECONDS = 30.0    # inotify mellett ennyi idő után akkor is szkennel, ha nem jött esemény
+WATCH_QUEUE_SIZE = 8         # várakozó fájlok / betöltésre váró eredmények legnagyobb száma
+WATCH_COMMIT_ROWS = 500000   # ennyi összegyűlt sor után azonnal betölt
+WATCH_COMMIT_SECONDS = 10.0  # az első várakozó eredmény után legfeljebb ennyit vár a betöltéssel
+
+# inotify (Linux) eseménymaszk: létrehozás, írás, írás utáni lezárás, beköltözés
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+WATCH_EVENT_MASK = IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE
+
+
+def open_inotify(folder_path: str):
+    """
+    inotify figyelés indítása a mappára
+
+    Returns:
+        int | None: fájlleíró, vagy None, ha az inotify nem érhető el (nem Linux, hiba) - ilyenkor szkennelés
+    """
+    if ctypes is None or not sys.platform.startswith('linux'):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            return None
+        if libc.inotify_add_watch(fd, os.fsencode(folder_path), WATCH_EVENT_MASK) < 0:
+            os.close(fd)
+            return None
+        return fd
+    except (OSError, AttributeError):
+        return None
+
+
+def wait_for_events(fd, timeout: float, stop_event) -> bool:
+    """
+    Várakozás mappa eseményre (inotify) vagy a megadott ideig (szkennelés); leállításkor azonnal visszatér
+
+    Returns:
+        bool: jött-e esemény (az események tartalma nem kell, utána úgyis szkennelünk)
+    """
+    if fd is None:
+        stop_event.wait(timeout)
+        return False
+
+    deadline = time.monotonic() + timeout
+    while not stop_event.is_set():
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return False
+        # Legalább másodpercenként ránéz a leállítási jelzésre
+        ready, _, _ = select.select([fd], [], [], min(remaining, 1.0))
+        if ready:
+            break
+    else:
+        return False
+
+    try:
+        while os.read(fd, 64 * 1024):
+            pass
+    except BlockingIOError:
+        pass
+    return True
+
+
+def scan_stable_files(folder_path: str, extensions: tuple, pending: dict, stable_seconds: float,
+                      now: float = None) -> list:
+    """
+    Elkészült (már nem íródó) fájlok keresése
+
+    Egy fájl akkor kész, ha mérete és módosítási ideje stable_seconds óta nem változott.
+
+    Args:
+        pending: fájlnév -> (méret, módosítási idő, azóta változatlan) - hívások között megőrzendő
+
+    Returns:
+        list: kész fájlnevek (a pending-ből kikerülnek)
+    """
+    now = time.monotonic() if now is None else now
+    present = set()
+    ready = []
+
+    for entry in os.scandir(folder_path):
+        if not entry.is_file() or not entry.name.lower().endswith(extensions):
+            continue
+        present.add(entry.name)
+        stat = entry.stat()
+        signature = (stat.st_size, stat.st_mtime_ns)
+
+        previous = pending.get(entry.name)
+        if previous is None or previous[:2] != signature:
+            pending[entry.name] = signature + (now,)
+        elif stat.st_size > 0 and now - previous[2] >= stable_seconds:
+            ready.append(entry.name)
+
+    # Eltűnt fájlok (pl. áthelyezve) és a kész fájlok kikerülnek a nyilvántartásból
+    for name in list(pending):
+        if name not in present or name in ready:
+            del pending[name]
+
+    return sorted(ready)
+
+
+def move_input(folder_path: str, filename: str, target_folder: str) -> str:
+    """Bemenet áthelyezése a feldolgozott / hibás almappába (azonos nevű régebbi fájl felülíródik)"""
+    target_dir = os.path.join(folder_path, target_folder)
+    if not os.path.exists(target_dir):
+        os.makedirs(target_dir)
+    target = os.path.join(target_dir, filename)
+    shutil.move(os.path.join(folder_path, filename), target)
+    return target
+
+
+def merge_table_batches(batches: list) -> dict:
+    """Több fájl NF3 táblái táblánként összefűzve (a betöltés upsertje a kulcson belül az utolsót tartja meg)"""
+    merged = {}
+    for tables in batches:
+        for table_name, df in tables.items():
+            merged.setdefault(table_name, []).append(df)
+    return {table_name: pd.concat(frames, ignore_index=True) if len(frames) > 1 else frames[0]
+            for table_name, frames in merged.items()}
+
+
+def worker_loop(work_queue, result_queue, process_file) -> None:
+    """Fájlok feldolgozása a munkasorból (None: leállás), az eredmény a betöltési sorba kerül"""
+    while True:
+        path = work_queue.get()
+        if path is None:
+            result_queue.put(None)
+            return
+        try:
+            tables, error = process_file(path)
+        except Exception as e:
+            traceback.print_exc()
+            tables, error = None, f"{type(e).__name__}: {e}"
+        result_queue.put((path, tables, error))
+
+
+def writer_loop(result_queue, load_tables, state: dict, worker_count: int, commit_rows: int,
+                commit_seconds: float) -> None:
+    """
+    Egyetlen adatbázis író: az eredmények kötegelt betöltése egy-egy tranzakcióban
+
+    A köteg akkor töltődik be, ha elérte a commit_rows sort, vagy a legrégebbi eleme
+    commit_seconds óta vár. A bemenetek csak a sikeres betöltés után kerülnek át a
+    feldolgozott mappába.
+    """
+    batch = []
+    batch_rows = 0
+    oldest = None
+    running = worker_count
+
+    while running:
+        timeout = None if oldest is None else max(0.0, commit_seconds - (time.monotonic() - oldest))
+        try:
+            item = result_queue.get(timeout=timeout)
+        except queue.Empty:
+            item = False  # lejárt a várakozás, betöltés
+
+        if item is None:
+            running -= 1
+        elif item:
+            path, tables, error = item
+            if tables:
+                batch.append((path, tables))
+                batch_rows += sum(len(df) for df in tables.values())
+                oldest = oldest or time.monotonic()
+            else:
+                finish_inputs(state, [path], False, error or "nincs NF3 tábla")
+
+        due = oldest is not None and time.monotonic() - oldest >= commit_seconds
+        if batch and (batch_rows >= commit_rows or due or not running):
+            flush_batch(batch, load_tables, state)
+            batch, batch_rows, oldest = [], 0, None
+
+
+def flush_batch(batch: list, load_tables, state: dict) -> None:
+    """Egy köteg betöltése; hiba esetén a köteg minden bemenete hibásnak számít"""
+    paths = [path for path, _ in batch]
+    print(f"\n💾 Betöltés: {len(paths)} fájl ({', '.join(os.path.basename(p) for p in paths)})")
+    try:
+        load_tables(merge_table_batches([tables for _, tables in batch]))
+    except Exception as e:
+        traceback.print_exc()
+        finish_inputs(state, paths, False, f"{type(e).__name__}: {e}")
+        return
+    finish_inputs(state, paths, True)
+
+
+def finish_inputs(state: dict, paths: list, ok: bool, error: str = None) -> None:
+    """Bemenetek lezárása: áthelyezés, nyilvántartás, visszajelzés"""
+    for path in paths:
+        folder_path, filename = os.path.split(path)
+        try:
+            move_input(folder_path, filename, PROCESSED_FOLDER if ok else FAILED_FOLDER)
+        except OSError as e:
+            print(f"⚠️  {filename} nem helyezhető át: {e}")
+        with state['lock']:
+            state['in_flight'].discard(filename)
+            state['done' if ok else 'failed'] += 1
+        if state.get('on_result'):
+            state['on_result'](filename, ok, error)
+        print(f"{'✅' if ok else '❌'} {filename}" + (f" ({error})" if error else ""))
+
+
+def drain_work_queue(work_queue, state: dict) -> int:
+    """
+    Leállításkor a munkasorban várakozó (el nem kezdett) fájlok kivétele: nem kerülnek a hibás mappába
+
+    Returns:
+        int: kivett fájlok száma
+    """
+    drained = 0
+    while True:
+        try:
+            path = work_queue.get_nowait()
+        except queue.Empty:
+            return drained
+        with state['lock']:
+            state['in_flight'].discard(os.path.basename(path))
+        drained += 1
+
+
+def run_watch(folder_path: str, process_file, load_tables, workers: int = 1, extensions: tuple = ('.csv',),
+              stable_seconds: float = WATCH_STABLE_SECONDS, poll_seconds: float = WATCH_POLL_SECONDS,
+              queue_size: int = WATCH_QUEUE_SIZE, commit_rows: int = WATCH_COMMIT_ROWS,
+              commit_seconds: float = WATCH_COMMIT_SECONDS, stop_event=None, on_result=None) -> dict:
+    """
+    Import mappa folyamatos figyelése és a beérkező fájlok feldolgozása
+
+    Args:
+        process_file: path -> (táblanév -> DataFrame | None, hibaüzenet | None); a workerekből hívva
+        load_tables: táblanév -> DataFrame betöltése (csak az író szálból hívva)
+        workers: párhuzamos feldolgozók száma
+        queue_size: a munkasor és a betöltési sor mérete (telítettségnél a figyelő vár: visszatartás)
+        stop_event: threading.Event - beállításakor a megkezdett fájlok befejeződnek és a figyelés leáll
+                    (a még el nem kezdett fájlok az import mappában maradnak, a következő indításkor jönnek)
+        on_result: (fájlnév, sikeres, hibaüzenet) visszahívás minden lezárt bemenetre
+
+    Returns:
+        dict: {'done': ..., 'failed': ...}
+    """
+    stop_event = stop_event or threading.Event()
+    state = {'lock': threading.Lock(), 'in_flight': set(), 'done': 0, 'failed': 0, 'on_result': on_result}
+    work_queue = queue.Queue(maxsize=queue_size)
+    result_queue = queue.Queue(maxsize=queue_size)
+
+    threads = [threading.Thread(target=worker_loop, args=(work_queue, result_queue, process_file),
+                                name=f"feldolgozo-{i + 1}", daemon=True) for i in range(max(1, workers))]
+    threads.append(threading.Thread(target=writer_loop, name="iro", daemon=True,
+                                    args=(result_queue, load_tables, state, len(threads), commit_rows,
+                                          commit_seconds)))
+    for thread in threads:
+        thread.start()
+
+    fd = open_inotify(folder_path)
+    print(f"👀 Figyelés: {folder_path} ({'inotify' if fd is not None else 'szkennelés'}, "
+          f"{max(1, workers)} feldolgozó, stabil {stable_seconds:g} s)")
+
+    pending = {}
+    waiting = []  # kész, de a teli munkasor miatt még be nem került fájlok
+    try:
+        while not stop_event.is_set():
+            for filename in scan_stable_files(folder_path, extensions, pending, stable_seconds):
+                with state['lock']:
+                    if filename in state['in_flight'] or filename in waiting:
+                        continue
+                waiting.append(filename)
+
+            while waiting:
+                try:
+                    work_queue.put_nowait(os.path.join(folder_path, waiting[0]))
+                except queue.Full:
+                    break
+                with state['lock']:
+                    state['in_flight'].add(waiting.pop(0))
+
+            # Várakozó vagy íródó fájl mellett sűrűbben, egyébként (inotify esetén) eseményig
+            busy = pending or waiting
+            timeout = poll_seconds if fd is None or busy else WATCH_IDLE_SECONDS
+            wait_for_events(fd, timeout, stop_event)
+    except KeyboardInterrupt:
+        print("\n⏹️  Leállítás: a folyamatban lévő fájlok még befejeződnek")
+    finally:
+        if fd is not None:
+            os.close(fd)
+        left = drain_work_queue(work_queue, state)
+        if left:
+            print(f"ℹ️  {left} el nem kezdett fájl az import mappában marad")
+        for _ in range(max(1, workers)):
+            work_queue.put(None)
+        for thread in threads:
+            thread.join()
+
+    print(f"👋 Figyelés vége: {state['done']} sikeres, {state['failed']} hibás fájl")
+    return {'done': state['done'], 'failed': state['failed']}